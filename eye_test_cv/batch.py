@@ -0,0 +1,189 @@
+"""
+Multi-process offline video processing.
+Shards a recorded video into frame ranges, analyzes each range in its own worker
+process with its own Pose and Face Mesh graphs, and yields per-frame results in
+frame order.
+"""
+
+import json
+import math
+import logging
+import multiprocessing
+import cv2
+from eye_test_cv.models.posture import PostureAnalyzer
+from eye_test_cv.models.distance import DistanceEstimator
+from eye_test_cv.models.eye_tracker import EyeTracker
+from eye_test_cv.models.face_landmarks import FaceLandmarker
+from eye_test_cv.models.landmarks import landmarks_to_array
+from eye_test_cv.models.frame_result import FrameResult
+from eye_test_cv.trace import TraceRecorder
+from eye_test_cv.controller import PostureDistanceDetector, FRAME_WIDTH, FRAME_HEIGHT
+from eye_test_cv.config.settings import FOCAL_LENGTH_PX, BATCH_SEGMENT_FRAMES, BATCH_PREROLL_FRAMES
+
+logger = logging.getLogger(__name__)
+
+class _SegmentModels:
+    """The analyzers used by one segment, mirroring PostureDistanceDetector.analyze_frame."""
+
+    def __init__(self, ear_threshold=None):
+        self.face_landmarker = FaceLandmarker()
+        self.eye_tracker = EyeTracker(self.face_landmarker)
+        self.posture_analyzer = PostureAnalyzer()
+        self.distance_estimator = DistanceEstimator(self.face_landmarker)
+        self.distance_estimator.set_focal_length(FOCAL_LENGTH_PX)
+
+        # Segments after the first start from the session's calibration
+        if ear_threshold is not None:
+            self.eye_tracker.EAR_THRESHOLD = ear_threshold
+            self.eye_tracker.calibration_frames = self.eye_tracker.required_calibration_frames
+            self.eye_tracker.calibrated = True
+
+    def analyze(self, frame, frame_index, timestamp=0.0):
+        frame = cv2.resize(PostureDistanceDetector.fit_aspect(frame), (FRAME_WIDTH, FRAME_HEIGHT))
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        face_landmark_list = self.face_landmarker.process(frame_rgb)
+        face_points = landmarks_to_array(face_landmark_list)
+        eye_result = self.eye_tracker.analyze_landmarks(face_landmark_list, face_points)
+        distance_data = self.distance_estimator.estimate_from_landmarks(face_landmark_list, FRAME_WIDTH, face_points)
+        pose_landmarks = self.posture_analyzer.detect(frame_rgb)
+        pose_points, pose_visibility = landmarks_to_array(pose_landmarks, with_visibility=True)
+        posture_result = self.posture_analyzer.analyze_landmarks(pose_landmarks, FRAME_WIDTH, FRAME_HEIGHT, pose_points)
+        return FrameResult.from_analysis(eye_result, posture_result, distance_data,
+                                         face_points, pose_points, pose_visibility,
+                                         frame_index=frame_index, timestamp=timestamp)
+
+    def close(self):
+        self.posture_analyzer.close()
+        self.face_landmarker.close()
+
+def _calibrate(video_path):
+    """
+    Run the eye tracker's calibration phase from the start of the video.
+
+    Returns:
+        tuple: (EAR threshold, index of the frame that completed calibration),
+        or (None, None) if the video never provides enough face frames
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    face_landmarker = FaceLandmarker()
+    eye_tracker = EyeTracker(face_landmarker)
+    frame_index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return None, None
+            frame = cv2.resize(PostureDistanceDetector.fit_aspect(frame), (FRAME_WIDTH, FRAME_HEIGHT))
+            eye_tracker.analyze(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if eye_tracker.calibrated:
+                return eye_tracker.EAR_THRESHOLD, frame_index
+            frame_index += 1
+    finally:
+        cap.release()
+        face_landmarker.close()
+
+def _process_segment(args):
+    """
+    Analyze frames [start, end) of a video. Runs inside a worker process.
+
+    The segment decodes up to preroll frames before start and discards their
+    results so that the trackers and EAR smoothing are warm at the boundary.
+    """
+    video_path, start, end, preroll, ear_threshold = args
+    first = max(0, start - preroll)
+    cap = cv2.VideoCapture(str(video_path))
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    models = _SegmentModels(ear_threshold)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    results = []
+    try:
+        frame_index = first
+        while end is None or frame_index < end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # Timestamps are the frame's position in the video, in seconds
+            result = models.analyze(frame, frame_index, frame_index / fps)
+            if frame_index >= start:
+                results.append(result)
+            frame_index += 1
+    finally:
+        cap.release()
+        models.close()
+    return results
+
+def _plan_segments(total_frames, segment_frames, calibration_end):
+    """Split [0, total_frames) into ranges; the last range is open-ended (runs to EOF)."""
+    if total_frames <= 0:
+        return [(0, None)]
+    # The first segment calibrates the eye tracker itself, so it must cover the calibration phase
+    first_end = max(segment_frames, (calibration_end or 0) + 1)
+    boundaries = [0] + list(range(first_end, total_frames, segment_frames))
+    return [(start, boundaries[i + 1] if i + 1 < len(boundaries) else None)
+            for i, start in enumerate(boundaries)]
+
+def process_video(video_path, workers=None, segment_frames=BATCH_SEGMENT_FRAMES,
+                  preroll_frames=BATCH_PREROLL_FRAMES):
+    """
+    Analyze a recorded video across a process pool.
+
+    Args:
+        video_path (str): Path of the video file
+        workers (int): Number of worker processes (defaults to the CPU count);
+            1 runs every frame in this process as a single segment
+        segment_frames (int): Number of frames per work unit
+        preroll_frames (int): Frames decoded and discarded before each segment
+            to warm up tracking
+
+    Yields:
+        FrameResult: One result per frame, in frame order
+    """
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        yield from _process_segment((video_path, 0, None, 0, None))
+        return
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    ear_threshold, calibration_end = _calibrate(video_path)
+    segments = _plan_segments(total_frames, segment_frames, calibration_end)
+    logger.info(f"Processing {total_frames} frames in {len(segments)} segments on {workers} workers")
+
+    tasks = [(video_path, start, end, preroll_frames, ear_threshold if start > 0 else None)
+             for start, end in segments]
+    chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        for results in pool.imap(_process_segment, tasks, chunksize=chunksize):
+            yield from results
+
+def process_video_to_file(video_path, output_path, include_landmarks=False, **kwargs):
+    """
+    Analyze a recorded video and write one JSON record per line, in frame order.
+
+    Returns:
+        int: Number of frames written
+    """
+    count = 0
+    with open(output_path, 'w') as f:
+        for result in process_video(video_path, **kwargs):
+            f.write(json.dumps(result.to_dict(include_landmarks)) + '\n')
+            count += 1
+    logger.info(f"Wrote {count} frame results to {output_path}")
+    return count
+
+def process_video_to_trace(video_path, trace_path, half_precision=False, **kwargs):
+    """
+    Analyze a recorded video and write its landmarks to a trace for replay (see eye_test_cv.trace).
+
+    Returns:
+        int: Number of frames written
+    """
+    with TraceRecorder(trace_path, FRAME_WIDTH, FRAME_HEIGHT, half_precision) as recorder:
+        for result in process_video(video_path, **kwargs):
+            recorder.write(result)
+    return recorder.frames_written
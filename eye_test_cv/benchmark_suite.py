@@ -0,0 +1,424 @@
+"""
+Reproducible per-stage benchmark suite.
+Times each stage of the pipeline on its own (capture decode, resize/cvtColor,
+Face Mesh, Pose, EAR, distance, render) and the end-to-end path, on the bundled
+image.jpg and on clips generated deterministically from it. Results are
+warm-up-excluded percentiles written as JSON, and a compare mode flags
+regressions against a stored baseline.
+
+    python -m eye_test_cv.benchmark_suite --output results.json
+    python -m eye_test_cv.benchmark_suite --compare baseline.json
+"""
+
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import tempfile
+from pathlib import Path
+import cv2
+import numpy as np
+import mediapipe as mp
+from eye_test_cv.controller import PostureDistanceDetector, FRAME_WIDTH, FRAME_HEIGHT
+from eye_test_cv.models.face_landmarks import FaceLandmarker
+from eye_test_cv.models.posture import PostureAnalyzer
+from eye_test_cv.models.eye_tracker import EyeTracker
+from eye_test_cv.models.distance import DistanceEstimator
+from eye_test_cv.models.landmarks import landmarks_to_array
+from eye_test_cv.views.display import Display
+from eye_test_cv.profiling import SamplingProfiler
+from eye_test_cv.config.settings import (
+    FOCAL_LENGTH_PX, FOCAL_LENGTH_35MM, SENSOR_WIDTH_35MM, BENCHMARK_WARMUP,
+    BENCHMARK_ITERATIONS, BENCHMARK_REGRESSION_THRESHOLD, BENCHMARK_MIN_DELTA_MS
+)
+
+logger = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+IMAGE_PATH = Path(__file__).parent / 'test_data' / 'image.jpg'
+# Head and shoulders in image.jpg (x, y, width, height); Face Mesh misses the face in the full scene
+SUBJECT_REGION = (361, 46, 360, 270)
+# Generated clips: the processing size (decoded as is) and a 4:3 camera size (resized)
+CLIP_SIZES = {'clip_640x480': (640, 480), 'clip_1280x960': (1280, 960)}
+# Distinct decoded frames kept in memory for the model stages, cycled in order
+MODEL_FRAMES = 30
+COMPARED_STATS = ('p50_ms', 'p95_ms')
+
+def generate_clip(path, size, frame_count, image_path=IMAGE_PATH, region=SUBJECT_REGION, fps=30):
+    """
+    Write a deterministic clip: a slow pan and zoom over a region of image.jpg, MJPG-encoded.
+
+    The same arguments always produce the same frames, so decode and model
+    timings are comparable across runs and machines.
+
+    Returns:
+        Path: The clip path
+    """
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise ValueError(f"Could not read benchmark image: {image_path}")
+    if region:
+        x, y, region_width, region_height = region
+        image = image[y:y + region_height, x:x + region_width]
+    image = PostureDistanceDetector.fit_aspect(image)
+    height, width = image.shape[:2]
+    out_width, out_height = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (out_width, out_height))
+    try:
+        for i in range(frame_count):
+            phase = 2 * np.pi * i / 90
+            zoom = 1.0 + 0.1 * (1 - np.cos(phase)) / 2
+            shift_x = 0.03 * width * np.sin(phase)
+            shift_y = 0.02 * height * np.sin(2 * phase)
+            scale = zoom * out_width / width
+            matrix = np.float32([[scale, 0, out_width / 2 - scale * (width / 2 + shift_x)],
+                                 [0, scale, out_height / 2 - scale * (height / 2 + shift_y)]])
+            writer.write(cv2.warpAffine(image, matrix, (out_width, out_height), borderMode=cv2.BORDER_REFLECT))
+    finally:
+        writer.release()
+    return Path(path)
+
+def _read_frames(path, count):
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+def summarize(samples_ns):
+    """Percentiles, mean, min and max (ms) of per-iteration durations in nanoseconds."""
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'mean_ms': float(samples.mean()),
+        'min_ms': float(samples.min()),
+        'max_ms': float(samples.max()),
+        'samples': len(samples)
+    }
+
+class BenchmarkSuite:
+    """
+    Runs every stage benchmark and collects the results.
+
+    Each stage is a callable taking the iteration index; warmup iterations run
+    first and are not timed, then iterations are timed individually with
+    perf_counter_ns.
+
+    Attributes:
+        warmup (int): Untimed iterations per stage
+        iterations (int): Timed iterations per stage
+        data_dir (Path): Directory holding the generated clips
+        profile_dir (Path): If set, each stage is sampled by a SamplingProfiler and its
+            collapsed stacks written to <stage>.collapsed here
+    """
+
+    def __init__(self, warmup=BENCHMARK_WARMUP, iterations=BENCHMARK_ITERATIONS, data_dir=None, profile_dir=None):
+        self.warmup = warmup
+        self.iterations = iterations
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self._temp_dir = None
+        if data_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='eye_test_cv_bench_')
+            data_dir = self._temp_dir.name
+        self.data_dir = Path(data_dir)
+        self.clips = {}
+
+    def _time(self, stage):
+        for i in range(self.warmup):
+            stage(i)
+        samples = np.empty(self.iterations, dtype=np.int64)
+        for i in range(self.iterations):
+            start = time.perf_counter_ns()
+            stage(self.warmup + i)
+            samples[i] = time.perf_counter_ns() - start
+        return summarize(samples)
+
+    def prepare(self):
+        """Generate the clips (reused if already present in data_dir)."""
+        frame_count = self.warmup + self.iterations
+        for name, size in CLIP_SIZES.items():
+            path = self.data_dir / f"{name}_{frame_count}.avi"
+            if not path.exists():
+                logger.info(f"Generating {path.name}")
+                generate_clip(path, size, frame_count)
+            self.clips[name] = path
+
+    def run(self, stages=None):
+        """
+        Run the stage benchmarks.
+
+        Args:
+            stages (list): Names of the stages to run, or None for all
+
+        Returns:
+            dict: JSON-serializable results with 'version', 'environment', 'config' and 'stages'
+        """
+        self.prepare()
+        benchmarks = {
+            'capture_decode': self._bench_capture_decode,
+            'capture_decode_hd': self._bench_capture_decode_hd,
+            'resize_cvtcolor': self._bench_preprocess,
+            'face_mesh': self._bench_face_mesh,
+            'pose': self._bench_pose,
+            'ear': self._bench_ear,
+            'distance': self._bench_distance,
+            'render': self._bench_render,
+            'end_to_end': self._bench_end_to_end,
+            'end_to_end_image': self._bench_end_to_end_image
+        }
+        results = {}
+        for name, benchmark in benchmarks.items():
+            if stages and name not in stages:
+                continue
+            profiler = SamplingProfiler() if self.profile_dir else None
+            if profiler:
+                profiler.start()
+            try:
+                results[name] = benchmark()
+            finally:
+                if profiler:
+                    profiler.stop()
+                    profiler.write_collapsed(self.profile_dir / f"{name}.collapsed")
+            logger.info(f"{name}: p50 {results[name]['p50_ms']:.2f}ms, p95 {results[name]['p95_ms']:.2f}ms, "
+                        f"p99 {results[name]['p99_ms']:.2f}ms")
+        return {
+            'version': RESULTS_VERSION,
+            'environment': self.environment(),
+            'config': {'warmup': self.warmup, 'iterations': self.iterations},
+            'stages': results
+        }
+
+    @staticmethod
+    def environment():
+        """Versions and host details that results depend on."""
+        return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'opencv': cv2.__version__,
+            'mediapipe': mp.__version__,
+            'numpy': np.__version__
+        }
+
+    def close(self):
+        if self._temp_dir:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+    # Inputs shared by the model stages
+
+    def _model_frames(self):
+        """The first MODEL_FRAMES frames of the 640x480 clip as RGB."""
+        frames = _read_frames(self.clips['clip_640x480'], MODEL_FRAMES)
+        return [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+
+    def _face_inputs(self):
+        """(landmark list, points) of every model frame with a face."""
+        landmarker = FaceLandmarker()
+        try:
+            inputs = []
+            for frame_rgb in self._model_frames():
+                landmark_list = landmarker.process(frame_rgb)
+                if landmark_list is not None:
+                    inputs.append((landmark_list, landmarks_to_array(landmark_list)))
+        finally:
+            landmarker.close()
+        if not inputs:
+            raise ValueError("No face found in the benchmark clip")
+        return inputs
+
+    # Stages
+
+    def _bench_decode(self, clip):
+        cap = cv2.VideoCapture(str(self.clips[clip]))
+        try:
+            return self._time(lambda i: cap.read())
+        finally:
+            cap.release()
+
+    def _bench_capture_decode(self):
+        return self._bench_decode('clip_640x480')
+
+    def _bench_capture_decode_hd(self):
+        return self._bench_decode('clip_1280x960')
+
+    def _bench_preprocess(self):
+        frames = _read_frames(self.clips['clip_1280x960'], 8)
+        detector = PostureDistanceDetector(headless=True)
+        try:
+            return self._time(lambda i: detector.preprocess_frame(frames[i % len(frames)]))
+        finally:
+            detector.cleanup()
+
+    def _bench_face_mesh(self):
+        frames = self._model_frames()
+        landmarker = FaceLandmarker()
+        try:
+            return self._time(lambda i: landmarker.process(frames[i % len(frames)]))
+        finally:
+            landmarker.close()
+
+    def _bench_pose(self):
+        frames = self._model_frames()
+        analyzer = PostureAnalyzer()
+        try:
+            return self._time(lambda i: analyzer.detect(frames[i % len(frames)]))
+        finally:
+            analyzer.close()
+
+    def _bench_ear(self):
+        inputs = self._face_inputs()
+        tracker = EyeTracker()
+        return self._time(lambda i: tracker.calculate_ears(inputs[i % len(inputs)][1]))
+
+    def _bench_distance(self):
+        inputs = self._face_inputs()
+        estimator = DistanceEstimator()
+        estimator.set_focal_length(FOCAL_LENGTH_PX)
+
+        def stage(i):
+            landmark_list, points = inputs[i % len(inputs)]
+            estimator.estimate_from_landmarks(landmark_list, FRAME_WIDTH, points)
+        return self._time(stage)
+
+    def _bench_render(self):
+        image = _read_frames(self.clips['clip_640x480'], 1)[0]
+        detector = PostureDistanceDetector(headless=True)
+        try:
+            result = detector.run_single_frame(image)
+        finally:
+            detector.cleanup()
+        display = Display()
+        camera_specs = {'focal_length': FOCAL_LENGTH_35MM, 'sensor_width': SENSOR_WIDTH_35MM}
+        canvas = np.empty_like(image)
+
+        def stage(i):
+            np.copyto(canvas, image)
+            display.draw(canvas, result, camera_specs)
+        return self._time(stage)
+
+    def _bench_end_to_end(self):
+        """Decode, preprocess, analyze and draw each frame of the 1280x960 clip."""
+        cap = cv2.VideoCapture(str(self.clips['clip_1280x960']))
+        detector = PostureDistanceDetector(headless=True)
+        detector.distance_estimator.set_focal_length(FOCAL_LENGTH_PX)
+        display = Display()
+        camera_specs = {'focal_length': FOCAL_LENGTH_35MM, 'sensor_width': SENSOR_WIDTH_35MM}
+
+        def stage(i):
+            ret, frame = cap.read()
+            frame, frame_rgb = detector.preprocess_frame(frame)
+            display.draw(frame, detector.analyze_frame(frame_rgb), camera_specs)
+        try:
+            return self._time(stage)
+        finally:
+            cap.release()
+            detector.cleanup()
+
+    def _bench_end_to_end_image(self):
+        """run_single_frame() on image.jpg, repeated."""
+        image = cv2.imread(str(IMAGE_PATH))
+        detector = PostureDistanceDetector(headless=True)
+        detector.distance_estimator.set_focal_length(FOCAL_LENGTH_PX)
+        try:
+            return self._time(lambda i: detector.run_single_frame(image))
+        finally:
+            detector.cleanup()
+
+def compare_results(current, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD,
+                    min_delta_ms=BENCHMARK_MIN_DELTA_MS, stats=COMPARED_STATS):
+    """
+    Compare two result sets stage by stage.
+
+    A statistic regresses when it is more than threshold (relative) and more than
+    min_delta_ms (absolute) slower than the baseline.
+
+    Returns:
+        list: One dict per compared statistic with 'stage', 'stat', 'baseline', 'current',
+        'change' (relative) and 'regression' keys
+    """
+    rows = []
+    for stage, baseline_stats in baseline.get('stages', {}).items():
+        current_stats = current.get('stages', {}).get(stage)
+        if current_stats is None:
+            continue
+        for stat in stats:
+            old, new = baseline_stats[stat], current_stats[stat]
+            change = (new - old) / old if old > 0 else 0.0
+            rows.append({
+                'stage': stage,
+                'stat': stat,
+                'baseline': old,
+                'current': new,
+                'change': change,
+                'regression': change > threshold and new - old > min_delta_ms
+            })
+    return rows
+
+def _log_comparison(rows, baseline):
+    if baseline.get('environment') != BenchmarkSuite.environment():
+        logger.warning("Baseline was recorded in a different environment; differences may not be regressions")
+    for row in rows:
+        flag = "REGRESSION" if row['regression'] else ""
+        logger.info(f"{row['stage']:>18} {row['stat']}: {row['baseline']:8.2f} -> {row['current']:8.2f}ms "
+                    f"({row['change'] * 100:+.1f}%) {flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks for eye_test_cv")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON to check the results against; exits 1 on regressions")
+    parser.add_argument('--current', help="Compare this results JSON instead of running the benchmarks")
+    parser.add_argument('--stages', nargs='+', help="Only run these stages")
+    parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP)
+    parser.add_argument('--iterations', type=int, default=BENCHMARK_ITERATIONS)
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                        help="Relative slowdown flagged as a regression")
+    parser.add_argument('--data-dir', help="Keep generated clips here between runs")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="Write a collapsed-stack profile of each stage here (sampling adds some overhead)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        if args.data_dir:
+            Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+        suite = BenchmarkSuite(args.warmup, args.iterations, args.data_dir, args.profile)
+        try:
+            results = suite.run(args.stages)
+        finally:
+            suite.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_results(results, baseline, args.threshold)
+        _log_comparison(rows, baseline)
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            logger.error(f"{len(regressions)} regression(s) against {args.compare}")
+            return 1
+        logger.info(f"No regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
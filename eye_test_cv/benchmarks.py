@@ -1,9 +1,12 @@
 import time
 import psutil
+import threading
 import numpy as np
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
 import logging
+from eye_test_cv.config.settings import RESOURCE_SAMPLE_INTERVAL, RESOURCE_SAMPLE_CAPACITY
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +16,160 @@ class SystemMetrics:
     memory_percent: float
     gpu_utilization: Optional[float]
     io_counters: Dict[str, int]
+    rss_bytes: int = 0
+    thread_cpu: Dict[str, float] = field(default_factory=dict)
+    timestamp: float = 0.0
 
 @dataclass
 class ModelMetrics:
+    """Model performance of one frame; fields left None were not measured."""
     inference_time: float
     detection_accuracy: float
-    false_positive_rate: float
-    false_negative_rate: float
-    calibration_error: float
+    false_positive_rate: Optional[float]
+    false_negative_rate: Optional[float]
+    calibration_error: Optional[float]
 
 @dataclass
 class RealTimeMetrics:
+    """Real-time performance of one frame; fields left None were not measured."""
     frame_drop_rate: float
-    processing_queue_length: int
-    buffer_utilization: float
-    end_to_end_latency: float
+    processing_queue_length: Optional[int]
+    buffer_utilization: Optional[float]
+    end_to_end_latency: Optional[float]
+
+def _measured_mean(values):
+    """Mean of the values that were measured, or None if none was."""
+    measured = [value for value in values if value is not None]
+    return float(np.mean(measured)) if measured else None
+
+def _format_measured(value, spec, unit=''):
+    return f"{value:{spec}}{unit}" if value is not None else "not measured"
+
+class ResourceSampler:
+    """
+    Samples this process's resource usage on a background thread at a fixed rate.
+
+    Samples go into a ring buffer and are matched to frame timestamps after the
+    run (see align()), so the measured loop never calls psutil. CPU figures are
+    non-blocking deltas since the previous sample, in percent of one core.
+
+    Attributes:
+        interval (float): Seconds between samples
+        dropped (int): Samples pushed out of the full ring buffer
+    """
+
+    def __init__(self, interval: float = RESOURCE_SAMPLE_INTERVAL, capacity: int = RESOURCE_SAMPLE_CAPACITY):
+        self.interval = interval
+        self.dropped = 0
+        self._process = psutil.Process()
+        self._samples = deque(maxlen=capacity)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._thread_times = {}
+        self._last_sample_time = None
+
+    def start(self):
+        """Start sampling; the first sample is taken one interval from now."""
+        # Prime the CPU deltas so the first sample covers one interval
+        self._process.cpu_percent(interval=None)
+        self._thread_times = self._read_thread_times()
+        self._last_sample_time = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ResourceSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, taking one last sample so the end of the run is covered."""
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+            self._append(self.sample())
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        # Scheduled on a fixed grid so slow samples do not stretch the interval
+        next_time = time.perf_counter() + self.interval
+        while not self._stop_event.wait(max(0.0, next_time - time.perf_counter())):
+            self._append(self.sample())
+            next_time += self.interval
+
+    def _append(self, sample):
+        if len(self._samples) == self._samples.maxlen:
+            self.dropped += 1
+        self._samples.append(sample)
+
+    def _read_thread_times(self):
+        try:
+            return {thread.id: thread.user_time + thread.system_time for thread in self._process.threads()}
+        except psutil.Error:
+            return {}
+
+    def sample(self) -> SystemMetrics:
+        """Take one sample now (also usable without the background thread)."""
+        timestamp = time.time()
+        with self._process.oneshot():
+            cpu_percent = self._process.cpu_percent(interval=None)
+            memory_info = self._process.memory_info()
+            memory_percent = self._process.memory_percent()
+            try:
+                io_counters = self._process.io_counters()._asdict()
+            except (AttributeError, psutil.Error):
+                # Not available on every platform
+                io_counters = {}
+
+        # Per-thread CPU over the interval, keyed by Python thread name where there is one
+        thread_times = self._read_thread_times()
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        elapsed = timestamp - self._last_sample_time if self._last_sample_time else 0.0
+        thread_cpu = {}
+        if elapsed > 0:
+            for thread_id, cpu_time in thread_times.items():
+                delta = cpu_time - self._thread_times.get(thread_id, cpu_time)
+                thread_cpu[names.get(thread_id, str(thread_id))] = delta / elapsed * 100
+        self._thread_times = thread_times
+        self._last_sample_time = timestamp
+
+        return SystemMetrics(
+            cpu_percent=cpu_percent,
+            memory_percent=memory_percent,
+            gpu_utilization=None,
+            io_counters=io_counters,
+            rss_bytes=memory_info.rss,
+            thread_cpu=thread_cpu,
+            timestamp=timestamp
+        )
+
+    def samples(self) -> List[SystemMetrics]:
+        """All buffered samples, oldest first."""
+        return list(self._samples)
+
+    def latest(self) -> Optional[SystemMetrics]:
+        """The most recent sample, or None before the first one."""
+        return self._samples[-1] if self._samples else None
+
+    def align(self, timestamps: Sequence[float]) -> List[SystemMetrics]:
+        """
+        Match each time.time() timestamp to the sample whose interval contains it.
+
+        A sample covers the time since the previous one, so each timestamp gets
+        the first sample taken at or after it (the last sample for later ones).
+
+        Returns:
+            list: One SystemMetrics per timestamp (empty if there are no samples)
+        """
+        samples = self.samples()
+        if not samples:
+            return []
+        sample_times = np.array([sample.timestamp for sample in samples])
+        indices = np.minimum(np.searchsorted(sample_times, timestamps, side='left'), len(samples) - 1)
+        return [samples[i] for i in indices]
 
 class PerformanceBenchmark:
     def __init__(self, window_size: int = 100):
@@ -35,46 +177,71 @@ class PerformanceBenchmark:
         self.system_metrics_history: List[SystemMetrics] = []
         self.model_metrics_history: List[ModelMetrics] = []
         self.realtime_metrics_history: List[RealTimeMetrics] = []
-        
-    def measure_system_resources(self) -> SystemMetrics:
-        """Measure current system resource utilization."""
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory_percent = psutil.Process().memory_percent()
-        
-        # GPU measurement would go here if GPU is used
-        gpu_utilization = None
-        
-        io_counters = psutil.Process().io_counters()._asdict()
-        
-        metrics = SystemMetrics(
-            cpu_percent=cpu_percent,
-            memory_percent=memory_percent,
-            gpu_utilization=gpu_utilization,
-            io_counters=io_counters
-        )
-        
+        self.sampler: Optional[ResourceSampler] = None
+        self._direct_sampler: Optional[ResourceSampler] = None
+
+    def start_resource_sampling(self, interval: float = RESOURCE_SAMPLE_INTERVAL):
+        """Start a background ResourceSampler for the run about to be measured."""
+        self.stop_resource_sampling()
+        self.sampler = ResourceSampler(interval)
+        self.sampler.start()
+
+    def stop_resource_sampling(self, frame_timestamps: Optional[Sequence[float]] = None) -> List[SystemMetrics]:
+        """
+        Stop the background sampler and add its samples, aligned to frame_timestamps, to the history.
+
+        Args:
+            frame_timestamps: time.time() value of each measured frame
+
+        Returns:
+            list: The SystemMetrics matched to each frame
+        """
+        if self.sampler is None:
+            return []
+        self.sampler.stop()
+        aligned = self.sampler.align(frame_timestamps) if frame_timestamps is not None else []
+        if self.sampler.dropped:
+            logger.warning(f"Resource sampler ring buffer overflowed, {self.sampler.dropped} samples lost")
+        self.sampler = None
+        for metrics in aligned:
+            self._add_system_metrics(metrics)
+        return aligned
+
+    def _add_system_metrics(self, metrics: SystemMetrics):
         self.system_metrics_history.append(metrics)
         if len(self.system_metrics_history) > self.window_size:
             self.system_metrics_history.pop(0)
-            
+
+    def measure_system_resources(self) -> SystemMetrics:
+        """Record current system resource utilization without blocking.
+
+        Uses the background sampler's latest sample while one is running,
+        otherwise samples directly (CPU is then measured since the previous call).
+        """
+        metrics = self.sampler.latest() if self.sampler else None
+        if metrics is None:
+            if self._direct_sampler is None:
+                self._direct_sampler = ResourceSampler()
+            metrics = self._direct_sampler.sample()
+        self._add_system_metrics(metrics)
         return metrics
     
     def measure_model_performance(
         self, 
         inference_time: float,
         true_positives: int,
-        false_positives: int,
-        false_negatives: int,
-        calibration_error: float
+        false_positives: Optional[int] = None,
+        false_negatives: Optional[int] = None,
+        calibration_error: Optional[float] = None
     ) -> ModelMetrics:
-        """Measure model performance metrics."""
-        total = true_positives + false_positives + false_negatives
+        """Measure model performance metrics; counts that need ground truth may be left out (None)."""
+        total = true_positives + (false_positives or 0) + (false_negatives or 0)
         
         metrics = ModelMetrics(
             inference_time=inference_time,
             detection_accuracy=(true_positives / total) if total > 0 else 0,
-            false_positive_rate=(false_positives / total) if total > 0 else 0,
-            false_negative_rate=(false_negatives / total) if total > 0 else 0,
+            false_positive_rate=((false_positives / total) if total > 0 else 0) if false_positives is not None else None,
+            false_negative_rate=((false_negatives / total) if total > 0 else 0) if false_negatives is not None else None,
             calibration_error=calibration_error
         )
         
@@ -88,18 +255,24 @@ class PerformanceBenchmark:
         self,
         total_frames: int,
         dropped_frames: int,
-        queue_length: int,
-        buffer_size: int,
-        buffer_used: int,
-        start_time: float,
-        end_time: float
+        queue_length: Optional[int] = None,
+        buffer_size: Optional[int] = None,
+        buffer_used: Optional[int] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None
     ) -> RealTimeMetrics:
-        """Measure real-time performance metrics."""
+        """Measure real-time performance metrics; queue and buffer figures only apply to queued execution."""
+        buffer_utilization = None
+        if buffer_size is not None and buffer_used is not None:
+            buffer_utilization = (buffer_used / buffer_size) if buffer_size > 0 else 0
+        end_to_end_latency = None
+        if start_time is not None and end_time is not None:
+            end_to_end_latency = (end_time - start_time) * 1000  # Convert to ms
         metrics = RealTimeMetrics(
             frame_drop_rate=(dropped_frames / total_frames) if total_frames > 0 else 0,
             processing_queue_length=queue_length,
-            buffer_utilization=(buffer_used / buffer_size) if buffer_size > 0 else 0,
-            end_to_end_latency=(end_time - start_time) * 1000  # Convert to ms
+            buffer_utilization=buffer_utilization,
+            end_to_end_latency=end_to_end_latency
         )
         
         self.realtime_metrics_history.append(metrics)
@@ -117,28 +290,33 @@ class PerformanceBenchmark:
         
         # System metrics averages
         sys_metrics = np.mean([
-            [m.cpu_percent, m.memory_percent] 
+            [m.cpu_percent, m.memory_percent, m.rss_bytes]
             for m in self.system_metrics_history
         ], axis=0)
+
+        # Per-thread CPU averages, over the samples each thread appears in
+        thread_cpu = {}
+        for m in self.system_metrics_history:
+            for name, percent in m.thread_cpu.items():
+                thread_cpu.setdefault(name, []).append(percent)
         
-        # Model metrics averages
-        model_metrics = np.mean([
-            [m.inference_time, m.detection_accuracy, 
-             m.false_positive_rate, m.false_negative_rate,
-             m.calibration_error]
-            for m in self.model_metrics_history
-        ], axis=0)
-        
-        # Real-time metrics averages
-        rt_metrics = np.mean([
-            [m.frame_drop_rate, m.processing_queue_length,
-             m.buffer_utilization, m.end_to_end_latency]
-            for m in self.realtime_metrics_history
-        ], axis=0)
+        # Model and real-time metrics averages; None where nothing was measured
+        model_metrics = [
+            _measured_mean([getattr(m, name) for m in self.model_metrics_history])
+            for name in ('inference_time', 'detection_accuracy', 'false_positive_rate',
+                         'false_negative_rate', 'calibration_error')
+        ]
+        rt_metrics = [
+            _measured_mean([getattr(m, name) for m in self.realtime_metrics_history])
+            for name in ('frame_drop_rate', 'processing_queue_length',
+                         'buffer_utilization', 'end_to_end_latency')
+        ]
         
         return {
             "avg_cpu_percent": sys_metrics[0],
             "avg_memory_percent": sys_metrics[1],
+            "avg_rss_mb": sys_metrics[2] / (1024 * 1024),
+            "avg_thread_cpu": {name: float(np.mean(values)) for name, values in thread_cpu.items()},
             "avg_inference_time": model_metrics[0],
             "avg_detection_accuracy": model_metrics[1],
             "avg_false_positive_rate": model_metrics[2],
@@ -162,17 +340,20 @@ class PerformanceBenchmark:
         
         logger.info("\nSystem Metrics:")
         logger.info(f"CPU Usage: {summary['avg_cpu_percent']:.1f}%")
-        logger.info(f"Memory Usage: {summary['avg_memory_percent']:.1f}%")
+        logger.info(f"Memory Usage: {summary['avg_memory_percent']:.1f}% ({summary['avg_rss_mb']:.0f} MB RSS)")
+        busy_threads = sorted(summary['avg_thread_cpu'].items(), key=lambda item: -item[1])[:5]
+        for name, percent in busy_threads:
+            logger.info(f"  Thread {name}: {percent:.1f}% CPU")
         
         logger.info("\nModel Performance:")
         logger.info(f"Inference Time: {summary['avg_inference_time']:.2f}ms")
         logger.info(f"Detection Accuracy: {summary['avg_detection_accuracy']:.1f}%")
-        logger.info(f"False Positive Rate: {summary['avg_false_positive_rate']:.1f}%")
-        logger.info(f"False Negative Rate: {summary['avg_false_negative_rate']:.1f}%")
-        logger.info(f"Calibration Error: {summary['avg_calibration_error']:.2f}")
+        logger.info(f"False Positive Rate: {_format_measured(summary['avg_false_positive_rate'], '.1f', '%')}")
+        logger.info(f"False Negative Rate: {_format_measured(summary['avg_false_negative_rate'], '.1f', '%')}")
+        logger.info(f"Calibration Error: {_format_measured(summary['avg_calibration_error'], '.2f')}")
         
         logger.info("\nReal-time Performance:")
         logger.info(f"Frame Drop Rate: {summary['avg_frame_drop_rate']:.1f}%")
-        logger.info(f"Avg Queue Length: {summary['avg_queue_length']:.1f}")
-        logger.info(f"Buffer Utilization: {summary['avg_buffer_utilization']:.1f}%")
-        logger.info(f"End-to-end Latency: {summary['avg_end_to_end_latency']:.2f}ms") 
\ No newline at end of file
+        logger.info(f"Avg Queue Length: {_format_measured(summary['avg_queue_length'], '.1f')}")
+        logger.info(f"Buffer Utilization: {_format_measured(summary['avg_buffer_utilization'], '.1f', '%')}")
+        logger.info(f"End-to-end Latency: {_format_measured(summary['avg_end_to_end_latency'], '.2f', 'ms')}") 
\ No newline at end of file
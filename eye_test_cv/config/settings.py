@@ -19,4 +19,86 @@ MAX_DISTANCE_CM = 155
 # Camera settings
 DROIDCAM_URL = "http://192.168.50.28:4747/video"
 MAX_CAMERA_ATTEMPTS = 3
-CAMERA_BUFFER_SIZE = 1
\ No newline at end of file
+CAMERA_BUFFER_SIZE = 1
+CAMERA_READ_TIMEOUT = 10.0  # Seconds a threaded read waits for a new frame; network sources can stall
+
+# Pipelined execution settings
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_BACKPRESSURE = 'drop_oldest'  # 'drop_oldest' or 'block'
+
+# Offline batch processing settings
+BATCH_SEGMENT_FRAMES = 900  # Frames per worker task (30s at 30 FPS)
+BATCH_PREROLL_FRAMES = 15   # Frames decoded before each segment to warm up tracking
+
+# Inference scheduling: run each analyzer every N-th frame, reusing its last result in between
+INFERENCE_INTERVALS = {'eyes': 1, 'distance': 1, 'pose': 1}
+MOTION_TRIGGER_THRESHOLD = 0.01  # Mean face landmark displacement that forces a fresh run
+
+# ROI tracking: crop inference to a padded box around the previous frame's landmarks
+ROI_FACE_PADDING = 0.5         # Fraction of the face box added on each side
+ROI_POSE_PADDING = 0.25        # Fraction of the visible body box added on each side
+ROI_MIN_SIZE = 96              # Minimum crop side in pixels
+ROI_MAX_AREA_FRACTION = 0.6    # Crops larger than this fraction of the frame use the full frame
+
+# Motion gating: skip inference while consecutive frames are nearly identical
+MOTION_GATE_THRESHOLD = 3.0        # Largest block mean gray-level difference treated as static
+MOTION_GATE_MAX_STALE_FRAMES = 15  # Force a refresh after this many skipped frames
+MOTION_GATE_SIZE = (160, 120)      # Downscaled frame size used for the comparison
+MOTION_GATE_GRID = (16, 12)        # Blocks the difference is averaged over
+
+# Landmark traces
+TRACE_FACE_LANDMARKS = 478  # Refined Face Mesh
+TRACE_POSE_LANDMARKS = 33
+
+# Span tracing (PostureDistanceDetector.start_span_trace)
+SPAN_TRACE_CAPACITY = 65536  # Spans kept in the ring buffer, about 10 per frame
+
+# Sampling profiler (PostureDistanceDetector.start_profiling, SIGUSR1)
+PROFILE_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples
+PROFILE_OUTPUT_DIR = 'profiles' # Where profiles are written when no path is given
+
+# Calibration profiles (PostureDistanceDetector calibration_profiles)
+CALIBRATION_PROFILE_PATH = '~/.eye_test_cv/calibration_profiles.json'
+CALIBRATION_PROFILE_MAX_AGE = 7 * 24 * 3600  # Seconds before a stored EAR baseline is re-measured while tracking
+
+# Display settings
+DISPLAY_DETAIL = 'mesh'        # 'mesh', 'contours', 'keypoints' or 'none'
+DISPLAY_MAX_FPS = None         # Render rate cap, independent of inference; None renders every frame
+METRICS_PANEL_INTERVAL = 0.5   # Seconds between refreshes of the on-screen metrics panel
+METRICS_WINDOW_SECONDS = 5.0   # Length of one interval of the windowed latency histograms
+
+# OpenMetrics exporter (PostureDistanceDetector.start_exporter)
+METRICS_EXPORTER_HOST = '127.0.0.1'  # Local only by default
+METRICS_EXPORTER_PORT = 9464
+METRICS_EXPORTER_BUCKETS_MS = (1, 2.5, 5, 10, 16, 25, 33, 50, 66, 100, 250, 500, 1000)
+
+# Capture modes tried, closest to the processing size first, when Camera is given a capture_size
+CAPTURE_MODES = [(640, 480), (800, 600), (960, 720), (1280, 960), (640, 360), (1280, 720), (1920, 1080)]
+
+# Multi-stream supervisor
+MULTISTREAM_MAX_RESTARTS = 5       # Restarts of a failed stream before it is given up
+MULTISTREAM_RESTART_DELAY = 2.0    # Seconds before restarting a failed stream
+MULTISTREAM_METRICS_INTERVAL = 30  # Frames between metrics reports from each stream
+
+# Quality governor: tiers from best quality to fastest, stepped through to meet a latency budget
+QUALITY_TIERS = [
+    {'name': 'full', 'pose_complexity': 1, 'refine_landmarks': True, 'resolution': (640, 480)},
+    {'name': 'lite-pose', 'pose_complexity': 0, 'refine_landmarks': True, 'resolution': (640, 480)},
+    {'name': 'no-iris', 'pose_complexity': 0, 'refine_landmarks': False, 'resolution': (640, 480)},
+    {'name': '480x360', 'pose_complexity': 0, 'refine_landmarks': False, 'resolution': (480, 360)},
+    {'name': '320x240', 'pose_complexity': 0, 'refine_landmarks': False, 'resolution': (320, 240)},
+]
+GOVERNOR_WINDOW = 30             # Frames of 'total' latency averaged per decision
+GOVERNOR_DOWNGRADE_RATIO = 1.0   # Step down when mean latency exceeds this fraction of the budget
+GOVERNOR_UPGRADE_RATIO = 0.7     # Step up when mean latency is below this fraction of the budget
+GOVERNOR_HOLD_FRAMES = 60        # Minimum frames between tier changes
+
+# Benchmark suite (python -m eye_test_cv.benchmark_suite)
+BENCHMARK_WARMUP = 20                  # Iterations per stage excluded from the statistics
+BENCHMARK_ITERATIONS = 200             # Timed iterations per stage
+BENCHMARK_REGRESSION_THRESHOLD = 0.10  # Relative slowdown of p50/p95 flagged as a regression
+BENCHMARK_MIN_DELTA_MS = 0.05          # Smaller absolute slowdowns are treated as noise
+
+# Background resource sampling for PerformanceBenchmark
+RESOURCE_SAMPLE_INTERVAL = 0.1   # Seconds between samples
+RESOURCE_SAMPLE_CAPACITY = 6000  # Samples kept in the ring buffer (10 minutes at 10 Hz)
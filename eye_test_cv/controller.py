@@ -1,15 +1,38 @@
+import os
 import time
+import signal
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from eye_test_cv.models.camera import Camera
-from eye_test_cv.models.posture import PostureAnalyzer
+from eye_test_cv.models.posture import PostureAnalyzer, mp_pose
 from eye_test_cv.models.distance import DistanceEstimator
 from eye_test_cv.models.eye_tracker import EyeTracker
+from eye_test_cv.models.face_landmarks import FaceLandmarker, mp_face_mesh
+from eye_test_cv.models.landmarks import landmarks_to_array
+from eye_test_cv.models.frame_result import FrameResult
+from eye_test_cv.models.roi import RoiTracker
+from eye_test_cv.models.motion import MotionGate
+from eye_test_cv.models.frame_buffers import FrameRing
 from eye_test_cv.models.metrics import PerformanceMetrics
-from eye_test_cv.views.display import Display
+from eye_test_cv.models.calibration_profiles import CalibrationStore
+from eye_test_cv.views.display import Display, HeadlessDisplay, DETAIL_CONTOURS, DETAIL_KEYPOINTS
+from eye_test_cv.pipeline import PipelinedExecutor
+from eye_test_cv.streaming import stream_results
+from eye_test_cv.scheduler import InferenceScheduler, EYES, DISTANCE, POSE
+from eye_test_cv.trace import TraceRecorder
+from eye_test_cv.governor import QualityGovernor
+from eye_test_cv.exporter import MetricsExporter
+from eye_test_cv.spans import SpanTracer
+from eye_test_cv.profiling import SamplingProfiler
+from eye_test_cv.startup import StartupTimer, warm_up_models
 import cv2
 from eye_test_cv.config.settings import (
     FOCAL_LENGTH_35MM, SENSOR_WIDTH_35MM, IMAGE_WIDTH_PX,
-    KNOWN_FACE_WIDTH, FOCAL_LENGTH_PX
+    KNOWN_FACE_WIDTH, FOCAL_LENGTH_PX, ROI_FACE_PADDING, ROI_POSE_PADDING,
+    DISPLAY_DETAIL, DISPLAY_MAX_FPS, METRICS_PANEL_INTERVAL,
+    METRICS_EXPORTER_HOST, METRICS_EXPORTER_PORT, SPAN_TRACE_CAPACITY,
+    PROFILE_SAMPLE_INTERVAL, PROFILE_OUTPUT_DIR
 )
 
 FRAME_WIDTH = 640
@@ -34,11 +57,25 @@ class PostureDistanceDetector:
         cls._metrics_enabled = True
         logger.info("Detailed metrics enabled")
 
-    def __init__(self, auto_calibrate=False, gender='average', face_width=None, camera_source=0):
-        self.camera = Camera(camera_source)
+    def __init__(self, auto_calibrate=False, gender='average', face_width=None, camera_source=0,
+                 threaded_capture=False, parallel_models=False, inference_intervals=None,
+                 roi_tracking=False, motion_gating=False, headless=False, result_callback=None,
+                 result_queue=None, display_detail=DISPLAY_DETAIL, max_render_fps=DISPLAY_MAX_FPS,
+                 target_fps=None, calibration_profiles=None, subject=None):
+        # Startup phases from here to the first result, see get_startup_report()
+        self.startup = StartupTimer()
+
+        # Capture at the processing size when the device allows it; ROI tracking wants the full resolution
+        self.camera = Camera(camera_source, threaded=threaded_capture,
+                             capture_size=None if roi_tracking else (FRAME_WIDTH, FRAME_HEIGHT))
         self.posture_analyzer = PostureAnalyzer()
-        self.eye_tracker = EyeTracker()
-        self.display = Display()
+        # One Face Mesh graph per frame, shared by eye tracking and distance estimation
+        self.face_landmarker = FaceLandmarker()
+        self.eye_tracker = EyeTracker(self.face_landmarker)
+        # Headless runs open no window; results go to result_callback / result_queue instead
+        self.headless = headless
+        self.display = (HeadlessDisplay(result_callback, result_queue) if headless
+                        else Display(detail=display_detail, max_fps=max_render_fps))
         
         # Initialize metrics based on class setting
         self.metrics = PerformanceMetrics(detailed=True) if self._metrics_enabled else None
@@ -58,18 +95,77 @@ class PostureDistanceDetector:
         self.auto_calibrate = auto_calibrate
         self.gender = gender
         self.face_width = face_width or KNOWN_FACE_WIDTH
+        # An explicitly given face width wins over a stored one
+        self._face_width_given = face_width is not None
+
+        # Stored focal length, face width and EAR baselines of this camera, resolution and subject;
+        # calibration_profiles is the profile file, or None to always calibrate from scratch
+        self.calibration_store = CalibrationStore(calibration_profiles) if calibration_profiles else None
+        self.subject = subject
 
         
         # Initialize distance estimator
-        self.distance_estimator = DistanceEstimator()
+        self.distance_estimator = DistanceEstimator(self.face_landmarker)
+
+        # Pose and Face Mesh graphs release the GIL while running, so they can overlap
+        self._model_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PoseWorker') if parallel_models else None
+
+        # Per-analyzer cadence, e.g. {'pose': 3, 'distance': 2}; skipped frames reuse the last result
+        self.scheduler = InferenceScheduler(inference_intervals)
+        self._last_eye_result = None
+        self._last_distance = None
+        self._last_face_points = None
+        self._last_posture = None
+
+        # Crop Face Mesh and Pose input to the region around the previous frame's landmarks.
+        # MediaPipe tracks in the coordinates of its last input, so crops get their own graphs
+        # and the full-frame graphs above only handle (re)acquisition.
+        self.face_roi = RoiTracker(ROI_FACE_PADDING) if roi_tracking else None
+        self.pose_roi = RoiTracker(ROI_POSE_PADDING) if roi_tracking else None
+        self._roi_face_landmarker = FaceLandmarker() if roi_tracking else None
+        self._roi_posture_analyzer = PostureAnalyzer() if roi_tracking else None
+
+        # Skip inference entirely while the scene is static, re-emitting the last result
+        self.motion_gate = MotionGate() if motion_gating else None
+        self._last_result = None
+
+        # Landmark trace of the displayed frames, see start_trace()
+        self.trace_recorder = None
+
+        # OpenMetrics endpoint for the metrics, see start_exporter()
+        self.exporter = None
+
+        # Per-frame span ring buffer, see start_span_trace(); tracing points check it for None
+        self.span_tracer = None
+
+        # Stack sampling profiler, see start_profiling(), and where it writes its profile
+        self.profiler = None
+        self._profile_path = None
+
+        # Step through QUALITY_TIERS to hold target_fps; the iris is kept while the display draws it
+        self.governor = (QualityGovernor(target_fps, require_iris=not headless and display_detail in
+                                         (DETAIL_CONTOURS, DETAIL_KEYPOINTS)) if target_fps else None)
+        self._applied_tier = self.governor.current if self.governor else None
+        self._unavailable_pose_complexities = set()
+
+        # Reused outputs of resize and color conversion, see preprocess_frame()
+        self._bgr_frames = FrameRing()
+        self._rgb_frames = FrameRing()
+        self._inference_frames = FrameRing()
+
+        # Set by stop() (or SIGINT/SIGTERM in headless runs) to end run()
+        self._stop_event = threading.Event()
+        self._executor = None
+        self.startup.mark('constructed')
 
     def setup_distance_estimation(self):
-        """Handle the setup of the distance estimator."""
+        """Handle the setup of the distance estimator, starting from the stored calibration profile if there is one."""
+        self._load_calibration_profile()
         if self.auto_calibrate:
             logger.info("Starting auto-calibration...")
             calibration_successful = False
             
-            while not calibration_successful and not cv2.waitKey(1) & 0xFF == ord('q'):
+            while not calibration_successful and not self.display.poll_quit() and not self._stop_event.is_set():
                 ret, frame = self.camera.read_frame()
                 if ret:
                     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -79,115 +175,703 @@ class PostureDistanceDetector:
                         logger.info("Auto-calibration successful!")
                     except Exception as e:
                         logger.error(f"Calibration error: {str(e)}")
-                        cv2.imshow('Calibration', frame)
+                        if not self.headless:
+                            cv2.imshow('Calibration', frame)
             
-            cv2.destroyAllWindows()
+            if not self.headless:
+                cv2.destroyAllWindows()
         else:
             logger.info("Using manual calibration settings...")
             self.calculate_focal_length_px()
         
         self.distance_estimator.set_focal_length(self.focal_length_px)
+        self.distance_estimator.set_face_width(self.face_width)
         logger.info(f"Distance estimator initialized with focal length: {self.focal_length_px:.2f}px")
         logger.info(f"Using face width: {self.face_width}cm")
+        # Defaults are not stored as if measured; set_calibration() stores measured values
+        if self._face_width_given:
+            self._save_calibration_profile(face_width_cm=self.face_width)
+
+    def _calibration_profile_key(self):
+        return (CalibrationStore.camera_identity(self.camera.camera_source),
+                (self.camera.width, self.camera.height), self.subject)
+
+    def _load_calibration_profile(self):
+        """Apply the stored profile of the opened camera, so tracking is calibrated from the first frame.
+
+        A stale EAR baseline is still used, while the eye tracker measures a new
+        one from the frames it tracks and stores that when it is done.
+        """
+        if not self.calibration_store:
+            return
+        self.eye_tracker.on_calibrated = lambda left, right: self._save_calibration_profile(ear_baseline=(left, right))
+        profile = self.calibration_store.get(*self._calibration_profile_key())
+        if profile is None:
+            logger.info("No stored calibration profile for this camera and subject")
+            return
+        if profile.focal_length_px:
+            self.focal_length_px = profile.focal_length_px
+        if profile.face_width_cm and not self._face_width_given:
+            self.face_width = profile.face_width_cm
+        if profile.ear_baseline:
+            refresh = profile.is_stale('ear_baseline')
+            self.eye_tracker.load_baseline(*profile.ear_baseline, refresh=refresh)
+            if refresh:
+                logger.info("Stored EAR baseline is stale; measuring a new one while tracking")
+        logger.info(f"Loaded calibration profile {profile.key}")
+
+    def _save_calibration_profile(self, **values):
+        if self.calibration_store:
+            self.calibration_store.update(*self._calibration_profile_key(), **values)
+
+    def set_calibration(self, focal_length_px=None, face_width_cm=None):
+        """Use a measured focal length and/or face width, e.g. from CameraCalibrator, and store them.
+
+        Args:
+            focal_length_px (float): Focal length in pixels
+            face_width_cm (float): Face width in centimeters
+        """
+        if focal_length_px:
+            self.focal_length_px = focal_length_px
+            self.distance_estimator.set_focal_length(focal_length_px)
+        if face_width_cm:
+            self.face_width = face_width_cm
+            self._face_width_given = True
+            self.distance_estimator.set_face_width(face_width_cm)
+        self._save_calibration_profile(focal_length_px=focal_length_px, face_width_cm=face_width_cm)
 
     def calculate_focal_length_px(self):
         logger.info(f"Calculated Focal Length: {self.focal_length_px:.2f} px")
         return (self.image_width_px * self.focal_length_mm) / self.sensor_width_mm
 
-    def run(self):
-        if not self.camera.initialize():
-            return
+    def run(self, pipelined=False):
+        """Run the detection loop until 'q' is pressed, stop() is called or capture fails.
+
+        Headless runs called from the main thread also stop on SIGINT/SIGTERM.
+
+        Args:
+            pipelined (bool): Run capture and inference on their own threads
+                connected by bounded queues instead of one stage after another
+        """
+        previous_handlers = {}
+        try:
+            # Models are built and warmed up while the camera opens
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='Startup') as startup_pool:
+                models_ready = startup_pool.submit(self.warm_up)
+                camera_ready = self.initialize_camera()
+                with self.startup.phase('wait_models'):
+                    models_ready.result()
+            if not camera_ready:
+                return
+
+            self._stop_event.clear()
+            # The serial loop is done with a frame before it captures the next; the pipelined
+            # executor sizes the buffers for its frames in flight itself
+            self._set_frame_buffers(1)
+            previous_handlers = self._install_signal_handlers()
+            self.setup_distance_estimation()
+            if pipelined:
+                self._run_pipelined()
+            else:
+                self._run_serial()
+        except Exception as e:
+            logger.exception("Error in main loop")
+            raise e
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            self.cleanup()
+
+    def stream(self, source=None):
+        """Analyze frames as an async iterator of FrameResults, for use inside an asyncio service.
+
+        Capture and inference run on executor threads, so the event loop stays free
+        for other work. Results are not drawn; the stream ends when capture fails or
+        stop() is called. Breaking out of the loop or cancelling the consuming task
+        shuts the stream down and releases the camera and models (cleanup()), e.g.
+
+            async with contextlib.aclosing(detector.stream()) as results:
+                async for result in results:
+                    ...
+
+        Args:
+            source: Camera source to read from instead of the one given to the constructor
+
+        Returns:
+            AsyncIterator[FrameResult]: Results in capture order
+        """
+        if source is not None:
+            self.camera.release()
+            self.camera = Camera(source, threaded=self.camera.threaded, capture_size=self.camera.capture_size)
+        return stream_results(self)
+
+    def initialize_camera(self):
+        """Open the camera, timed as the 'camera_init' startup phase.
+
+        Returns:
+            bool: Whether the camera opened
+        """
+        with self.startup.phase('camera_init'):
+            return self.camera.initialize()
+
+    def warm_up(self):
+        """Import mediapipe, then build every model graph and run a blank frame through it, in parallel.
+
+        run() and stream() call this while the camera opens, so the first frame is
+        analyzed at full speed; the phases are recorded in get_startup_report().
+        """
+        models = {'face_mesh': self.face_landmarker, 'pose': self.posture_analyzer}
+        if self._roi_face_landmarker:
+            models['roi_face_mesh'] = self._roi_face_landmarker
+            models['roi_pose'] = self._roi_posture_analyzer
+        warm_up_models(models, (FRAME_WIDTH, FRAME_HEIGHT), self.startup, (mp_face_mesh, mp_pose))
+
+    def get_startup_report(self):
+        """
+        How long each startup phase took, from construction to the first result.
+
+        Returns:
+            dict: See StartupTimer.report()
+        """
+        return self.startup.report()
+
+    def stop(self):
+        """Ask a running run() loop or stream() to finish after the current frame. Safe to call from any thread."""
+        self._stop_event.set()
+        if self._executor:
+            self._executor.request_stop()
+
+    def _install_signal_handlers(self):
+        """Headless runs stop on SIGINT/SIGTERM; SIGUSR1 toggles the profiler, where the platform has it."""
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        def handle(signum, _):
+            logger.info(f"Received signal {signum}, stopping")
+            self.stop()
+        def toggle_profiling(signum, _):
+            if self.profiler and self.profiler.running:
+                self.stop_profiling()
+            else:
+                self.start_profiling()
+        handlers = {signum: handle for signum in (signal.SIGINT, signal.SIGTERM)} if self.headless else {}
+        if hasattr(signal, 'SIGUSR1'):
+            handlers[signal.SIGUSR1] = toggle_profiling
+        return {signum: signal.signal(signum, handler) for signum, handler in handlers.items()}
+
+    def _run_serial(self):
+        while not self._stop_event.is_set():
+            tracer = self.span_tracer
+            frame_span = tracer.begin() if tracer else None
+            frame_start = self.metrics.start_operation() if self.metrics else None
+            
+            # Frame capture and basic processing
+            item = self.capture_frame()
+            if item is None:
+                break
+            captured_at, frame, frame_rgb, source_frame = item
+            if self.metrics and self.camera.threaded:
+                # The frame was captured before this iteration asked for it; count its wait too
+                frame_start = self.metrics.start_operation_at(captured_at)
             
-        self.setup_distance_estimation()
+            # Update FPS if metrics enabled
+            self._update_fps()
+
+            # Process the models that are due on this frame
+            result = self.analyze_frame(frame_rgb, source_frame)
+            result.timestamp = captured_at
 
+            quit_requested = self.render_frame(frame, result, frame_start)
+            if tracer:
+                tracer.end(frame_span, 'frame')
+            if quit_requested:
+                break
+
+    def _run_pipelined(self):
+        executor = self._executor = PipelinedExecutor(self)
+        executor.start()
         try:
             while True:
-                frame_start = self.metrics.start_operation() if self.metrics else None
-                
-                # Frame capture and basic processing
-                ret, frame = self.camera.read_frame()
-                if not ret:
-                    logger.error("Failed to capture frame")
+                item = executor.get_result()
+                if item is None:
                     break
+                frame, result = item
 
-                # Resize frame for better performance
-                frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Update FPS if metrics enabled
-                if self.metrics:
-                    current_fps = self.metrics.update_fps()
-                    if current_fps:
-                        logger.debug(f"FPS: {current_fps:.1f}")
-
-                # Process all models on every frame
-                # Eye tracking
-                eye_start = self.metrics.start_operation() if self.metrics else None
-                eye_status, face_landmarks, ear_values, is_calibrated = self.eye_tracker.analyze(frame_rgb)
+                self._update_fps()
                 if self.metrics:
-                    self.metrics.end_operation(eye_start, 'eye_tracking')
-                    self.metrics.update_detection_status('face', eye_status != "NO FACE")
-                
-                # Posture analysis
-                posture_start = self.metrics.start_operation() if self.metrics else None
-                posture_status, posture_color, vert_diff, horiz_diff, pose_landmarks = self.posture_analyzer.analyze(
-                    frame_rgb, FRAME_WIDTH, FRAME_HEIGHT)
-                if self.metrics:
-                    self.metrics.end_operation(posture_start, 'posture')
-                    self.metrics.update_detection_status('pose', posture_status != "No pose detected")
-                
-                # Distance estimation
-                distance_start = self.metrics.start_operation() if self.metrics else None
-                distance_data = self.distance_estimator.estimate(frame_rgb, FRAME_WIDTH)
-                if self.metrics:
-                    self.metrics.end_operation(distance_start, 'distance')
-
-                # Use the results directly since we're processing every frame
-                posture_data = (posture_status, posture_color, vert_diff, horiz_diff)
-
-                # Update display with available data
-                camera_specs = {
-                    'focal_length': self.focal_length_mm,
-                    'sensor_width': self.sensor_width_mm
-                }
-                
-                # End total frame processing time
-                if self.metrics:
-                    total_time = self.metrics.end_operation(frame_start, 'total')
-                    
-                    # Log metrics periodically
-                    if self.metrics.frame_count % 30 == 0:
-                        self.metrics.log_metrics()
-
-                # Update display with performance metrics
-                metrics_summary = self.metrics.get_metrics_summary() if self.metrics else None
-                self.display.update(
-                    frame,
-                    posture_data,
-                    distance_data,
-                    eye_status,
-                    camera_specs,
-                    pose_landmarks,
-                    face_landmarks,
-                    metrics_summary
-                )
-
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                    self.metrics.update_queue_stats(executor.get_queue_stats())
 
-        except Exception as e:
-            logger.exception("Error in main loop")
-            raise e
+                if self.render_frame(frame, result, self.metrics.start_operation_at(result.timestamp) if self.metrics else None):
+                    break
         finally:
-            self.cleanup()
+            executor.stop()
+            self._executor = None
+        if executor.error:
+            raise executor.error
+
+    def start_trace(self, path, half_precision=False):
+        """Record the landmarks of every displayed frame to a trace file (see eye_test_cv.trace).
+
+        Args:
+            path (str): Trace file path
+            half_precision (bool): Store coordinates as float16
+        """
+        self.stop_trace()
+        self.trace_recorder = TraceRecorder(path, FRAME_WIDTH, FRAME_HEIGHT, half_precision)
+        logger.info(f"Recording landmark trace to {path}")
+
+    def stop_trace(self):
+        """Finish the current landmark trace, if any."""
+        if self.trace_recorder:
+            self.trace_recorder.close()
+            self.trace_recorder = None
+
+    def start_exporter(self, port=METRICS_EXPORTER_PORT, host=METRICS_EXPORTER_HOST):
+        """Serve the metrics in OpenMetrics format at http://host:port/metrics (see eye_test_cv.exporter).
+
+        Requires metrics to be enabled (enableMetrics()) before the detector is created.
+
+        Args:
+            port (int): Port to listen on; 0 picks a free one
+            host (str): Address to listen on
+
+        Returns:
+            int: The port the exporter is listening on
+        """
+        if not self.metrics:
+            raise RuntimeError("Metrics are not enabled; call enableMetrics() before creating the detector")
+        self.stop_exporter()
+        self.exporter = MetricsExporter(self.metrics, self.camera, host, port)
+        self.exporter.start()
+        return self.exporter.port
+
+    def stop_exporter(self):
+        """Stop serving metrics, if the exporter is running."""
+        if self.exporter:
+            self.exporter.stop()
+            self.exporter = None
+
+    def start_span_trace(self, capacity=SPAN_TRACE_CAPACITY):
+        """Record timed spans of every frame stage into a ring buffer (see eye_test_cv.spans).
+
+        Args:
+            capacity (int): Spans kept; older ones are overwritten
+        """
+        self.span_tracer = SpanTracer(capacity)
+        self.display.span_tracer = self.span_tracer
+        logger.info(f"Span tracing started ({capacity} spans)")
+
+    def save_span_trace(self, path):
+        """Write the buffered spans to path as Chrome Trace Event JSON, for chrome://tracing or Perfetto.
+
+        Returns:
+            int: Number of spans written
+        """
+        if not self.span_tracer:
+            raise RuntimeError("Span tracing is not running; call start_span_trace() first")
+        return self.span_tracer.dump(path)
+
+    def stop_span_trace(self, path=None):
+        """Stop span tracing, first saving the buffered spans to path if one is given."""
+        if self.span_tracer and path:
+            self.save_span_trace(path)
+        self.span_tracer = None
+        self.display.span_tracer = None
+
+    def start_profiling(self, duration=None, path=None, interval=PROFILE_SAMPLE_INTERVAL):
+        """Start sampling the stacks of all threads (see eye_test_cv.profiling).
+
+        Can be called, like stop_profiling(), from any thread while the detector
+        runs; the camera session is not interrupted. In a run() on the main thread,
+        SIGUSR1 toggles profiling too.
+
+        Args:
+            duration (float): Seconds to profile before writing the profile by itself;
+                None profiles until stop_profiling()
+            path (str): Collapsed-stack output file; defaults to a timestamped file in PROFILE_OUTPUT_DIR
+            interval (float): Seconds between samples
+        """
+        if self.profiler and self.profiler.running:
+            self.stop_profiling()
+        self._profile_path = path or os.path.join(
+            PROFILE_OUTPUT_DIR, time.strftime('profile-%Y%m%d-%H%M%S.collapsed'))
+        self.profiler = SamplingProfiler(interval, duration, on_complete=self._write_profile)
+        self.profiler.start()
+        logger.info(f"Profiling started, {f'{duration:.0f}s' if duration else 'until stopped'}")
+
+    def stop_profiling(self):
+        """Stop the profiler and write its profile.
+
+        Returns:
+            str: The profile path, or None if no profiler was running
+        """
+        profiler = self.profiler
+        if not profiler or not profiler.running:
+            return None
+        profiler.stop()
+        return self._write_profile(profiler)
+
+    def _write_profile(self, profiler):
+        path = self._profile_path
+        stacks = profiler.write_collapsed(path)
+        profiler.log_summary()
+        logger.info(f"Wrote {stacks} stacks to {path}")
+        return path
+
+    def _update_fps(self):
+        if self.metrics:
+            current_fps = self.metrics.update_fps()
+            if current_fps:
+                logger.debug(f"FPS: {current_fps:.1f}")
+
+    def capture_frame(self, slot=None):
+        """Read and preprocess the next camera frame.
+
+        Args:
+            slot (int): FrameSlots slot whose buffers the frame is written to, if frames are
+                leased; otherwise the next buffers in turn are used
+
+        Returns:
+            tuple: (captured_at, frame, frame_rgb, source_frame), or None if capture failed;
+            captured_at is the camera's capture time as a time.time() value, so time a
+            threaded capture's frame waited in the front buffer counts toward its latency
+        """
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        ret, frame, captured_perf, _ = self.camera.read_frame_with_info(slot=slot)
+        if ret:
+            captured_at = time.time() - (time.perf_counter() - captured_perf)
+        if tracer:
+            tracer.end(span, 'camera_read')
+        if not ret:
+            logger.error("Failed to capture frame")
+            return None
+        source_frame = frame
+        frame, frame_rgb = self.preprocess_frame(frame, slot)
+        if tracer:
+            tracer.end(span, 'capture')
+        return captured_at, frame, frame_rgb, source_frame
+
+    def _set_frame_buffers(self, count):
+        """Give every frame buffer ring count buffers, one per frame that can be in use at once."""
+        self.camera.set_frame_buffers(count)
+        self._bgr_frames.resize(count)
+        self._rgb_frames.resize(count)
+        self._inference_frames.resize(count)
+
+    @staticmethod
+    def fit_aspect(frame):
+        """Center-crop a frame (as a view) to the processing aspect ratio, so resizing does not distort it."""
+        height, width = frame.shape[:2]
+        if width * FRAME_HEIGHT > height * FRAME_WIDTH * 1.01:
+            crop = height * FRAME_WIDTH // FRAME_HEIGHT
+            x0 = (width - crop) // 2
+            return frame[:, x0:x0 + crop]
+        if height * FRAME_WIDTH > width * FRAME_HEIGHT * 1.01:
+            crop = width * FRAME_HEIGHT // FRAME_WIDTH
+            y0 = (height - crop) // 2
+            return frame[y0:y0 + crop]
+        return frame
+
+    def preprocess_frame(self, frame, slot=None):
+        """Fit a captured BGR frame to the processing size and convert it to RGB.
+
+        The frame is center-cropped to the processing aspect ratio, then resized
+        only if the capture size differs. Resize and color conversion write into
+        reused buffers, so a returned frame is overwritten a few frames later.
+        With a quality governor, the RGB frame is at the current tier's inference
+        resolution, which can be smaller than the BGR frame. A slot selects the
+        buffers of a leased frame (see capture_frame()).
+
+        Returns:
+            tuple: (resized BGR frame, RGB frame)
+        """
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        frame = self.fit_aspect(frame)
+        if frame.shape[1] != FRAME_WIDTH or frame.shape[0] != FRAME_HEIGHT:
+            frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT),
+                               dst=self._bgr_frames.next((FRAME_HEIGHT, FRAME_WIDTH, 3), slot=slot))
+        inference_frame = frame
+        if self.governor:
+            width, height = self.governor.resolution
+            if (width, height) != (FRAME_WIDTH, FRAME_HEIGHT):
+                inference_frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA,
+                                             dst=self._inference_frames.next((height, width, 3), slot=slot))
+        if tracer:
+            tracer.end(span, 'resize')
+            span = tracer.begin()
+        frame_rgb = cv2.cvtColor(inference_frame, cv2.COLOR_BGR2RGB,
+                                 dst=self._rgb_frames.next(inference_frame.shape, slot=slot))
+        if tracer:
+            tracer.end(span, 'cvtColor')
+        return frame, frame_rgb
+
+    def render_frame(self, frame, result, frame_start=None):
+        """Close out the frame's metrics and draw the analysis results.
+
+        Returns:
+            bool: True if the user asked to quit
+        """
+        self.complete_frame(result, frame_start)
+
+        # Update display with available data
+        camera_specs = {
+            'focal_length': self.focal_length_mm,
+            'sensor_width': self.sensor_width_mm
+        }
+
+        # Update display with performance metrics; time spent here is the 'render' stage
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        render_start = self.metrics.start_operation() if self.metrics else None
+        # The panel only refreshes every METRICS_PANEL_INTERVAL, so its statistics can be that old
+        metrics_summary = self.metrics.get_metrics_summary(METRICS_PANEL_INTERVAL) \
+            if self.metrics and not self.headless else None
+        self.display.update(frame, result, camera_specs, metrics_summary)
+        quit_requested = self.display.poll_quit()
+        if self.metrics:
+            self.metrics.end_operation(render_start, 'render')
+        if tracer:
+            tracer.end(span, 'render')
+        return quit_requested
+
+    def complete_frame(self, result, frame_start=None):
+        """Record a finished frame: trace it, end its 'total' timing, feed the governor and periodically log metrics."""
+        if self.trace_recorder:
+            self.trace_recorder.write(result)
+        if 'first_result' not in self.startup.marks:
+            self.startup.mark('first_result')
+            self.startup.log_report()
+
+        # End total frame processing time
+        total = self.metrics.end_operation(frame_start, 'total') if self.metrics else None
+        if self.governor:
+            # Without metrics, the time since capture stands in for the 'total' latency
+            self.governor.observe(total if total is not None else time.time() - result.timestamp)
+        if self.metrics:
+            if self.governor:
+                self.metrics.update_quality_stats(self.governor.get_stats())
+            
+            # Log metrics periodically
+            if self.metrics.frame_count % 30 == 0:
+                self.metrics.log_metrics()
+
+    def analyze_frame(self, frame_rgb, source_frame=None):
+        """Run the analyzers that are due on one RGB frame.
+
+        Face Mesh runs once and its landmarks are shared by the eye tracker
+        and the distance estimator. With parallel_models enabled, Pose runs on
+        a worker thread while the face analyses run on the calling thread.
+        Analyzers the scheduler skips on this frame contribute their last
+        result, and the result's *_age fields say how many frames old it is.
+
+        Args:
+            frame_rgb (numpy.ndarray): Preprocessed RGB frame
+            source_frame (numpy.ndarray): Optional BGR frame at capture resolution;
+                with roi_tracking enabled, crops are cut from it instead of frame_rgb
+
+        Returns:
+            FrameResult: The combined analysis results
+        """
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        result = self._analyze_frame(frame_rgb, source_frame)
+        if tracer:
+            tracer.end(span, 'analyze')
+        return result
+
+    def _analyze_frame(self, frame_rgb, source_frame):
+        self.scheduler.next_frame()
+        if self.governor and self._applied_tier is not self.governor.current:
+            self._apply_quality_tier(self.governor.current)
+        if self.motion_gate and not self._check_motion(frame_rgb) and self._last_result is not None:
+            result = self._last_result.copy()
+            result.eye_age = self.scheduler.age(EYES)
+            result.distance_age = self.scheduler.age(DISTANCE)
+            result.posture_age = self.scheduler.age(POSE)
+            return result
+
+        posture_future = None
+        if self._model_pool and self.scheduler.should_run(POSE):
+            posture_future = self._model_pool.submit(self._analyze_posture, frame_rgb, source_frame)
+
+        eye_result, distance_data, face_points = self._analyze_face(frame_rgb, source_frame)
+
+        # Checked after the face stage so that a face trigger can bring Pose forward
+        if posture_future:
+            self._last_posture = posture_future.result()
+            self._record_schedule(POSE, True)
+        elif self.scheduler.should_run(POSE):
+            self._last_posture = self._analyze_posture(frame_rgb, source_frame)
+            self._record_schedule(POSE, True)
+        else:
+            self._record_schedule(POSE, False)
+        posture_result, pose_points, pose_visibility = self._last_posture
+
+        result = FrameResult.from_analysis(eye_result, posture_result, distance_data,
+                                           face_points, pose_points, pose_visibility)
+        result.eye_age = self.scheduler.age(EYES)
+        result.distance_age = self.scheduler.age(DISTANCE)
+        result.posture_age = self.scheduler.age(POSE)
+        self._last_result = result
+        return result
+
+    def _apply_quality_tier(self, tier):
+        """Switch the models to a governor tier; runs on the inference thread, between frames."""
+        complexity = tier['pose_complexity']
+        for analyzer in (self.posture_analyzer, self._roi_posture_analyzer):
+            if analyzer and complexity not in self._unavailable_pose_complexities:
+                try:
+                    analyzer.set_model_complexity(complexity)
+                except Exception as e:
+                    # Not retried: a failed model download would stall every later tier change
+                    self._unavailable_pose_complexities.add(complexity)
+                    logger.warning(f"Pose model complexity {complexity} unavailable, "
+                                   f"keeping {analyzer.model_complexity}: {e}")
+        for landmarker in (self.face_landmarker, self._roi_face_landmarker):
+            if landmarker:
+                landmarker.set_refine_landmarks(tier['refine_landmarks'])
+        self._applied_tier = tier
+
+    def _check_motion(self, frame_rgb):
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        gate_start = self.metrics.start_operation() if self.metrics else None
+        changed = self.motion_gate.should_process(frame_rgb)
+        if tracer:
+            tracer.end(span, 'motion_gate')
+        if self.metrics:
+            self.metrics.end_operation(gate_start, 'motion_gate')
+            self.metrics.update_motion_gate_status(not changed)
+        return changed
+
+    def _record_schedule(self, analyzer, ran):
+        if ran:
+            self.scheduler.mark_run(analyzer)
+        if self.metrics:
+            self.metrics.update_schedule_status(analyzer, ran)
+
+    def _detect(self, process, process_roi, roi_tracker, frame_rgb, source_frame, with_visibility=False):
+        """Run a landmark model, on the tracked region only when ROI tracking is enabled.
+
+        Full frames go to process, crops to process_roi.
+
+        Returns:
+            tuple: (landmark list, full-frame (N, 3) points, visibility, or None if the model gives none)
+        """
+        if roi_tracker is None:
+            landmark_list = process(frame_rgb)
+            return (landmark_list, *self._to_array(landmark_list, with_visibility))
+
+        # Crops come from the capture-resolution frame when one is given, for more pixels on the subject
+        full = self.fit_aspect(source_frame) if source_frame is not None else frame_rgb
+        crop, roi = roi_tracker.crop(full)
+        if roi is None:
+            landmark_list = process(frame_rgb)
+        else:
+            if source_frame is not None:
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+            landmark_list = process_roi(crop)
+            if landmark_list is None:
+                # Tracking lost inside the region: fall back to the full frame
+                logger.debug("ROI tracking lost, retrying on the full frame")
+                roi_tracker.reset()
+                roi = None
+                landmark_list = process(frame_rgb)
+
+        points, visibility = self._to_array(landmark_list, with_visibility)
+        points = RoiTracker.to_frame(points, roi, full.shape)
+        roi_tracker.update(points, full.shape, visibility)
+        return landmark_list, points, visibility
+
+    @staticmethod
+    def _to_array(landmark_list, with_visibility):
+        if with_visibility:
+            return landmarks_to_array(landmark_list, with_visibility=True)
+        return landmarks_to_array(landmark_list), None
+
+    def _analyze_face(self, frame_rgb, source_frame=None):
+        run_eyes = self.scheduler.should_run(EYES)
+        if not (run_eyes or self.scheduler.should_run(DISTANCE)):
+            self._record_schedule(EYES, False)
+            self._record_schedule(DISTANCE, False)
+            return self._last_eye_result, self._last_distance, self._last_face_points
+
+        # Shared face landmark stage
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        face_start = self.metrics.start_operation() if self.metrics else None
+        face_landmark_list, face_points, _ = self._detect(
+            self.face_landmarker.process, self._roi_face_landmarker and self._roi_face_landmarker.process,
+            self.face_roi, frame_rgb, source_frame)
+        if tracer:
+            tracer.end(span, 'face_mesh')
+        if self.metrics:
+            self.metrics.end_operation(face_start, 'face_mesh')
+            self.metrics.update_detection_status('face', face_landmark_list is not None)
+        self._last_face_points = face_points
+        self.scheduler.check_triggers(face_points)
+
+        # Eye tracking
+        if run_eyes:
+            span = tracer.begin() if tracer else None
+            eye_start = self.metrics.start_operation() if self.metrics else None
+            self._last_eye_result = self.eye_tracker.analyze_landmarks(face_landmark_list, face_points)
+            if tracer:
+                tracer.end(span, 'ear')
+            if self.metrics:
+                self.metrics.end_operation(eye_start, 'eye_tracking')
+        self._record_schedule(EYES, run_eyes)
+
+        # Distance estimation
+        run_distance = self.scheduler.should_run(DISTANCE)
+        if run_distance:
+            span = tracer.begin() if tracer else None
+            distance_start = self.metrics.start_operation() if self.metrics else None
+            self._last_distance = self.distance_estimator.estimate_from_landmarks(
+                face_landmark_list, FRAME_WIDTH, face_points)
+            if tracer:
+                tracer.end(span, 'distance')
+            if self.metrics:
+                self.metrics.end_operation(distance_start, 'distance')
+        self._record_schedule(DISTANCE, run_distance)
+
+        return self._last_eye_result, self._last_distance, face_points
+
+    def _analyze_posture(self, frame_rgb, source_frame=None):
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        posture_start = self.metrics.start_operation() if self.metrics else None
+        pose_landmarks, pose_points, pose_visibility = self._detect(
+            self.posture_analyzer.detect, self._roi_posture_analyzer and self._roi_posture_analyzer.detect,
+            self.pose_roi, frame_rgb, source_frame, with_visibility=True)
+        posture_result = self.posture_analyzer.analyze_landmarks(
+            pose_landmarks, FRAME_WIDTH, FRAME_HEIGHT, pose_points)
+        if tracer:
+            tracer.end(span, 'pose')
+        if self.metrics:
+            self.metrics.end_operation(posture_start, 'posture')
+            self.metrics.update_detection_status('pose', pose_landmarks is not None)
+        return posture_result, pose_points, pose_visibility
 
     def cleanup(self):
         """Clean up resources and log final metrics."""
         self.camera.release()
+        self.stop_trace()
+        self.stop_exporter()
+        self.stop_profiling()
+        if self._model_pool:
+            self._model_pool.shutdown(wait=True)
         self.posture_analyzer.close()
         if self.distance_estimator:
             self.distance_estimator.close()
         self.eye_tracker.close()
+        self.face_landmarker.close()
+        if self._roi_face_landmarker:
+            self._roi_face_landmarker.close()
+            self._roi_posture_analyzer.close()
+        if self.calibration_store:
+            self.calibration_store.close()
         
         # Log final metrics if enabled
         if self.metrics:
@@ -208,53 +892,17 @@ class PostureDistanceDetector:
             frame: A numpy array containing the image frame to process
             
         Returns:
-            dict: A dictionary containing all detection results
+            FrameResult: All detection results for the frame
         """
         frame_start = self.metrics.start_operation() if self.metrics else None
         
-        # Resize frame for better performance
-        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Eye tracking
-        eye_start = self.metrics.start_operation() if self.metrics else None
-        eye_status, face_landmarks, ear_values, is_calibrated = self.eye_tracker.analyze(frame_rgb)
-        if self.metrics:
-            self.metrics.end_operation(eye_start, 'eye_tracking')
-            self.metrics.update_detection_status('face', eye_status != "NO FACE")
+        source_frame = frame
+        frame, frame_rgb = self.preprocess_frame(frame)
         
-        # Posture analysis
-        posture_start = self.metrics.start_operation() if self.metrics else None
-        posture_status, posture_color, vert_diff, horiz_diff, pose_landmarks = self.posture_analyzer.analyze(
-            frame_rgb, FRAME_WIDTH, FRAME_HEIGHT)
-        if self.metrics:
-            self.metrics.end_operation(posture_start, 'posture')
-            self.metrics.update_detection_status('pose', posture_status != "No pose detected")
-        
-        # Distance estimation
-        distance_start = self.metrics.start_operation() if self.metrics else None
-        distance_data = self.distance_estimator.estimate(frame_rgb, FRAME_WIDTH)
-        if self.metrics:
-            self.metrics.end_operation(distance_start, 'distance')
+        result = self.analyze_frame(frame_rgb, source_frame)
         
         # End total frame processing time
         if self.metrics:
-            total_time = self.metrics.end_operation(frame_start, 'total')
+            self.metrics.end_operation(frame_start, 'total')
         
-        return {
-            'eye_tracking': {
-                'status': eye_status,
-                'ear_values': ear_values,
-                'is_calibrated': is_calibrated
-            },
-            'posture': {
-                'status': posture_status,
-                'vertical_difference': vert_diff,
-                'horizontal_difference': horiz_diff
-            },
-            'distance': distance_data,
-            'landmarks': {
-                'face': face_landmarks,
-                'pose': pose_landmarks
-            }
-        }
\ No newline at end of file
+        return result
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+OpenMetrics exporter for live pipeline metrics.
+Serves the stage latency histograms, FPS, detection success counts, dropped
+frames and queue depths of a PerformanceMetrics instance over local HTTP in the
+OpenMetrics text format, so Prometheus or any compatible scraper can collect them.
+"""
+
+import logging
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eye_test_cv.config.settings import (
+    METRICS_EXPORTER_HOST, METRICS_EXPORTER_PORT, METRICS_EXPORTER_BUCKETS_MS
+)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'eye_test_cv'
+
+def _format_value(value):
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+class _Family:
+    """Text of one metric family: its metadata lines followed by its samples."""
+
+    def __init__(self, name, metric_type, help_text, unit=None):
+        self.name = f"{PREFIX}_{name}"
+        self.lines = [f"# TYPE {self.name} {metric_type}"]
+        if unit:
+            self.lines.append(f"# UNIT {self.name} {unit}")
+        self.lines.append(f"# HELP {self.name} {help_text}")
+
+    def add(self, suffix, labels, value):
+        self.lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+class MetricsExporter:
+    """
+    Serves a PerformanceMetrics instance at http://host:port/metrics.
+
+    Every scrape reads the metrics directly on the HTTP server's thread: the
+    histograms and counters are only read, never locked or reset, so a scrape
+    cannot stall the frame loop, and values a frame is updating concurrently
+    appear in the next scrape. Stage latencies are exported as a cumulative
+    histogram over the whole run, with METRICS_EXPORTER_BUCKETS_MS boundaries,
+    plus windowed p50/p90/p99 gauges.
+
+    Attributes:
+        host (str): Address the server listens on
+        port (int): Port the server listens on; the one actually bound once started
+    """
+
+    def __init__(self, metrics, camera=None, host=METRICS_EXPORTER_HOST, port=METRICS_EXPORTER_PORT,
+                 buckets_ms=METRICS_EXPORTER_BUCKETS_MS):
+        """
+        Args:
+            metrics (PerformanceMetrics): Metrics to export; detailed metrics export everything,
+                otherwise only FPS
+            camera (Camera): Optional camera whose background-capture drops are exported
+            host (str): Address to listen on; the default only accepts local scrapers
+            port (int): Port to listen on; 0 picks a free one
+            buckets_ms: Upper bounds (ms) of the exported latency histogram buckets
+        """
+        self.metrics = metrics
+        self.camera = camera
+        self.host = host
+        self.port = port
+        self._bounds_ns = np.array(sorted(buckets_ms), dtype=np.float64) * 1e6
+        self._bucket_labels = [_format_value(bound / 1000) for bound in sorted(buckets_ms)]
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Start serving on a background thread."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                try:
+                    body = exporter.render().encode('utf-8')
+                except Exception:
+                    logger.exception("Failed to render metrics")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Scrape from {self.address_string()}: {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsExporter", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop serving and release the port."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def render(self):
+        """The current metrics in OpenMetrics text format, as served to scrapers."""
+        metrics = self.metrics
+        families = []
+
+        fps = _Family('fps', 'gauge', 'Frames per second, averaged over recent seconds.')
+        fps.add('', None, float(np.mean(metrics.fps_history)) if metrics.fps_history else 0.0)
+        families.append(fps)
+
+        if metrics.detailed:
+            families.extend(self._latency_families())
+            families.extend(self._detection_families())
+            families.extend(self._queue_families())
+
+        if self.camera is not None:
+            dropped = _Family('capture_dropped_frames', 'counter',
+                              'Frames the background capture overwrote before they were read.')
+            dropped.add('_total', None, self.camera.dropped_frames)
+            families.append(dropped)
+
+        lines = [line for family in families for line in family.lines]
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def _latency_families(self):
+        histogram = _Family('stage_latency_seconds', 'histogram',
+                            'Processing time of each pipeline stage over the whole run.', 'seconds')
+        window = _Family('stage_latency_window_seconds', 'gauge',
+                         'Processing time percentiles of each pipeline stage over the recent window.', 'seconds')
+        for stage, latency in list(self.metrics.latencies.items()):
+            lifetime = latency.lifetime
+            # Sum first: a frame recording meanwhile then shows up in the counts, never only in the sum
+            total_ns = lifetime.sum
+            counts, total = lifetime.cumulative_counts(self._bounds_ns)
+            for label, count in zip(self._bucket_labels, counts):
+                histogram.add('_bucket', {'stage': stage, 'le': label}, count)
+            histogram.add('_bucket', {'stage': stage, 'le': '+Inf'}, total)
+            histogram.add('_count', {'stage': stage}, total)
+            histogram.add('_sum', {'stage': stage}, total_ns / 1e9)
+
+            stats = latency.window_stats()
+            for q in (50, 90, 99):
+                window.add('', {'stage': stage, 'percentile': q}, stats[f'p{q}'] / 1000)
+        return [histogram, window]
+
+    def _detection_families(self):
+        attempts = _Family('detection_attempts', 'counter', 'Frames each detector was run on.')
+        successes = _Family('detection_successes', 'counter', 'Frames each detector found its target in.')
+        for detection_type, counts in list(self.metrics.detection_counts.items()):
+            # Successes first, so they never exceed the attempts read after them
+            success = counts['success']
+            attempts.add('_total', {'type': detection_type}, counts['total'])
+            successes.add('_total', {'type': detection_type}, success)
+        return [attempts, successes]
+
+    def _queue_families(self):
+        # queue_stats is replaced as a whole on each update, so this reads one consistent set
+        queue_stats = self.metrics.queue_stats
+        if not queue_stats:
+            return []
+        depth = _Family('queue_depth', 'gauge', 'Items waiting in each pipeline stage queue.')
+        capacity = _Family('queue_capacity', 'gauge', 'Capacity of each pipeline stage queue.')
+        dropped = _Family('queue_dropped_frames', 'counter', 'Frames each pipeline stage queue dropped under backpressure.')
+        for stage, stats in queue_stats.items():
+            depth.add('', {'stage': stage}, stats['depth'])
+            capacity.add('', {'stage': stage}, stats['capacity'])
+            dropped.add('_total', {'stage': stage}, stats['dropped'])
+        return [depth, capacity, dropped]
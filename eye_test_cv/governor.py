@@ -0,0 +1,139 @@
+"""
+Quality/latency governor for PostureDistanceDetector.
+Watches per-frame latency against a budget and steps through QUALITY_TIERS:
+lighter Pose model, no iris refinement, lower inference resolution. Hysteresis
+between the downgrade and upgrade thresholds, a minimum dwell per tier and a
+growing hold after a failed upgrade keep it from oscillating.
+"""
+
+import logging
+from collections import deque
+import numpy as np
+from eye_test_cv.config.settings import (
+    QUALITY_TIERS, GOVERNOR_WINDOW, GOVERNOR_DOWNGRADE_RATIO,
+    GOVERNOR_UPGRADE_RATIO, GOVERNOR_HOLD_FRAMES
+)
+
+logger = logging.getLogger(__name__)
+
+# Longest upgrade hold after repeated failed upgrades, as a multiple of hold_frames
+_MAX_HOLD_FACTOR = 16
+
+class QualityGovernor:
+    """
+    Chooses the quality tier for each frame from recent latencies.
+
+    Tier 0 is the best quality. The governor only decides; the detector applies
+    the current tier before analyzing a frame.
+
+    Attributes:
+        tiers (list): Effective tiers, best first (see QUALITY_TIERS)
+        budget (float): Per-frame latency budget in seconds
+        tier (int): Index of the current tier
+        changes (int): Number of tier changes so far
+    """
+
+    def __init__(self, target_fps=None, latency_budget=None, tiers=QUALITY_TIERS, require_iris=False,
+                 window=GOVERNOR_WINDOW, downgrade_ratio=GOVERNOR_DOWNGRADE_RATIO,
+                 upgrade_ratio=GOVERNOR_UPGRADE_RATIO, hold_frames=GOVERNOR_HOLD_FRAMES):
+        """
+        Args:
+            target_fps (float): Frame rate to sustain; sets the budget to 1 / target_fps
+            latency_budget (float): Per-frame latency budget in seconds, instead of target_fps
+            tiers (list): Quality tiers, best first
+            require_iris (bool): Keep refine_landmarks on in every tier, for consumers of the iris landmarks
+            window (int): Latencies averaged per decision
+            downgrade_ratio (float): Step down above this fraction of the budget
+            upgrade_ratio (float): Step up below this fraction of the budget
+            hold_frames (int): Minimum frames between tier changes
+        """
+        if latency_budget is None:
+            if not target_fps:
+                raise ValueError("QualityGovernor needs a target_fps or a latency_budget")
+            latency_budget = 1.0 / target_fps
+        if upgrade_ratio >= downgrade_ratio:
+            raise ValueError("upgrade_ratio must be below downgrade_ratio")
+        self.budget = latency_budget
+        self.tiers = self._effective_tiers(tiers, require_iris)
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.hold_frames = hold_frames
+        self.tier = 0
+        self.changes = 0
+        self._latencies = deque(maxlen=window)
+        self._frames_in_tier = 0
+        self._upgrade_hold = hold_frames
+        self._last_change_was_upgrade = False
+
+    @staticmethod
+    def _effective_tiers(tiers, require_iris):
+        effective = []
+        for tier in tiers:
+            tier = dict(tier)
+            if require_iris:
+                tier['refine_landmarks'] = True
+            settings = {key: value for key, value in tier.items() if key != 'name'}
+            # Forcing iris refinement can make neighbouring tiers identical
+            if effective and settings == {key: value for key, value in effective[-1].items() if key != 'name'}:
+                continue
+            effective.append(tier)
+        return effective
+
+    @property
+    def current(self):
+        """Settings of the current tier."""
+        return self.tiers[self.tier]
+
+    @property
+    def resolution(self):
+        """(width, height) the current tier runs inference at."""
+        return self.current['resolution']
+
+    def observe(self, latency):
+        """
+        Record one frame's latency and change tier if needed.
+
+        Args:
+            latency (float): The frame's 'total' latency in seconds
+
+        Returns:
+            bool: True if the tier changed
+        """
+        self._latencies.append(latency)
+        self._frames_in_tier += 1
+        if len(self._latencies) < self._latencies.maxlen or self._frames_in_tier < self.hold_frames:
+            return False
+
+        mean_latency = float(np.mean(self._latencies))
+        if mean_latency > self.budget * self.downgrade_ratio and self.tier < len(self.tiers) - 1:
+            # Falling back right after an upgrade means that tier does not fit: wait longer before retrying it
+            if self._last_change_was_upgrade and self._frames_in_tier < 2 * self._upgrade_hold:
+                self._upgrade_hold = min(self._upgrade_hold * 2, self.hold_frames * _MAX_HOLD_FACTOR)
+            self._change(self.tier + 1, mean_latency, upgrade=False)
+            return True
+        if (mean_latency < self.budget * self.upgrade_ratio and self.tier > 0
+                and self._frames_in_tier >= self._upgrade_hold):
+            self._change(self.tier - 1, mean_latency, upgrade=True)
+            return True
+        if self._last_change_was_upgrade and self._frames_in_tier >= 2 * self._upgrade_hold:
+            # The last upgrade held, so the next one need not wait as long
+            self._upgrade_hold = self.hold_frames
+        return False
+
+    def _change(self, tier, mean_latency, upgrade):
+        logger.info(f"Quality tier {self.tier} -> {tier} ({self.tiers[tier]['name']}): "
+                    f"mean latency {mean_latency * 1000:.1f}ms, budget {self.budget * 1000:.1f}ms")
+        self.tier = tier
+        self.changes += 1
+        self._frames_in_tier = 0
+        self._latencies.clear()
+        self._last_change_was_upgrade = upgrade
+
+    def get_stats(self):
+        """Current tier index and name, number of changes and the latency budget (ms)."""
+        return {
+            'tier': self.tier,
+            'name': self.current['name'],
+            'changes': self.changes,
+            'budget_ms': self.budget * 1000
+        }
@@ -0,0 +1,43 @@
+"""
+Deferred imports for heavy dependencies.
+Importing mediapipe takes most of a second (its solutions package pulls in
+matplotlib), so modules that need it hold a LazyModule instead and the import
+happens on first use, or ahead of time on a background thread during startup.
+"""
+
+import importlib
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Concurrent first accesses are serialized by the import system's own
+    per-module lock, so the module is imported exactly once.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        """Import the module now if it is not imported yet, and return it."""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            # Protocol lookups (copy, pickle, ...) should not trigger the import
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{'' if self.loaded else ' (not loaded)'}>"
+
+def lazy_import(name):
+    """Return a LazyModule for name, e.g. lazy_import('mediapipe.python.solutions.pose')."""
+    return LazyModule(name)
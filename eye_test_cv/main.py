@@ -5,7 +5,7 @@ logging.getLogger('mediapipe').setLevel(logging.ERROR)
 
 from eye_test_cv.config.logging_config import configure_logging
 from eye_test_cv.controller import PostureDistanceDetector
-from eye_test_cv.config.settings import KNOWN_FACE_WIDTH
+from eye_test_cv.config.settings import KNOWN_FACE_WIDTH, CALIBRATION_PROFILE_PATH
 
 def get_application_settings():
     print("\nApplication Settings")
@@ -128,7 +128,8 @@ def main():
     app = PostureDistanceDetector(
         auto_calibrate=auto_calibrate,
         gender=gender,
-        face_width=face_width
+        face_width=face_width,
+        calibration_profiles=CALIBRATION_PROFILE_PATH
     )
     app.run()
 
@@ -5,17 +5,21 @@ Provides tools for calculating camera focal length and estimating actual face di
 
 import cv2
 import numpy as np
-import mediapipe as mp
 from typing import Tuple, Optional
+from eye_test_cv.lazy import lazy_import
+
+mp_face_mesh = lazy_import('mediapipe.python.solutions.face_mesh')
 
 class CameraCalibrator:
     def __init__(self):
         """Initialize the calibrator with MediaPipe Face Mesh."""
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+        self.face_mesh = mp_face_mesh.FaceMesh(
             min_detection_confidence=0.6,
             min_tracking_confidence=0.6,
             max_num_faces=1
         )
+        # Built on the first ArUco calibration and reused after that
+        self._aruco_detector = None
         
     def calibrate_focal_length_with_reference(self, 
                                             frame: np.ndarray,
@@ -48,13 +52,13 @@ class CameraCalibrator:
         Returns:
             float: Calculated focal length in pixels
         """
-        # Create ArUco dictionary and detector
-        aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
-        aruco_params = cv2.aruco.DetectorParameters()
-        detector = cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
+        if self._aruco_detector is None:
+            aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+            aruco_params = cv2.aruco.DetectorParameters()
+            self._aruco_detector = cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
         
         # Detect markers
-        corners, ids, _ = detector.detectMarkers(frame)
+        corners, ids, _ = self._aruco_detector.detectMarkers(frame)
         
         if ids is not None and len(ids) > 0:
             # Assuming marker size is 5cm and distance is 50cm (adjust as needed)
@@ -0,0 +1,213 @@
+"""
+Module for persistent calibration profiles.
+Keeps the focal length, face width and EAR baselines measured for a camera at a
+given resolution, optionally per subject, in a JSON file, so a new session starts
+calibrated instead of measuring them again.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from eye_test_cv.config.settings import CALIBRATION_PROFILE_PATH, CALIBRATION_PROFILE_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUBJECT = 'default'
+_FILE_VERSION = 1
+
+class CalibrationProfile:
+    """
+    Calibration values of one camera, resolution and subject.
+
+    Attributes:
+        camera (str): Camera identity, see CalibrationStore.camera_identity()
+        resolution (tuple): (width, height) the values were measured at
+        subject (str): Whose face width and EAR baselines these are
+        focal_length_px (float): Focal length in pixels, or None
+        face_width_cm (float): Face width in centimeters, or None
+        ear_baseline (tuple): (left, right) open-eye EAR, or None
+        updated_at (dict): Value name -> time.time() it was last set
+    """
+
+    VALUES = ('focal_length_px', 'face_width_cm', 'ear_baseline')
+
+    def __init__(self, camera, resolution, subject=DEFAULT_SUBJECT, focal_length_px=None,
+                 face_width_cm=None, ear_baseline=None, updated_at=None):
+        self.camera = camera
+        self.resolution = tuple(resolution)
+        self.subject = subject
+        self.focal_length_px = focal_length_px
+        self.face_width_cm = face_width_cm
+        self.ear_baseline = tuple(ear_baseline) if ear_baseline is not None else None
+        self.updated_at = dict(updated_at or {})
+
+    @property
+    def key(self):
+        return CalibrationStore.key(self.camera, self.resolution, self.subject)
+
+    def is_stale(self, value, max_age=CALIBRATION_PROFILE_MAX_AGE, now=None):
+        """Whether value is missing or was last set more than max_age seconds ago."""
+        updated_at = self.updated_at.get(value)
+        if getattr(self, value) is None or updated_at is None:
+            return True
+        return (now if now is not None else time.time()) - updated_at > max_age
+
+    def to_dict(self):
+        return {
+            'camera': self.camera,
+            'resolution': list(self.resolution),
+            'subject': self.subject,
+            'focal_length_px': self.focal_length_px,
+            'face_width_cm': self.face_width_cm,
+            'ear_baseline': list(self.ear_baseline) if self.ear_baseline is not None else None,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['camera'], data['resolution'], data.get('subject', DEFAULT_SUBJECT),
+                   data.get('focal_length_px'), data.get('face_width_cm'), data.get('ear_baseline'),
+                   data.get('updated_at'))
+
+class CalibrationStore:
+    """
+    Calibration profiles in a JSON file, keyed by camera identity, resolution and subject.
+
+    The file is read once, when the store is created. Updates apply in memory
+    at once and are written on a background thread, so saving a profile never
+    blocks the frame loop. Each write re-reads the file and replaces only the
+    profiles this store changed, through a temporary file and os.replace(), so
+    the detectors of several streams can share one file.
+
+    Attributes:
+        path (str): The profile file
+    """
+
+    # Serializes the read-merge-write of every store in the process
+    _file_lock = threading.Lock()
+
+    def __init__(self, path=CALIBRATION_PROFILE_PATH):
+        """
+        Args:
+            path (str): JSON file to keep the profiles in; '~' is expanded and
+                missing directories are created on the first write
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._profiles = {key: CalibrationProfile.from_dict(data)
+                          for key, data in self._read_file().items()}
+        self._dirty = set()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='CalibrationStore')
+        self._pending = None
+
+    @staticmethod
+    def camera_identity(camera_source):
+        """Identity of a camera source: its device index, URL or file path as a string."""
+        return str(camera_source)
+
+    @staticmethod
+    def key(camera, resolution, subject=None):
+        width, height = resolution
+        return f"{camera}@{width}x{height}/{subject or DEFAULT_SUBJECT}"
+
+    def get(self, camera, resolution, subject=None):
+        """
+        The stored profile of camera at resolution for subject.
+
+        A subject seen for the first time on a known camera starts from that
+        camera's focal length, since the focal length does not depend on who sits
+        in front of it.
+
+        Args:
+            camera (str): Camera identity
+            resolution (tuple): (width, height)
+            subject (str): Subject name, or None for the default subject
+
+        Returns:
+            CalibrationProfile: A copy of the profile, or None if nothing is stored
+        """
+        with self._lock:
+            profile = self._profiles.get(self.key(camera, resolution, subject))
+            if profile is not None:
+                return CalibrationProfile.from_dict(profile.to_dict())
+            camera_profile = self._profiles.get(self.key(camera, resolution))
+            if camera_profile is None or camera_profile.focal_length_px is None:
+                return None
+            return CalibrationProfile(camera, resolution, subject or DEFAULT_SUBJECT,
+                                      focal_length_px=camera_profile.focal_length_px,
+                                      updated_at={'focal_length_px': camera_profile.updated_at.get('focal_length_px')})
+
+    def update(self, camera, resolution, subject=None, **values):
+        """
+        Set values (focal_length_px, face_width_cm, ear_baseline) on a profile and save it.
+
+        Only values that change are stamped, and nothing is written if none does.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        unknown = set(values) - set(CalibrationProfile.VALUES)
+        if unknown:
+            raise ValueError(f"Unknown calibration values: {', '.join(sorted(unknown))}")
+        key = self.key(camera, resolution, subject)
+        now = time.time()
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = CalibrationProfile(camera, resolution, subject or DEFAULT_SUBJECT)
+            changed = False
+            for name, value in values.items():
+                if value is None:
+                    continue
+                if name == 'ear_baseline':
+                    value = tuple(float(ear) for ear in value)
+                if value != getattr(profile, name):
+                    setattr(profile, name, value)
+                    profile.updated_at[name] = now
+                    changed = True
+            if changed:
+                self._dirty.add(key)
+                self._pending = self._writer.submit(self._write)
+        return changed
+
+    def flush(self):
+        """Wait until every update so far is written."""
+        pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def close(self):
+        """Write pending updates and stop the writer thread."""
+        self._writer.shutdown(wait=True)
+
+    def _read_file(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get('profiles', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable calibration profiles in {self.path}: {e}")
+            return {}
+
+    def _write(self):
+        with CalibrationStore._file_lock:
+            with self._lock:
+                changed = {key: self._profiles[key].to_dict() for key in self._dirty}
+                self._dirty.clear()
+            if not changed:
+                return
+            profiles = self._read_file()
+            profiles.update(changed)
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                temporary = f"{self.path}.{os.getpid()}.tmp"
+                with open(temporary, 'w') as f:
+                    json.dump({'version': _FILE_VERSION, 'profiles': profiles}, f, indent=2)
+                os.replace(temporary, self.path)
+                logger.debug(f"Saved calibration profiles {', '.join(changed)} to {self.path}")
+            except OSError as e:
+                logger.warning(f"Failed to save calibration profiles to {self.path}: {e}")
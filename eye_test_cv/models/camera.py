@@ -1,19 +1,48 @@
 import cv2
 import logging
-from time import sleep
+import threading
+import numpy as np
+from time import sleep, perf_counter
+from eye_test_cv.models.frame_buffers import FrameRing
 from eye_test_cv.config.settings import (
     MAX_CAMERA_ATTEMPTS, 
-    CAMERA_BUFFER_SIZE, IMAGE_WIDTH_PX
+    CAMERA_BUFFER_SIZE, CAMERA_READ_TIMEOUT, IMAGE_WIDTH_PX, CAPTURE_MODES
 )
 
 logger = logging.getLogger(__name__)
 
 class Camera:
-    def __init__(self, camera_source=1):
+    def __init__(self, camera_source=1, threaded=False, capture_size=None, frame_buffers=None):
+        """
+        Args:
+            camera_source: Device index, URL or video file passed to cv2.VideoCapture
+            threaded (bool): Grab frames on a background thread, latest frame wins
+            capture_size (tuple): Preferred (width, height); the closest mode in CAPTURE_MODES
+                the device accepts is used. None requests IMAGE_WIDTH_PX at 16:9.
+            frame_buffers (int): Number of reusable frames returned by read_frame() in turn
+                (see FrameRing), so a frame is overwritten that many reads later; None
+                returns a new array on every read, which the caller may keep
+        """
         self.cap = None
         self.width = IMAGE_WIDTH_PX
         self.height = int(IMAGE_WIDTH_PX * 9/16)  # 16:9 aspect ratio
+        self.capture_size = capture_size
         self.camera_source = camera_source
+        self._frames = FrameRing(frame_buffers) if frame_buffers else None
+        self._frame_shape = None
+
+        # Background capture (opt-in): a reader thread keeps only the newest frame
+        self.threaded = threaded
+        self._thread = None
+        self._running = False
+        self._frame_ready = threading.Condition()
+        self._frame = None
+        self._back_frame = None
+        self._timestamp = None
+        self._sequence = 0
+        self._last_read_sequence = 0
+        self.frames_captured = 0
+        self.dropped_frames = 0
 
     def initialize(self):
         for attempt in range(MAX_CAMERA_ATTEMPTS):
@@ -24,6 +53,8 @@ class Camera:
                 if self.cap.isOpened():
                     self._set_resolution()
                     logger.info(f"Camera connected at {self.width}x{self.height} using source: {self.camera_source}")
+                    if self.threaded:
+                        self._start_capture_thread()
                     return True
                 
                 logger.warning(f"Attempt {attempt+1}: Couldn't connect to camera source: {self.camera_source}")
@@ -36,18 +67,139 @@ class Camera:
         return False
 
     def _set_resolution(self):
+        if self.capture_size:
+            self._negotiate_resolution()
+            return
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         # Verify resolution
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+    def _candidate_modes(self):
+        """CAPTURE_MODES ordered by closeness to capture_size: same aspect ratio and at least
+        as large first (smallest first), then everything else by area difference."""
+        target_w, target_h = self.capture_size
+        def cost(mode):
+            width, height = mode
+            same_aspect = abs(width * target_h - height * target_w) <= 0.01 * width * target_h
+            large_enough = width >= target_w and height >= target_h
+            return (not (same_aspect and large_enough), abs(width * height - target_w * target_h))
+        return sorted(set(CAPTURE_MODES) | {tuple(self.capture_size)}, key=cost)
+
+    def _negotiate_resolution(self):
+        """Use the candidate mode closest to capture_size that the device reports back unchanged."""
+        for width, height in self._candidate_modes():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if (self.width, self.height) == (width, height):
+                return
+        logger.info(f"Source does not accept any capture mode, using {self.width}x{self.height}")
+
+    def set_frame_buffers(self, count):
+        """Change how many reusable frames read_frame() cycles through; None returns a new array per read."""
+        self._frames = FrameRing(count) if count else None
+
+    def _read_into(self, buffer):
+        """cap.read() into buffer when its shape matches the stream, otherwise into a new array."""
+        ret, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+        if ret:
+            self._frame_shape = frame.shape
+        return ret, frame
+
+    def _next_buffer(self, slot=None):
+        return self._frames.next(self._frame_shape, slot=slot) if self._frames and self._frame_shape else None
+
+    def _start_capture_thread(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="CameraCapture", daemon=True)
+        self._thread.start()
+        logger.info("Background capture started")
+
+    def _capture_loop(self):
+        """Continuously grab frames, overwriting any frame that was never read."""
+        while self._running:
+            # Double-buffered: read into the back frame, then swap it to the front under the lock
+            ret, frame = self._read_into(self._back_frame)
+            timestamp = perf_counter()
+            with self._frame_ready:
+                if not ret:
+                    logger.warning("Background capture stopped: no more frames from source")
+                    self._running = False
+                    self._frame_ready.notify_all()
+                    break
+                if self._sequence > self._last_read_sequence:
+                    self.dropped_frames += 1
+                self._frame, self._back_frame = frame, self._frame
+                self._timestamp = timestamp
+                self._sequence += 1
+                self.frames_captured += 1
+                self._frame_ready.notify_all()
+
     def read_frame(self):
-        if not self.cap or not self.cap.isOpened():
-            return False, None
-        return self.cap.read()
+        ret, frame, _, _ = self.read_frame_with_info()
+        return ret, frame
+
+    def read_frame_with_info(self, timeout=CAMERA_READ_TIMEOUT, slot=None):
+        """
+        Read the newest frame together with its capture metadata.
+
+        In threaded mode this never returns the same frame twice: it waits (up to
+        timeout seconds) for a frame newer than the last one handed out, and
+        fails early only once the capture thread has stopped.
+
+        Args:
+            timeout (float): Seconds to wait for a new frame in threaded mode
+            slot (int): FrameSlots slot whose buffer the frame is read into, if frames are leased
+
+        Returns:
+            tuple: (ret, frame, timestamp, sequence) where timestamp is the
+            perf_counter() value taken right after capture
+        """
+        if not self.threaded:
+            if not self.cap or not self.cap.isOpened():
+                return False, None, None, None
+            ret, frame = self._read_into(self._next_buffer(slot))
+            if not ret:
+                return False, None, None, None
+            self._sequence += 1
+            self.frames_captured += 1
+            return True, frame, perf_counter(), self._sequence
+
+        with self._frame_ready:
+            self._frame_ready.wait_for(
+                lambda: self._sequence > self._last_read_sequence or not self._running,
+                timeout=timeout)
+            if self._sequence == self._last_read_sequence:
+                if self._running:
+                    logger.warning(f"No new frame from {self.camera_source} within {timeout:.1f}s")
+                return False, None, None, None
+            self._last_read_sequence = self._sequence
+            # Copy out of the front frame so the capture thread can keep reusing it
+            if self._frames:
+                frame = self._frames.next(self._frame.shape, slot=slot)
+                np.copyto(frame, self._frame)
+            else:
+                frame = self._frame.copy()
+            return True, frame, self._timestamp, self._sequence
+
+    def get_drop_rate(self):
+        """Fraction of captured frames that were overwritten before being read."""
+        if self.frames_captured == 0:
+            return 0.0
+        return self.dropped_frames / self.frames_captured
 
     def release(self):
+        if self._thread:
+            with self._frame_ready:
+                self._running = False
+                self._frame_ready.notify_all()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+            if self.dropped_frames:
+                logger.info(f"Background capture dropped {self.dropped_frames} of {self.frames_captured} frames")
         if self.cap:
             self.cap.release()
             self.cap = None
\ No newline at end of file
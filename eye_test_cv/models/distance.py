@@ -4,13 +4,12 @@ This module uses MediaPipe's Face Mesh solution to detect facial landmarks and c
 based on the known average distance between human eyes.
 """
 
-import mediapipe as mp
 import numpy as np
 from eye_test_cv.config.settings import (
     KNOWN_FACE_WIDTH, MIN_DISTANCE_CM, MAX_DISTANCE_CM
 )
-
-mp_face_mesh = mp.solutions.face_mesh
+from eye_test_cv.models.face_landmarks import FaceLandmarker
+from eye_test_cv.models.landmarks import landmarks_to_array
 
 class DistanceEstimator:
     """
@@ -21,17 +20,27 @@ class DistanceEstimator:
     focal length of the camera.
 
     Attributes:
-        face_mesh (mp_face_mesh.FaceMesh): MediaPipe Face Mesh instance for facial landmark detection
+        face_landmarker (FaceLandmarker): Face landmark stage, shared with the eye tracker when provided
         focal_length_px (float): The focal length of the camera in pixels
+        face_width_cm (float): Real outer eye corner distance the distance is derived from
     """
 
-    def __init__(self):
-        self.face_mesh = mp_face_mesh.FaceMesh(
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.6,
-            max_num_faces=1
-        )
+    def __init__(self, face_landmarker=None):
+        # An owned landmarker is built on first use, so landmark-only analysis never loads it
+        self._owns_landmarker = face_landmarker is None
+        self._face_landmarker = face_landmarker
         self.focal_length_px = None
+        self.face_width_cm = KNOWN_FACE_WIDTH
+
+    @property
+    def face_landmarker(self):
+        if self._face_landmarker is None:
+            self._face_landmarker = FaceLandmarker(
+                refine_landmarks=False,
+                min_detection_confidence=0.6,
+                min_tracking_confidence=0.6
+            )
+        return self._face_landmarker
 
     def set_focal_length(self, focal_length_px):
         """
@@ -42,6 +51,15 @@ class DistanceEstimator:
         """
         self.focal_length_px = focal_length_px
 
+    def set_face_width(self, face_width_cm):
+        """
+        Set the real face width distances are estimated from.
+
+        Args:
+            face_width_cm (float): The face width in centimeters
+        """
+        self.face_width_cm = face_width_cm
+
     def estimate(self, frame_rgb, frame_width):
         """
         Estimate the distance between the camera and the detected face.
@@ -63,22 +81,36 @@ class DistanceEstimator:
         if not self.focal_length_px:
             return 0, "FOCAL LENGTH NOT SET", (255, 255, 255)
 
-        results = self.face_mesh.process(frame_rgb)
-        if not results.multi_face_landmarks:
+        return self.estimate_from_landmarks(self.face_landmarker.process(frame_rgb), frame_width)
+
+    def estimate_from_landmarks(self, face_landmarks, frame_width, points=None):
+        """
+        Estimate the distance from landmarks produced by the shared face landmark stage.
+
+        Args:
+            face_landmarks (NormalizedLandmarkList): Face landmarks, or None if no face was detected
+            frame_width (int): Width of the frame in pixels
+            points (numpy.ndarray): The same landmarks as an (N, 3) array, if the caller already converted them
+
+        Returns:
+            tuple: Same (distance, status, color) tuple as estimate()
+        """
+        if not self.focal_length_px:
+            return 0, "FOCAL LENGTH NOT SET", (255, 255, 255)
+
+        if face_landmarks is None:
             return 0, "NO FACE", (255, 255, 255)
 
         try:
-            face_landmarks = results.multi_face_landmarks[0]
-            left_eye = (face_landmarks.landmark[33].x * frame_width, 
-                        face_landmarks.landmark[33].y * frame_width)
-            right_eye = (face_landmarks.landmark[263].x * frame_width, 
-                         face_landmarks.landmark[263].y * frame_width)
-            
-            face_width_pixels = np.linalg.norm(np.array(left_eye) - np.array(right_eye))
+            if points is None:
+                points = landmarks_to_array(face_landmarks)
+            # Outer eye corners; both axes are scaled by the frame width
+            eye_delta = points[33, :2] - points[263, :2]
+            face_width_pixels = float(np.hypot(eye_delta[0], eye_delta[1])) * frame_width
             if face_width_pixels <= 0:
                 return 0, "INVALID FACE", (255, 255, 255)
 
-            distance_cm = (KNOWN_FACE_WIDTH * self.focal_length_px) / face_width_pixels
+            distance_cm = (self.face_width_cm * self.focal_length_px) / face_width_pixels
 
             if distance_cm < MIN_DISTANCE_CM:
                 return distance_cm, "TOO CLOSE!", (0, 0, 255)
@@ -90,7 +122,8 @@ class DistanceEstimator:
 
     def close(self):
         """
-        Release the MediaPipe Face Mesh resources.
+        Release the MediaPipe Face Mesh resources if this estimator owns them.
         Should be called when the estimator is no longer needed.
         """
-        self.face_mesh.close()
\ No newline at end of file
+        if self._owns_landmarker and self._face_landmarker is not None:
+            self._face_landmarker.close()
\ No newline at end of file
@@ -1,21 +1,25 @@
-import mediapipe as mp
 import numpy as np
 from collections import deque
+from eye_test_cv.models.face_landmarks import FaceLandmarker
+from eye_test_cv.models.landmarks import landmarks_to_array
 
 class EyeTracker:
-    def __init__(self):
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, face_landmarker=None):
+        # Share the caller's face landmark stage when given, otherwise own one (built on first use)
+        self._owns_landmarker = face_landmarker is None
+        self._face_landmarker = face_landmarker
         
         # Enhanced MediaPipe indices for left eye (including more contour points)
         self.LEFT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
         # Enhanced MediaPipe indices for right eye (including more contour points)
         self.RIGHT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
 
+        # Point pairs for computing both EARs at once: the four upper/lower
+        # contour pairs (i+1, -i-2) of each eye, then each eye's corners (0, 8)
+        eyes = np.array([self.LEFT_EYE, self.RIGHT_EYE])
+        self._ear_pairs_a = np.concatenate([eyes[:, 1:5].ravel(), eyes[:, 0]])
+        self._ear_pairs_b = np.concatenate([eyes[:, 14:10:-1].ravel(), eyes[:, 8]])
+
         # Buffers for temporal smoothing
         self.left_ear_buffer = deque(maxlen=5)
         self.right_ear_buffer = deque(maxlen=5)
@@ -27,29 +31,52 @@ class EyeTracker:
         
         # Initial threshold (will be adjusted during calibration)
         self.EAR_THRESHOLD = 0.2
+        # Calibrated threshold as a fraction of the lower baseline EAR
+        self.calibration_ratio = 0.75
         self.calibrated = False
+        # Mean (left, right) open-eye EAR the threshold was set from
+        self.baseline = None
+        # Called with the left and right baseline EARs whenever calibration sets them, e.g. to store them
+        self.on_calibrated = None
+        # Open-eye EARs being collected to replace a stored baseline, see load_baseline()
+        self._refresh_ears = None
+
+    @property
+    def face_landmarker(self):
+        if self._face_landmarker is None:
+            self._face_landmarker = FaceLandmarker(refine_landmarks=True)
+        return self._face_landmarker
 
-    def calculate_ear(self, landmarks, eye_indices):
-        """Calculate the enhanced eye aspect ratio (EAR) using more points."""
-        points = []
-        for i in eye_indices:
-            point = landmarks[i]
-            points.append([point.x, point.y])
-        points = np.array(points)
+    def calculate_ear(self, points, eye_indices):
+        """Calculate the enhanced eye aspect ratio (EAR) of one eye from an (N, 3) landmark array."""
+        eye = points[eye_indices, :2]
         
-        # Calculate the mean height using multiple points
-        heights = []
-        for i in range(4):
-            h = np.linalg.norm(points[i+1] - points[-i-2])
-            heights.append(h)
-        height = np.mean(heights)
+        # Mean height over four upper/lower contour pairs
+        heights = eye[1:5] - eye[14:10:-1]
+        height = np.hypot(heights[:, 0], heights[:, 1]).mean()
         
-        # Calculate the eye width
-        width = np.linalg.norm(points[0] - points[8])
+        # Eye width between the corners
+        width = np.hypot(*(eye[0] - eye[8]))
         
         # Calculate eye aspect ratio
         ear = height / width if width > 0 else 0
-        return ear
+        return float(ear)
+
+    def calculate_ears(self, points):
+        """Calculate the EAR of both eyes from an (N, 3) landmark array.
+
+        Returns:
+            tuple: (left_ear, right_ear)
+        """
+        deltas = points[self._ear_pairs_a, :2] - points[self._ear_pairs_b, :2]
+        lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        height = lengths[:8].reshape(2, 4).mean(axis=1)
+        width = lengths[8:]
+        if width.all():
+            ears = height / width
+        else:
+            ears = np.divide(height, width, out=np.zeros_like(height), where=width > 0)
+        return float(ears[0]), float(ears[1])
 
     def update_calibration(self, left_ear, right_ear):
         """Update calibration values for dynamic thresholding."""
@@ -66,35 +93,74 @@ class EyeTracker:
                 # Calculate baseline EAR values
                 left_baseline = np.mean(self.baseline_ears['left'])
                 right_baseline = np.mean(self.baseline_ears['right'])
-                
-                # Set threshold as percentage of baseline
-                self.EAR_THRESHOLD = min(left_baseline, right_baseline) * 0.75
-                self.calibrated = True
+                self._set_baseline(left_baseline, right_baseline)
                 return True
         return False
 
+    def load_baseline(self, left_ear, right_ear, refresh=False):
+        """Calibrate from stored baseline EARs instead of the first required_calibration_frames frames.
+
+        Args:
+            left_ear (float): Baseline open-eye EAR of the left eye
+            right_ear (float): Baseline open-eye EAR of the right eye
+            refresh (bool): Keep tracking with the stored baseline while measuring a new one
+                from the next required_calibration_frames open-eye frames, then switch to it
+        """
+        self.baseline_ears = {'left': None, 'right': None}
+        self.calibration_frames = self.required_calibration_frames
+        self._set_baseline(left_ear, right_ear, notify=False)
+        self._refresh_ears = [] if refresh else None
+
+    def _set_baseline(self, left_baseline, right_baseline, notify=True):
+        # Set threshold as percentage of baseline
+        self.baseline = (float(left_baseline), float(right_baseline))
+        self.EAR_THRESHOLD = min(self.baseline) * self.calibration_ratio
+        self.calibrated = True
+        if notify and self.on_calibrated:
+            self.on_calibrated(*self.baseline)
+
+    def _refresh_baseline(self, left_ear, right_ear):
+        # Only frames with both eyes open under the current threshold measure the open-eye baseline
+        if left_ear < self.EAR_THRESHOLD or right_ear < self.EAR_THRESHOLD:
+            return
+        self._refresh_ears.append((left_ear, right_ear))
+        if len(self._refresh_ears) >= self.required_calibration_frames:
+            left_baseline, right_baseline = np.mean(self._refresh_ears, axis=0)
+            self._refresh_ears = None
+            self._set_baseline(left_baseline, right_baseline)
+
     def get_smoothed_ear(self, current_ear, buffer):
         """Apply temporal smoothing to EAR values."""
         buffer.append(current_ear)
         return np.median(buffer)
 
     def analyze(self, frame_rgb):
-        results = self.face_mesh.process(frame_rgb)
-        if not results.multi_face_landmarks:
+        return self.analyze_landmarks(self.face_landmarker.process(frame_rgb))
+
+    def analyze_landmarks(self, face_landmark_list, points=None):
+        """Analyze eye state from landmarks produced by the shared face landmark stage.
+
+        Args:
+            face_landmark_list: Face landmarks, or None if no face was detected
+            points: The same landmarks as an (N, 3) array, if the caller already converted them
+        """
+        if face_landmark_list is None:
             return "NO FACE DETECTED", None, None, False
         
-        face_landmarks = results.multi_face_landmarks[0].landmark
+        if points is None:
+            points = landmarks_to_array(face_landmark_list)
         
         # Calculate EAR for both eyes
-        left_ear = self.calculate_ear(face_landmarks, self.LEFT_EYE)
-        right_ear = self.calculate_ear(face_landmarks, self.RIGHT_EYE)
+        left_ear, right_ear = self.calculate_ears(points)
         
         # Update calibration if needed
         just_calibrated = False
         if not self.calibrated:
             just_calibrated = self.update_calibration(left_ear, right_ear)
             if not self.calibrated:
-                return "CALIBRATING... KEEP EYES OPEN", results.multi_face_landmarks[0], (left_ear, right_ear), False
+                return "CALIBRATING... KEEP EYES OPEN", face_landmark_list, (left_ear, right_ear), False
+        elif self._refresh_ears is not None:
+            self._refresh_baseline(left_ear, right_ear)
         
         # Apply temporal smoothing
         smoothed_left_ear = self.get_smoothed_ear(left_ear, self.left_ear_buffer)
@@ -117,7 +183,8 @@ class EyeTracker:
         if just_calibrated:
             status = "CALIBRATION COMPLETE - " + status
             
-        return status, results.multi_face_landmarks[0], (smoothed_left_ear, smoothed_right_ear), self.calibrated
+        return status, face_landmark_list, (smoothed_left_ear, smoothed_right_ear), self.calibrated
 
     def close(self):
-        self.face_mesh.close() 
\ No newline at end of file
+        if self._owns_landmarker and self._face_landmarker is not None:
+            self._face_landmarker.close() 
\ No newline at end of file
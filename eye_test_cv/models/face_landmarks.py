@@ -0,0 +1,86 @@
+"""
+Module for the shared face landmark stage.
+Runs a single MediaPipe Face Mesh graph per frame so that the eye tracker and the
+distance estimator can both consume the same landmarks.
+"""
+
+import numpy as np
+from eye_test_cv.lazy import lazy_import
+
+mp_face_mesh = lazy_import('mediapipe.python.solutions.face_mesh')
+
+class FaceLandmarker:
+    """
+    A thin wrapper around MediaPipe's Face Mesh that is run once per frame.
+
+    The refined landmark set is a superset of the plain one (indices 0-467 are
+    identical), so one graph with refine_landmarks enabled serves both the
+    eye tracker and the distance estimator.
+
+    Attributes:
+        face_mesh (mp_face_mesh.FaceMesh): MediaPipe Face Mesh instance for facial landmark detection,
+            built (and mediapipe imported) on first use
+        refine_landmarks (bool): Whether the graph also produces the iris landmarks
+    """
+
+    def __init__(self, refine_landmarks=True, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.refine_landmarks = refine_landmarks
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self._face_mesh = None
+
+    @property
+    def face_mesh(self):
+        if self._face_mesh is None:
+            self._face_mesh = self._build()
+        return self._face_mesh
+
+    def _build(self):
+        return mp_face_mesh.FaceMesh(
+            max_num_faces=1,
+            refine_landmarks=self.refine_landmarks,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence
+        )
+
+    def set_refine_landmarks(self, refine_landmarks):
+        """
+        Switch iris refinement on or off, rebuilding the Face Mesh graph if it changes.
+
+        Without refinement only the 468 face landmarks are produced (no iris points 468-477).
+        """
+        if refine_landmarks == self.refine_landmarks:
+            return
+        self.refine_landmarks = refine_landmarks
+        if self._face_mesh is not None:
+            previous, self._face_mesh = self._face_mesh, self._build()
+            previous.close()
+
+    def warm_up(self, frame_size):
+        """Build the graph and run one blank frame through it, so the first real frame pays no setup cost.
+
+        Args:
+            frame_size (tuple): (width, height) of the frames that will be processed
+        """
+        width, height = frame_size
+        self.face_mesh.process(np.zeros((height, width, 3), dtype=np.uint8))
+
+    def process(self, frame_rgb):
+        """
+        Detect the face landmarks in a frame.
+
+        Args:
+            frame_rgb (numpy.ndarray): RGB image frame to process
+
+        Returns:
+            NormalizedLandmarkList: Landmarks of the first detected face, or None if no face was found
+        """
+        results = self.face_mesh.process(frame_rgb)
+        if not results.multi_face_landmarks:
+            return None
+        return results.multi_face_landmarks[0]
+
+    def close(self):
+        """Release the MediaPipe Face Mesh resources."""
+        if self._face_mesh is not None:
+            self._face_mesh.close()
@@ -0,0 +1,91 @@
+"""
+Module for reusable frame buffers.
+Capture, resize and color conversion write into preallocated arrays instead of
+allocating a new frame-sized array on every frame.
+"""
+
+import queue
+import numpy as np
+
+class FrameRing:
+    """
+    A fixed ring of preallocated image buffers handed out in turn, or by slot.
+
+    Handed out in turn, a buffer is reused count frames later, which is only
+    safe while frames are consumed in order (the serial loop, the async stream).
+    Where frames can be dropped or held back out of order, as in the pipelined
+    executor, every frame instead leases a slot from FrameSlots and uses the
+    buffer at that slot in each ring until the slot is released.
+
+    Attributes:
+        count (int): Number of buffers in the ring
+    """
+
+    def __init__(self, count=1):
+        self.count = max(1, count)
+        self._buffers = [None] * self.count
+        self._index = 0
+
+    def next(self, shape, dtype=np.uint8, slot=None):
+        """
+        Get the next buffer, (re)allocating it only if its shape or dtype changed.
+
+        Args:
+            shape (tuple): Required array shape
+            dtype: Required array dtype
+            slot (int): Use the buffer of this FrameSlots slot instead of the next in turn
+
+        Returns:
+            numpy.ndarray: Buffer with undefined contents
+        """
+        if slot is None:
+            self._index = (self._index + 1) % self.count
+            slot = self._index
+        buffer = self._buffers[slot]
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[slot] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def resize(self, count):
+        """Change the number of buffers; existing buffers are dropped."""
+        self.__init__(count)
+
+class FrameSlots:
+    """
+    Free list of the slots of frames in flight on several threads.
+
+    A frame's buffers are those at its slot in every FrameRing, so the slot is
+    leased by capture and released by whichever stage is last to use the frame,
+    including a queue that drops it. When every slot is in use, capture waits.
+
+    Attributes:
+        count (int): Number of slots, and of buffers each FrameRing needs
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self._free = queue.Queue()
+        for slot in range(count):
+            self._free.put(slot)
+
+    def acquire(self, stop_event, timeout=0.1):
+        """
+        Lease a free slot, waiting for one to be released if necessary.
+
+        Returns:
+            int: The slot, or None if stop_event was set while waiting
+        """
+        while not stop_event.is_set():
+            try:
+                return self._free.get(timeout=timeout)
+            except queue.Empty:
+                pass
+        return None
+
+    def release(self, slot):
+        """Return a leased slot; its buffers may be overwritten from now on."""
+        if slot is not None:
+            self._free.put(slot)
+
+    def available(self):
+        return self._free.qsize()
@@ -0,0 +1,145 @@
+"""
+Module for the per-frame analysis result.
+FrameResult is a compact, slotted record of everything the analyzers produce for
+one frame. Landmarks are held as NumPy arrays rather than protobuf lists, so a
+result is cheap to copy, pickle across processes and serialize.
+"""
+
+import math
+
+class FrameResult:
+    """
+    Analysis results for a single frame.
+
+    Attributes:
+        frame_index (int): Index of the frame in its source, -1 if unknown
+        timestamp (float): Capture time of the frame (time.time()), 0.0 if unknown
+        eye_status (str): Eye tracker status message
+        left_ear (float): Smoothed left eye aspect ratio, NaN if no face was found
+        right_ear (float): Smoothed right eye aspect ratio, NaN if no face was found
+        is_calibrated (bool): Whether the eye tracker has finished calibrating
+        posture_status (str): Posture analyzer status message
+        posture_color (tuple): BGR color for the posture status
+        vertical_difference (float): Head tilt measurement
+        horizontal_difference (float): Forward lean measurement
+        distance (float): Estimated face distance in centimeters (0 if unavailable)
+        distance_status (str): Distance estimator status message
+        distance_color (tuple): BGR color for the distance status
+        face_points (numpy.ndarray): (N, 3) normalized face landmarks, or None
+        pose_points (numpy.ndarray): (N, 3) normalized pose landmarks, or None
+        pose_visibility (numpy.ndarray): (N,) pose landmark visibility, or None
+        eye_age (int): Frames since the eye result was computed (0 = this frame)
+        distance_age (int): Frames since the distance result was computed
+        posture_age (int): Frames since the posture result was computed
+    """
+
+    __slots__ = (
+        'frame_index', 'timestamp',
+        'eye_status', 'left_ear', 'right_ear', 'is_calibrated',
+        'posture_status', 'posture_color', 'vertical_difference', 'horizontal_difference',
+        'distance', 'distance_status', 'distance_color',
+        'face_points', 'pose_points', 'pose_visibility',
+        'eye_age', 'distance_age', 'posture_age'
+    )
+
+    def __init__(self, frame_index=-1, timestamp=0.0,
+                 eye_status="", left_ear=math.nan, right_ear=math.nan, is_calibrated=False,
+                 posture_status="", posture_color=(255, 255, 255),
+                 vertical_difference=0.0, horizontal_difference=0.0,
+                 distance=0.0, distance_status="", distance_color=(255, 255, 255),
+                 face_points=None, pose_points=None, pose_visibility=None,
+                 eye_age=0, distance_age=0, posture_age=0):
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        self.eye_status = eye_status
+        self.left_ear = left_ear
+        self.right_ear = right_ear
+        self.is_calibrated = is_calibrated
+        self.posture_status = posture_status
+        self.posture_color = posture_color
+        self.vertical_difference = vertical_difference
+        self.horizontal_difference = horizontal_difference
+        self.distance = distance
+        self.distance_status = distance_status
+        self.distance_color = distance_color
+        self.face_points = face_points
+        self.pose_points = pose_points
+        self.pose_visibility = pose_visibility
+        self.eye_age = eye_age
+        self.distance_age = distance_age
+        self.posture_age = posture_age
+
+    @classmethod
+    def from_analysis(cls, eye_result, posture_result, distance_data,
+                      face_points=None, pose_points=None, pose_visibility=None,
+                      frame_index=-1, timestamp=0.0):
+        """Build a result from the tuples returned by the individual analyzers."""
+        eye_status, _, ear_values, is_calibrated = eye_result
+        posture_status, posture_color, vert_diff, horiz_diff, _ = posture_result
+        distance, distance_status, distance_color = distance_data
+        left_ear, right_ear = ear_values if ear_values else (math.nan, math.nan)
+        return cls(frame_index, timestamp,
+                   eye_status, float(left_ear), float(right_ear), bool(is_calibrated),
+                   posture_status, posture_color, float(vert_diff), float(horiz_diff),
+                   float(distance), distance_status, distance_color,
+                   face_points, pose_points, pose_visibility)
+
+    @property
+    def ear_values(self):
+        """(left_ear, right_ear), or None if no face was found."""
+        if math.isnan(self.left_ear):
+            return None
+        return self.left_ear, self.right_ear
+
+    @property
+    def face_detected(self):
+        return self.face_points is not None
+
+    @property
+    def pose_detected(self):
+        return self.pose_points is not None
+
+    def copy(self):
+        """Shallow copy; landmark arrays are shared, not duplicated."""
+        result = FrameResult.__new__(FrameResult)
+        for name in self.__slots__:
+            setattr(result, name, getattr(self, name))
+        return result
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def to_dict(self, include_landmarks=False):
+        """
+        Convert to a plain, JSON-serializable dict.
+
+        Args:
+            include_landmarks (bool): Include the landmark arrays as nested lists
+        """
+        record = {
+            'frame': self.frame_index,
+            'timestamp': self.timestamp,
+            'eye_status': self.eye_status,
+            'ear_values': list(self.ear_values) if self.ear_values else None,
+            'is_calibrated': self.is_calibrated,
+            'posture_status': self.posture_status,
+            'vertical_difference': self.vertical_difference,
+            'horizontal_difference': self.horizontal_difference,
+            'distance': self.distance,
+            'distance_status': self.distance_status,
+            'eye_age': self.eye_age,
+            'distance_age': self.distance_age,
+            'posture_age': self.posture_age
+        }
+        if include_landmarks:
+            record['face_landmarks'] = self.face_points.tolist() if self.face_detected else None
+            record['pose_landmarks'] = self.pose_points.tolist() if self.pose_detected else None
+        return record
+
+    def __repr__(self):
+        return (f"FrameResult(frame={self.frame_index}, eye={self.eye_status!r}, "
+                f"posture={self.posture_status!r}, distance={self.distance:.1f})")
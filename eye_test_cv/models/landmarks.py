@@ -0,0 +1,120 @@
+"""
+Module for converting MediaPipe landmark lists to NumPy arrays.
+Each result is converted once per frame into a contiguous (N, 3) float32 array of
+normalized x, y, z coordinates, so that downstream measurements can use array
+indexing instead of per-landmark protobuf attribute access.
+"""
+
+import numpy as np
+
+# Wire format of a serialized (Normalized)LandmarkList: every landmark is a
+# length-delimited record of field 1, holding float (fixed32) fields x=1, y=2,
+# z=3 and, when set, visibility=4 and presence=5. A detector sets the same
+# fields on every landmark, so all records share the layout of the first one.
+_LANDMARK_TAG = 1 << 3 | 2
+_FIXED32 = 5
+_X, _Y, _Z, _VISIBILITY = 1, 2, 3, 4
+
+def _read_varint(buffer, pos):
+    value = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def _record_layout(buffer):
+    """Decode the first landmark record of buffer.
+
+    Returns:
+        tuple: (record size in bytes, {field number: byte offset of its value}),
+        or None if the record holds anything but fixed32 fields
+    """
+    try:
+        tag, pos = _read_varint(buffer, 0)
+        if tag != _LANDMARK_TAG:
+            return None
+        length, pos = _read_varint(buffer, pos)
+        end = pos + length
+        offsets = {}
+        while pos < end:
+            field_tag, pos = _read_varint(buffer, pos)
+            if field_tag & 7 != _FIXED32:
+                return None
+            offsets[field_tag >> 3] = pos
+            pos += 4
+    except IndexError:
+        return None
+    if pos != end or not {_X, _Y, _Z} <= offsets.keys():
+        return None
+    return end, offsets
+
+def _parse_serialized(landmark_list, count):
+    """Decode the landmark list straight from its wire bytes, or return None if its records differ in layout.
+
+    Returns:
+        tuple: (points, visibility) where visibility is None if the records carry none
+    """
+    buffer = landmark_list.SerializeToString()
+    layout = _record_layout(buffer)
+    if layout is None:
+        return None
+    itemsize, offsets = layout
+    if len(buffer) != itemsize * count:
+        return None
+    # Every record must repeat the first one's tag and length bytes, i.e. have the same layout
+    raw = np.frombuffer(buffer, dtype=np.uint8).reshape(count, itemsize)
+    structure = np.ones(itemsize, dtype=bool)
+    for offset in offsets.values():
+        structure[offset:offset + 4] = False
+    if not (raw[:, structure] == raw[0, structure]).all():
+        return None
+
+    def column(field):
+        return np.ndarray((count,), dtype='<f4', buffer=buffer, offset=offsets[field], strides=(itemsize,))
+
+    points = np.empty((count, 3), dtype=np.float32)
+    for axis, field in enumerate((_X, _Y, _Z)):
+        points[:, axis] = column(field)
+    visibility = column(_VISIBILITY) if _VISIBILITY in offsets else None
+    return points, visibility
+
+def landmarks_to_array(landmark_list, with_visibility=False):
+    """
+    Convert a MediaPipe landmark list to a contiguous (N, 3) float32 array.
+
+    Args:
+        landmark_list (NormalizedLandmarkList): Landmarks from Face Mesh or Pose, or None
+        with_visibility (bool): Also return the per-landmark visibility (1.0 where unset)
+
+    Returns:
+        numpy.ndarray: Array of normalized (x, y, z) coordinates, or None if no landmarks were given.
+        With with_visibility, a (points, visibility) tuple instead.
+    """
+    if landmark_list is None:
+        return (None, None) if with_visibility else None
+    count = len(landmark_list.landmark)
+    if count == 0:
+        points = np.empty((0, 3), dtype=np.float32)
+        return (points, np.empty(0, dtype=np.float32)) if with_visibility else points
+
+    parsed = _parse_serialized(landmark_list, count)
+    if parsed is None:
+        # Records differ in layout: read the fields through the protobuf API instead
+        landmarks = landmark_list.landmark
+        points = np.fromiter((value for p in landmarks for value in (p.x, p.y, p.z)),
+                             dtype=np.float32, count=3 * count).reshape(count, 3)
+        if not with_visibility:
+            return points
+        visibility = np.fromiter((p.visibility if p.HasField('visibility') else 1.0 for p in landmarks),
+                                 dtype=np.float32, count=count)
+        return points, visibility
+
+    points, visibility = parsed
+    if not with_visibility:
+        return points
+    if visibility is None:
+        return points, np.ones(count, dtype=np.float32)
+    return points, np.array(visibility, dtype=np.float32)
@@ -1,63 +1,228 @@
 import time
 import logging
+from array import array
 from collections import deque
 import numpy as np
+from eye_test_cv.config.settings import METRICS_WINDOW_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Histogram layout: values below 2**_SUB_BUCKET_BITS ns get one bucket each, every
+# power of two above that is split into 2**(_SUB_BUCKET_BITS - 1) buckets, so a
+# bucket is never wider than 1/64 of its values. 31 magnitudes cover 1 ns to ~69 s.
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_HALF = 1 << (_SUB_BUCKET_BITS - 1)
+_BUCKET_COUNT = 32 * _SUB_BUCKET_HALF
+
+def _bucket_values():
+    # Midpoint (ns) of each bucket, used as the value of everything recorded in it
+    index = np.arange(_BUCKET_COUNT)
+    shift = np.maximum(index // _SUB_BUCKET_HALF - 1, 0)
+    lower = (index - shift * _SUB_BUCKET_HALF) << shift
+    return lower + ((1 << shift) - 1) / 2
+
+_BUCKET_VALUES = _bucket_values()
+
+class LatencyHistogram:
+    """
+    Fixed-size log-bucketed histogram of durations in nanoseconds (HDR-style).
+
+    Buckets are preallocated, so record() is O(1) and never allocates; percentiles
+    are read from the bucket counts with about 1.6% relative error. The exact
+    minimum, maximum and sum are kept alongside.
+    """
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.sum = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value_ns):
+        """Add one duration in nanoseconds."""
+        shift = value_ns.bit_length() - _SUB_BUCKET_BITS
+        index = value_ns if shift <= 0 else (shift << (_SUB_BUCKET_BITS - 1)) + (value_ns >> shift)
+        self.counts[index if index < _BUCKET_COUNT else _BUCKET_COUNT - 1] += 1
+        if not self.count or value_ns < self.min:
+            self.min = value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        self.count += 1
+        self.sum += value_ns
+
+    def reset(self):
+        """Clear all recorded values."""
+        np.frombuffer(self.counts, dtype=np.int64)[:] = 0
+        self.count = 0
+        self.sum = 0
+        self.min = 0
+        self.max = 0
+
+    def cumulative_counts(self, bounds_ns):
+        """
+        Counts at or below each bound, for exporting as fixed-boundary histogram buckets.
+
+        Args:
+            bounds_ns (numpy.ndarray): Ascending upper bounds in nanoseconds
+
+        Returns:
+            tuple: (cumulative count per bound, total count), read from one copy of the buckets
+        """
+        cumulative = np.cumsum(np.frombuffer(self.counts, dtype=np.int64))
+        below = np.searchsorted(_BUCKET_VALUES, bounds_ns, side='right')
+        counts = np.where(below > 0, cumulative[np.maximum(below - 1, 0)], 0)
+        return counts, int(cumulative[-1])
+
+    @staticmethod
+    def summarize(*histograms, percentiles=(50, 90, 99)):
+        """
+        Statistics of one or more histograms merged together, in milliseconds.
+
+        Returns:
+            dict: 'count', 'mean', 'max' and one 'p<N>' entry per requested percentile
+        """
+        histograms = [h for h in histograms if h.count]
+        stats = {'count': sum(h.count for h in histograms), 'mean': 0.0, 'max': 0.0}
+        stats.update({f'p{q}': 0.0 for q in percentiles})
+        if not histograms:
+            return stats
+
+        counts = np.frombuffer(histograms[0].counts, dtype=np.int64)
+        for h in histograms[1:]:
+            counts = counts + np.frombuffer(h.counts, dtype=np.int64)
+        cumulative = np.cumsum(counts)
+        # Rank by the bucket total, which a concurrent record() may have moved past count
+        total = cumulative[-1]
+        maximum = max(h.max for h in histograms)
+        ranks = np.maximum(np.ceil(np.array(percentiles) / 100 * total), 1)
+        values = np.minimum(_BUCKET_VALUES[np.searchsorted(cumulative, ranks)], maximum)
+
+        stats['mean'] = sum(h.sum for h in histograms) / stats['count'] / 1e6
+        stats['max'] = maximum / 1e6
+        for q, value in zip(percentiles, values):
+            stats[f'p{q}'] = float(value) / 1e6
+        return stats
+
+class WindowedLatency:
+    """
+    Lifetime and windowed latency histograms of one stage.
+
+    The window is made of fixed intervals of window_seconds: the view covers the
+    last completed interval plus the current one, so it always spans between one
+    and two intervals of the most recent data.
+    """
+
+    def __init__(self, window_seconds=METRICS_WINDOW_SECONDS):
+        self.interval_ns = int(window_seconds * 1e9)
+        self.lifetime = LatencyHistogram()
+        self.current = LatencyHistogram()
+        self.previous = LatencyHistogram()
+        self._rotate_at = time.perf_counter_ns() + self.interval_ns
+
+    def record(self, value_ns, now_ns):
+        """Add one duration that ended at perf_counter_ns() value now_ns."""
+        if now_ns >= self._rotate_at:
+            self._rotate(now_ns)
+        self.lifetime.record(value_ns)
+        self.current.record(value_ns)
+
+    def _rotate(self, now_ns):
+        self.previous, self.current = self.current, self.previous
+        self.current.reset()
+        if now_ns >= self._rotate_at + self.interval_ns:
+            # Idle for more than a whole interval: nothing recent to keep
+            self.previous.reset()
+        self._rotate_at = now_ns + self.interval_ns
+
+    def window_stats(self):
+        """Percentile statistics (ms) of the recent window."""
+        if time.perf_counter_ns() >= self._rotate_at + self.interval_ns:
+            return LatencyHistogram.summarize()
+        return LatencyHistogram.summarize(self.previous, self.current)
+
+    def lifetime_stats(self):
+        """Percentile statistics (ms) of everything recorded."""
+        return LatencyHistogram.summarize(self.lifetime)
+
 class PerformanceMetrics:
-    def __init__(self, window_size=30, detailed=True):
+    """
+    Frame rate, per-stage latency and detection statistics.
+
+    Stages are timed with the monotonic perf_counter_ns clock into WindowedLatency
+    histograms, so recording a timing is O(1) and tail latencies (p90/p99/max) are
+    reported next to the mean. snapshot() computes the statistics once and can be
+    reused by callers that read them often, such as the on-screen metrics panel.
+    """
+
+    STAGES = ('total', 'face_mesh', 'eye_tracking', 'posture', 'distance', 'motion_gate', 'render')
+
+    def __init__(self, window_size=30, detailed=True, window_seconds=METRICS_WINDOW_SECONDS):
         """Initialize performance metrics tracking."""
         self.window_size = window_size
+        self.window_seconds = window_seconds
         self.detailed = detailed
         
-      
-        self.frame_times = deque(maxlen=window_size)
         self.fps_history = deque(maxlen=window_size)
-        self.last_fps_time = time.time()
+        self.last_fps_time = time.perf_counter()
         self.frame_count = 0
+        self._snapshot = None
+        self._snapshot_time = 0.0
         
         if detailed:
-            self.processing_times = {
-                'total': deque(maxlen=window_size),
-                'eye_tracking': deque(maxlen=window_size),
-                'posture': deque(maxlen=window_size),
-                'distance': deque(maxlen=window_size)
-            }
+            self.latencies = {stage: WindowedLatency(window_seconds) for stage in self.STAGES}
             
             self.detection_counts = {
                 'face': {'success': 0, 'total': 0},
                 'pose': {'success': 0, 'total': 0},
                 'eyes': {'success': 0, 'total': 0}
             }
-            
-            self.model_latencies = {
-                'face_mesh': deque(maxlen=window_size),
-                'pose': deque(maxlen=window_size)
-            }
         else:
-            self.processing_times = {}
+            self.latencies = {}
             self.detection_counts = {}
-            self.model_latencies = {}
+
+        # Latest per-stage queue stats, only populated in pipelined mode
+        self.queue_stats = {}
+
+        # Per-analyzer run/skip counts from the inference scheduler
+        self.schedule_counts = {}
+
+        # Frames checked and skipped by the motion gate
+        self.motion_gate_counts = {'skipped': 0, 'total': 0}
+
+        # Latest quality governor state, only populated when a governor is active
+        self.quality_stats = {}
 
     def start_operation(self):
-        """Start timing an operation."""
-        return time.time() if self.detailed else None
+        """Start timing an operation; returns a perf_counter_ns() token for end_operation()."""
+        return time.perf_counter_ns() if self.detailed else None
+
+    def start_operation_at(self, timestamp):
+        """Start token for an operation that began at a time.time() timestamp, such as a capture time."""
+        if not self.detailed:
+            return None
+        return time.perf_counter_ns() - int((time.time() - timestamp) * 1e9)
 
     def end_operation(self, start_time, operation_name):
-        """End timing an operation and record its duration."""
+        """End timing an operation and record its duration.
+
+        Returns:
+            float: The duration in seconds, or None if metrics are not detailed
+        """
         if not self.detailed or start_time is None:
             return None
             
-        duration = time.time() - start_time
-        if operation_name in self.processing_times:
-            self.processing_times[operation_name].append(duration)
-        return duration
+        now = time.perf_counter_ns()
+        duration = max(now - start_time, 0)
+        stage = self.latencies.get(operation_name)
+        if stage is not None:
+            stage.record(duration, now)
+        return duration / 1e9
 
     def update_fps(self):
         """Update FPS calculation."""
         self.frame_count += 1
-        current_time = time.time()
+        current_time = time.perf_counter()
         elapsed = current_time - self.last_fps_time
         
         if elapsed >= 1.0:
@@ -77,6 +242,55 @@ class PerformanceMetrics:
         if success:
             self.detection_counts[detection_type]['success'] += 1
 
+    def update_queue_stats(self, queue_stats):
+        """Record the latest per-stage queue depth and wait time from the pipelined executor."""
+        if not self.detailed:
+            return
+        self.queue_stats = queue_stats
+
+    def update_schedule_status(self, analyzer, ran):
+        """Record whether a scheduled analyzer ran or reused its last result on this frame."""
+        if not self.detailed:
+            return
+        counts = self.schedule_counts.setdefault(analyzer, {'run': 0, 'skip': 0})
+        counts['run' if ran else 'skip'] += 1
+
+    def update_motion_gate_status(self, skipped):
+        """Record whether the motion gate skipped inference on this frame."""
+        if not self.detailed:
+            return
+        self.motion_gate_counts['total'] += 1
+        if skipped:
+            self.motion_gate_counts['skipped'] += 1
+
+    def update_quality_stats(self, quality_stats):
+        """Record the quality governor's current tier and change count."""
+        if not self.detailed:
+            return
+        self.quality_stats = quality_stats
+
+    def get_motion_gate_stats(self):
+        """Skip ratio (%) of the motion gate and its average cost per frame (ms)."""
+        if not self.detailed:
+            return {}
+        counts = self.motion_gate_counts
+        return {
+            'skip_ratio': (counts['skipped'] / counts['total']) * 100 if counts['total'] > 0 else 0.0,
+            'cost_ms': self.latencies['motion_gate'].window_stats()['mean']
+        }
+
+    def get_schedule_rates(self):
+        """Calculate the run and skip rates (%) of each scheduled analyzer."""
+        if not self.detailed:
+            return {}
+
+        rates = {}
+        for analyzer, counts in self.schedule_counts.items():
+            total = counts['run'] + counts['skip']
+            run_rate = (counts['run'] / total) * 100 if total > 0 else 0.0
+            rates[analyzer] = {'run_rate': run_rate, 'skip_rate': 100.0 - run_rate if total > 0 else 0.0}
+        return rates
+
     def get_detection_rates(self):
         """Calculate detection success rates."""
         if not self.detailed:
@@ -92,34 +306,67 @@ class PerformanceMetrics:
         return rates
 
     def get_average_latencies(self):
-        """Calculate average latencies for different operations."""
+        """Calculate average latencies (ms) over the recent window for different operations."""
         if not self.detailed:
             return {}
-            
-        latencies = {}
-        for op_name, times in self.processing_times.items():
-            if times:
-                avg_time = np.mean(times) * 1000  
-                latencies[op_name] = avg_time
-            else:
-                latencies[op_name] = 0.0
-        return latencies
+        return {op: stats['mean'] for op, stats in self.snapshot()['window'].items()}
+
+    def get_latency_percentiles(self, lifetime=False):
+        """Per-operation count, mean, p50/p90/p99 and max (ms), over the recent window or the whole run."""
+        if not self.detailed:
+            return {}
+        return self.snapshot()['lifetime' if lifetime else 'window']
+
+    def snapshot(self, max_age=0.0):
+        """
+        Latency statistics of every stage, windowed and lifetime.
+
+        Args:
+            max_age (float): Reuse the previous snapshot if it is at most this many
+                seconds old; 0 always computes a fresh one
+
+        Returns:
+            dict: 'window' and 'lifetime', each mapping stage -> statistics in ms
+        """
+        now = time.perf_counter()
+        if self._snapshot is None or now - self._snapshot_time > max_age:
+            self._snapshot = {
+                'window': {op: stage.window_stats() for op, stage in self.latencies.items()},
+                'lifetime': {op: stage.lifetime_stats() for op, stage in self.latencies.items()}
+            }
+            self._snapshot_time = now
+        return self._snapshot
+
+    def get_metrics_summary(self, max_age=0.0):
+        """Get a comprehensive summary of all metrics.
 
-    def get_metrics_summary(self):
-        """Get a comprehensive summary of all metrics."""
+        Args:
+            max_age (float): Passed to snapshot(); lets frequent callers reuse recent statistics
+        """
         avg_fps = np.mean(self.fps_history) if self.fps_history else 0
         
         if not self.detailed:
             return {'fps': avg_fps}
             
-        latencies = self.get_average_latencies()
+        snapshot = self.snapshot(max_age)
         detection_rates = self.get_detection_rates()
         
-        return {
+        summary = {
             'fps': avg_fps,
-            'latencies': latencies,
+            'latencies': {op: stats['mean'] for op, stats in snapshot['window'].items()},
+            'percentiles': snapshot['window'],
+            'lifetime_percentiles': snapshot['lifetime'],
             'detection_rates': detection_rates
         }
+        if self.queue_stats:
+            summary['queues'] = self.queue_stats
+        if self.schedule_counts:
+            summary['schedule'] = self.get_schedule_rates()
+        if self.motion_gate_counts['total']:
+            summary['motion_gate'] = self.get_motion_gate_stats()
+        if self.quality_stats:
+            summary['quality'] = self.quality_stats
+        return summary
 
     def log_metrics(self):
         """Log current metrics to the logger."""
@@ -129,14 +376,63 @@ class PerformanceMetrics:
         logger.info(f"FPS: {metrics['fps']:.1f}")
         
         if self.detailed:
-            logger.info("Processing Latencies (ms):")
-            for op, lat in metrics['latencies'].items():
-                logger.info(f"  {op}: {lat:.1f}ms")
+            logger.info("Processing Latencies (ms, mean p50/p90/p99 max):")
+            for op, stats in metrics['percentiles'].items():
+                if stats['count']:
+                    logger.info(f"  {op}: {stats['mean']:.1f} {stats['p50']:.1f}/{stats['p90']:.1f}/"
+                                f"{stats['p99']:.1f} {stats['max']:.1f}")
             
             logger.info("Detection Success Rates (%):")
             for det_type, rate in metrics['detection_rates'].items():
                 logger.info(f"  {det_type}: {rate:.1f}%")
 
+            if 'queues' in metrics:
+                logger.info("Stage Queues:")
+                for stage, stats in metrics['queues'].items():
+                    logger.info(f"  {stage}: depth {stats['depth']}/{stats['capacity']}, "
+                                f"wait {stats['avg_wait_ms']:.1f}ms, dropped {stats['dropped']}")
+
+            if 'schedule' in metrics:
+                logger.info("Inference Schedule (run/skip %):")
+                for analyzer, rates in metrics['schedule'].items():
+                    logger.info(f"  {analyzer}: {rates['run_rate']:.1f}/{rates['skip_rate']:.1f}")
+
+            if 'motion_gate' in metrics:
+                gate = metrics['motion_gate']
+                logger.info(f"Motion Gate: skipped {gate['skip_ratio']:.1f}%, cost {gate['cost_ms']:.2f}ms")
+
+            if 'quality' in metrics:
+                quality = metrics['quality']
+                logger.info(f"Quality Tier: {quality['tier']} ({quality['name']}), "
+                            f"{quality['changes']} changes, budget {quality['budget_ms']:.1f}ms")
+
     def reset(self):
         """Reset all metrics."""
-        self.__init__(self.window_size, self.detailed) 
\ No newline at end of file
+        self.__init__(self.window_size, self.detailed, self.window_seconds)
+
+def aggregate_summaries(summaries):
+    """
+    Combine get_metrics_summary() results of several streams into one.
+
+    FPS is summed (total throughput); latencies and detection rates are averaged
+    over the streams that report them.
+
+    Args:
+        summaries (list): Metrics summaries, one per stream
+
+    Returns:
+        dict: Summary with 'fps', 'latencies', 'detection_rates' and 'streams' keys
+    """
+    def mean_by_key(field):
+        values = {}
+        for summary in summaries:
+            for key, value in summary.get(field, {}).items():
+                values.setdefault(key, []).append(value)
+        return {key: float(np.mean(items)) for key, items in values.items()}
+
+    return {
+        'fps': float(sum(summary.get('fps', 0) for summary in summaries)),
+        'latencies': mean_by_key('latencies'),
+        'detection_rates': mean_by_key('detection_rates'),
+        'streams': len(summaries)
+    }
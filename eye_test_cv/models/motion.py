@@ -0,0 +1,72 @@
+"""
+Module for the motion gate in front of the models.
+Compares a small grayscale copy of each frame against the last frame that was
+analyzed, so inference can be skipped while the scene is static.
+"""
+
+import cv2
+from eye_test_cv.config.settings import (
+    MOTION_GATE_THRESHOLD, MOTION_GATE_MAX_STALE_FRAMES,
+    MOTION_GATE_SIZE, MOTION_GATE_GRID
+)
+
+class MotionGate:
+    """
+    Decides whether a frame differs enough from the last analyzed one to need inference.
+
+    The change score is the largest mean absolute gray-level difference over a
+    grid of blocks, so a small local change such as a blink is not averaged
+    away by a static background.
+
+    Attributes:
+        threshold (float): Block difference (gray levels, 0-255) at or above which a frame is analyzed
+        max_stale_frames (int): Frames that may be skipped in a row before a refresh is forced
+        score (float): Change score of the last frame checked
+        stale_frames (int): Frames skipped since the last analyzed one
+    """
+
+    def __init__(self, threshold=MOTION_GATE_THRESHOLD, max_stale_frames=MOTION_GATE_MAX_STALE_FRAMES,
+                 size=MOTION_GATE_SIZE, grid=MOTION_GATE_GRID):
+        self.threshold = threshold
+        self.max_stale_frames = max_stale_frames
+        self.size = size
+        self.grid = grid
+        self.score = 0.0
+        self.stale_frames = 0
+        self._reference = None
+
+    def should_process(self, frame_rgb):
+        """
+        Check a frame against the last analyzed one.
+
+        Args:
+            frame_rgb (numpy.ndarray): RGB frame about to be analyzed
+
+        Returns:
+            bool: True if the frame should be analyzed, False if the previous results still apply
+        """
+        small = cv2.cvtColor(cv2.resize(frame_rgb, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+        if self._reference is None or self.stale_frames >= self.max_stale_frames:
+            return self._accept(small, float('inf') if self._reference is None else self._score(small))
+
+        self.score = self._score(small)
+        if self.score >= self.threshold:
+            return self._accept(small, self.score)
+        self.stale_frames += 1
+        return False
+
+    def _score(self, small):
+        # INTER_AREA down to the grid size averages the difference over each block
+        blocks = cv2.resize(cv2.absdiff(small, self._reference), self.grid, interpolation=cv2.INTER_AREA)
+        return float(blocks.max())
+
+    def _accept(self, small, score):
+        self._reference = small
+        self.score = score
+        self.stale_frames = 0
+        return True
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always analyzed."""
+        self._reference = None
+        self.stale_frames = 0
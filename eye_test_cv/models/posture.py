@@ -1,45 +1,101 @@
-import mediapipe as mp
 import numpy as np
+from eye_test_cv.lazy import lazy_import
 from eye_test_cv.config.settings import (
     HEAD_TILT_THRESHOLD, LEAN_FORWARD_THRESHOLD,
     SHOULDER_DIFF_THRESHOLD
 )
+from eye_test_cv.models.landmarks import landmarks_to_array
 
-mp_pose = mp.solutions.pose
+mp_pose = lazy_import('mediapipe.python.solutions.pose')
+
+# Landmarks used for posture classification, in unpacking order: nose, left/right
+# ear, left/right shoulder (mp_pose.PoseLandmark values, fixed by the BlazePose topology)
+_POSTURE_IDX = np.array([0, 7, 8, 11, 12])
 
 class PostureAnalyzer:
-    def __init__(self):
-        self.pose = mp_pose.Pose(
+    def __init__(self, head_tilt_threshold=HEAD_TILT_THRESHOLD, lean_forward_threshold=LEAN_FORWARD_THRESHOLD,
+                 shoulder_diff_threshold=SHOULDER_DIFF_THRESHOLD, model_complexity=1):
+        # The Pose graph is built on first use, so landmark-only analysis (e.g. trace replay) never loads it
+        self._pose = None
+        self.model_complexity = model_complexity
+        self.head_tilt_threshold = head_tilt_threshold
+        self.lean_forward_threshold = lean_forward_threshold
+        self.shoulder_diff_threshold = shoulder_diff_threshold
+
+    @property
+    def pose(self):
+        if self._pose is None:
+            self._pose = self._build()
+        return self._pose
+
+    def _build(self):
+        return mp_pose.Pose(
+            model_complexity=self.model_complexity,
             min_detection_confidence=0.6, 
             min_tracking_confidence=0.6
         )
 
+    def set_model_complexity(self, model_complexity):
+        """Switch the Pose model (0 lite, 1 full, 2 heavy), rebuilding a loaded graph.
+
+        The new graph is built before the old one is closed, so a model that cannot
+        be loaded (MediaPipe downloads the lite and heavy models on first use)
+        raises and leaves the current one in place.
+        """
+        if model_complexity == self.model_complexity:
+            return
+        if self._pose is None:
+            self.model_complexity = model_complexity
+            return
+        previous_complexity, self.model_complexity = self.model_complexity, model_complexity
+        try:
+            pose = self._build()
+        except Exception:
+            self.model_complexity = previous_complexity
+            raise
+        self._pose.close()
+        self._pose = pose
+
+    def warm_up(self, frame_size):
+        """Build the graph and run one blank frame through it, so the first real frame pays no setup cost.
+
+        Args:
+            frame_size (tuple): (width, height) of the frames that will be processed
+        """
+        width, height = frame_size
+        self.pose.process(np.zeros((height, width, 3), dtype=np.uint8))
+
+    def detect(self, frame_rgb):
+        """Run the Pose graph and return the detected landmarks, or None."""
+        return self.pose.process(frame_rgb).pose_landmarks
+
     def analyze(self, frame_rgb, frame_width, frame_height):
-        results = self.pose.process(frame_rgb)
-        if not results.pose_landmarks:
+        return self.analyze_landmarks(self.detect(frame_rgb), frame_width, frame_height)
+
+    def analyze_landmarks(self, pose_landmarks, frame_width, frame_height, points=None):
+        """Classify posture from Pose landmarks, optionally already converted to an (N, 3) array."""
+        if pose_landmarks is None:
             return "NO POSE", (255, 255, 255), 0, 0, None
 
-        landmarks = results.pose_landmarks.landmark
-        nose = landmarks[mp_pose.PoseLandmark.NOSE.value]
-        left_ear = landmarks[mp_pose.PoseLandmark.LEFT_EAR.value]
-        right_ear = landmarks[mp_pose.PoseLandmark.RIGHT_EAR.value]
-        left_shoulder = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-        right_shoulder = landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
+        if points is None:
+            points = landmarks_to_array(pose_landmarks)
+        nose, left_ear, right_ear, left_shoulder, right_shoulder = points[_POSTURE_IDX, :2]
 
-        vertical_diff = abs((left_ear.x + right_ear.x)/2 - nose.x)
-        horizontal_diff = (left_ear.y + right_ear.y)/2 - nose.y
-        shoulder_diff = abs(left_shoulder.y - right_shoulder.y)
+        vertical_diff = float(abs((left_ear[0] + right_ear[0])/2 - nose[0]))
+        horizontal_diff = float((left_ear[1] + right_ear[1])/2 - nose[1])
+        shoulder_diff = float(abs(left_shoulder[1] - right_shoulder[1]))
 
         dimension_factor = (frame_width / 640)
 
-        if vertical_diff > HEAD_TILT_THRESHOLD * dimension_factor:
-            return "HEAD TILTED", (0, 0, 255), vertical_diff, horizontal_diff, results.pose_landmarks
-        elif horizontal_diff > LEAN_FORWARD_THRESHOLD * dimension_factor:
-            return "LEANING FORWARD", (0, 165, 255), vertical_diff, horizontal_diff, results.pose_landmarks
-        elif shoulder_diff > SHOULDER_DIFF_THRESHOLD * dimension_factor:
-            return "UNEVEN SHOULDERS", (0, 100, 255), vertical_diff, horizontal_diff, results.pose_landmarks
+        if vertical_diff > self.head_tilt_threshold * dimension_factor:
+            return "HEAD TILTED", (0, 0, 255), vertical_diff, horizontal_diff, pose_landmarks
+        elif horizontal_diff > self.lean_forward_threshold * dimension_factor:
+            return "LEANING FORWARD", (0, 165, 255), vertical_diff, horizontal_diff, pose_landmarks
+        elif shoulder_diff > self.shoulder_diff_threshold * dimension_factor:
+            return "UNEVEN SHOULDERS", (0, 100, 255), vertical_diff, horizontal_diff, pose_landmarks
         else:
-            return "GOOD POSTURE", (0, 255, 0), vertical_diff, horizontal_diff, results.pose_landmarks
+            return "GOOD POSTURE", (0, 255, 0), vertical_diff, horizontal_diff, pose_landmarks
 
     def close(self):
-        self.pose.close()
\ No newline at end of file
+        if self._pose is not None:
+            self._pose.close()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Module for region-of-interest tracking.
+Derives a padded bounding box from the previous frame's landmarks so that a model
+only sees the part of the frame where the subject is, and maps the landmarks
+found in the crop back to full-frame normalized coordinates.
+"""
+
+import numpy as np
+from eye_test_cv.config.settings import ROI_MIN_SIZE, ROI_MAX_AREA_FRACTION
+
+class RoiTracker:
+    """
+    Tracks the crop region for one model across frames.
+
+    The region is kept while the subject stays well inside it, so the model
+    sees a stable crop and its own landmark tracking stays warm; it is
+    recomputed when the subject drifts towards the edge or the region has
+    become much larger than needed, and dropped when tracking is lost.
+
+    Attributes:
+        padding (float): Padding added on each side, as a fraction of the landmark box size
+        roi (tuple): Current (x0, y0, x1, y1) pixel region, or None for the full frame
+        resets (int): Number of times tracking was lost and the full frame was used again
+    """
+
+    def __init__(self, padding, min_size=ROI_MIN_SIZE, max_area_fraction=ROI_MAX_AREA_FRACTION):
+        self.padding = padding
+        self.min_size = min_size
+        self.max_area_fraction = max_area_fraction
+        self.roi = None
+        self.resets = 0
+
+    def crop(self, frame):
+        """
+        Cut the current region out of a frame.
+
+        Args:
+            frame (numpy.ndarray): Full frame
+
+        Returns:
+            tuple: (crop, roi); the full frame and None if no region is tracked
+        """
+        if self.roi is None:
+            return frame, None
+        x0, y0, x1, y1 = self.roi
+        return frame[y0:y1, x0:x1], self.roi
+
+    @staticmethod
+    def to_frame(points, roi, frame_shape):
+        """
+        Map landmarks normalized to a crop back to full-frame normalized coordinates.
+
+        Args:
+            points (numpy.ndarray): (N, 3) landmarks normalized to the crop, or None
+            roi (tuple): (x0, y0, x1, y1) region the crop was taken from, or None
+            frame_shape (tuple): Shape of the full frame
+
+        Returns:
+            numpy.ndarray: (N, 3) landmarks normalized to the full frame, or None
+        """
+        if points is None or roi is None:
+            return points
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = roi
+        # z shares the x scale in MediaPipe's output
+        scale = np.array([(x1 - x0) / width, (y1 - y0) / height, (x1 - x0) / width], dtype=np.float32)
+        offset = np.array([x0 / width, y0 / height, 0.0], dtype=np.float32)
+        return points * scale + offset
+
+    def update(self, points, frame_shape, visibility=None):
+        """
+        Move the region to follow this frame's landmarks.
+
+        Args:
+            points (numpy.ndarray): (N, 3) full-frame normalized landmarks, or None if tracking was lost
+            frame_shape (tuple): Shape of the full frame
+            visibility (numpy.ndarray): Optional (N,) visibility; only landmarks above 0.5 are used
+        """
+        if points is None:
+            self.reset()
+            return
+        if visibility is not None:
+            points = points[visibility > 0.5]
+        if len(points) == 0:
+            self.reset()
+            return
+
+        height, width = frame_shape[:2]
+        x_min, y_min = points[:, :2].min(axis=0) * (width, height)
+        x_max, y_max = points[:, :2].max(axis=0) * (width, height)
+        box_w, box_h = x_max - x_min, y_max - y_min
+
+        if self.roi is not None:
+            # Keep the current region while the subject stays inside it with half the padding to spare
+            x0, y0, x1, y1 = self.roi
+            margin_x, margin_y = box_w * self.padding / 2, box_h * self.padding / 2
+            inside = (x_min - margin_x >= x0 or x0 == 0) and (y_min - margin_y >= y0 or y0 == 0) \
+                and (x_max + margin_x <= x1 or x1 == width) and (y_max + margin_y <= y1 or y1 == height)
+            needed = (box_w * (1 + 2 * self.padding)) * (box_h * (1 + 2 * self.padding))
+            if inside and (x1 - x0) * (y1 - y0) <= 2 * max(needed, self.min_size ** 2):
+                return
+
+        pad_x = max(box_w * self.padding, (self.min_size - box_w) / 2)
+        pad_y = max(box_h * self.padding, (self.min_size - box_h) / 2)
+        x0 = int(max(0, np.floor(x_min - pad_x)))
+        y0 = int(max(0, np.floor(y_min - pad_y)))
+        x1 = int(min(width, np.ceil(x_max + pad_x)))
+        y1 = int(min(height, np.ceil(y_max + pad_y)))
+        if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > self.max_area_fraction * width * height:
+            # Off-frame, or too large to be worth cropping
+            self.roi = None
+            return
+        self.roi = (x0, y0, x1, y1)
+
+    def reset(self):
+        """Drop the region so the next frame runs on the full frame."""
+        if self.roi is not None:
+            self.resets += 1
+        self.roi = None
@@ -0,0 +1,285 @@
+"""
+Multi-stream supervisor.
+Runs one headless PostureDistanceDetector per camera source, on worker threads or
+spawned worker processes, collects their results and metrics in one place and
+restarts streams that fail.
+"""
+
+import os
+import time
+import queue
+import signal
+import logging
+import threading
+import multiprocessing
+from eye_test_cv.controller import PostureDistanceDetector
+from eye_test_cv.models.metrics import PerformanceMetrics, aggregate_summaries
+from eye_test_cv.config.settings import (
+    MULTISTREAM_MAX_RESTARTS, MULTISTREAM_RESTART_DELAY, MULTISTREAM_METRICS_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+THREAD = 'thread'
+PROCESS = 'process'
+
+RUNNING = 'running'
+RESTARTING = 'restarting'
+FINISHED = 'finished'
+FAILED = 'failed'
+STOPPED = 'stopped'
+
+def _run_stream(name, source, detector_kwargs, messages, stop_event):
+    """
+    Worker body: run one headless detector until its source ends or stop_event is set.
+
+    Sends ('result', name, FrameResult), periodic ('metrics', name, summary) and a
+    final ('exit', name, (frames, error, summary)) message to the supervisor.
+    """
+    frames = 0
+    error = None
+    detector = None
+    done = threading.Event()
+
+    def on_result(result):
+        nonlocal frames
+        frames += 1
+        messages.put(('result', name, result))
+        if frames % MULTISTREAM_METRICS_INTERVAL == 0:
+            messages.put(('metrics', name, detector.metrics.get_metrics_summary()))
+
+    def watch_stop():
+        while not done.wait(0.2):
+            if stop_event.is_set():
+                detector.stop()
+                return
+
+    try:
+        detector = PostureDistanceDetector(camera_source=source, headless=True,
+                                           result_callback=on_result, **detector_kwargs)
+        detector.metrics = PerformanceMetrics(detailed=True)
+        threading.Thread(target=watch_stop, name=f"StreamStop-{name}", daemon=True).start()
+        detector.run()
+    except Exception as e:
+        logger.exception(f"Stream {name} crashed")
+        error = repr(e)
+    finally:
+        done.set()
+        summary = detector.metrics.get_metrics_summary() if detector and detector.metrics else None
+        messages.put(('exit', name, (frames, error, summary)))
+
+def _is_file(source):
+    return isinstance(source, (str, os.PathLike)) and os.path.isfile(source)
+
+class _Stream:
+    """Supervisor-side state of one source."""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.state = RUNNING
+        self.restarts = 0
+        self.frames = 0
+        self.total_frames = 0
+        self.last_result = None
+        self.summary = None
+        self.error = None
+        self.worker = None
+        self.exit_info = None
+        self.restart_at = 0.0
+
+class StreamSupervisor:
+    """
+    Analyzes several camera sources concurrently, one headless detector each.
+
+    A stream whose worker crashes or whose capture ends is restarted after
+    restart_delay seconds, up to max_restarts times; a video file that played
+    to its end counts as finished instead. Thread workers share one process
+    (MediaPipe releases the GIL during inference); process workers are spawned
+    and scale across cores at the cost of loading the models once per stream.
+
+    Attributes:
+        streams (dict): Per-source state keyed by stream name
+        mode (str): THREAD or PROCESS
+    """
+
+    def __init__(self, sources, mode=THREAD, max_restarts=MULTISTREAM_MAX_RESTARTS,
+                 restart_delay=MULTISTREAM_RESTART_DELAY, result_callback=None, **detector_kwargs):
+        """
+        Args:
+            sources: List of camera sources (device indices, files or URLs such as
+                DROIDCAM_URL), named stream0, stream1, ...; or a dict of name -> source
+            mode (str): THREAD or PROCESS workers
+            max_restarts (int): Restarts of a failed stream before it is given up
+            restart_delay (float): Seconds to wait before restarting a failed stream
+            result_callback: Called as result_callback(stream_name, FrameResult) on the
+                supervisor's monitor thread for every analyzed frame
+            **detector_kwargs: Passed to each PostureDistanceDetector (picklable in PROCESS mode)
+        """
+        if mode not in (THREAD, PROCESS):
+            raise ValueError(f"Unknown worker mode: {mode}")
+        named = sources.items() if isinstance(sources, dict) else \
+            ((f"stream{i}", source) for i, source in enumerate(sources))
+        self.streams = {name: _Stream(name, source) for name, source in named}
+        self.mode = mode
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.result_callback = result_callback
+        self.detector_kwargs = detector_kwargs
+
+        if mode == PROCESS:
+            self._context = multiprocessing.get_context('spawn')
+            self._messages = self._context.Queue()
+            self._worker_stop = self._context.Event()
+        else:
+            self._messages = queue.Queue()
+            self._worker_stop = threading.Event()
+        self._stop_event = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        """Start every stream and the monitor thread; returns immediately."""
+        for stream in self.streams.values():
+            self._launch(stream)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="StreamSupervisor", daemon=True)
+        self._monitor.start()
+        logger.info(f"Supervising {len(self.streams)} streams on {self.mode} workers")
+
+    def run(self):
+        """Start all streams and block until each has finished, failed for good or been stopped.
+
+        Called from the main thread, SIGINT/SIGTERM stop all streams.
+        """
+        self.start()
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            def handle(signum, _):
+                logger.info(f"Received signal {signum}, stopping all streams")
+                self.stop()
+            previous_handlers = {signum: signal.signal(signum, handle) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            # Short joins keep the main thread responsive to signals
+            while self._monitor.is_alive():
+                self._monitor.join(0.5)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.log_metrics()
+
+    def join(self, timeout=None):
+        """Wait for the monitor thread, i.e. for every stream to end."""
+        if self._monitor:
+            self._monitor.join(timeout)
+
+    def stop(self):
+        """Ask every stream to finish after its current frame. Safe to call from any thread."""
+        self._stop_event.set()
+        self._worker_stop.set()
+
+    def _launch(self, stream):
+        args = (stream.name, stream.source, self.detector_kwargs, self._messages, self._worker_stop)
+        if self.mode == PROCESS:
+            stream.worker = self._context.Process(target=_run_stream, args=args,
+                                                  name=f"Stream-{stream.name}", daemon=True)
+        else:
+            stream.worker = threading.Thread(target=_run_stream, args=args,
+                                             name=f"Stream-{stream.name}", daemon=True)
+        stream.state = RUNNING
+        stream.frames = 0
+        stream.exit_info = None
+        stream.worker.start()
+
+    def _monitor_loop(self):
+        while True:
+            self._drain(timeout=0.1)
+            now = time.monotonic()
+            for stream in self.streams.values():
+                if stream.state == RUNNING and not stream.worker.is_alive():
+                    # Pick up the worker's last messages before judging how it ended
+                    self._drain()
+                    self._finish(stream, now)
+                elif stream.state == RESTARTING:
+                    if self._stop_event.is_set():
+                        stream.state = STOPPED
+                    elif now >= stream.restart_at:
+                        stream.restarts += 1
+                        logger.info(f"Restarting stream {stream.name} (attempt {stream.restarts})")
+                        self._launch(stream)
+            if all(stream.state in (FINISHED, FAILED, STOPPED) for stream in self.streams.values()):
+                break
+
+    def _drain(self, timeout=0.0):
+        """Dispatch queued worker messages, waiting up to timeout for the first one."""
+        while True:
+            try:
+                kind, name, payload = self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+            except queue.Empty:
+                return
+            timeout = 0.0
+            stream = self.streams[name]
+            if kind == 'result':
+                stream.frames += 1
+                stream.total_frames += 1
+                stream.last_result = payload
+                if self.result_callback:
+                    self.result_callback(name, payload)
+            elif kind == 'metrics':
+                stream.summary = payload
+            elif kind == 'exit':
+                stream.exit_info = payload
+                if payload[2]:
+                    stream.summary = payload[2]
+
+    def _finish(self, stream, now):
+        stream.worker.join()
+        if stream.exit_info is None:
+            stream.error = f"worker exited with code {getattr(stream.worker, 'exitcode', None)}"
+        else:
+            stream.error = stream.exit_info[1]
+
+        if self._stop_event.is_set():
+            stream.state = STOPPED
+        elif stream.error is None and stream.frames > 0 and _is_file(stream.source):
+            stream.state = FINISHED
+            logger.info(f"Stream {stream.name} finished after {stream.frames} frames")
+        elif stream.restarts < self.max_restarts:
+            stream.state = RESTARTING
+            stream.restart_at = now + self.restart_delay
+            logger.warning(f"Stream {stream.name} stopped ({stream.error or 'capture ended'}), "
+                           f"restarting in {self.restart_delay:.1f}s")
+        else:
+            stream.state = FAILED
+            logger.error(f"Stream {stream.name} failed after {stream.restarts} restarts: "
+                         f"{stream.error or 'capture ended'}")
+
+    def get_status(self):
+        """State, restart count, frames analyzed and last error of each stream."""
+        return {
+            name: {
+                'state': stream.state,
+                'restarts': stream.restarts,
+                'frames': stream.total_frames,
+                'error': stream.error
+            }
+            for name, stream in self.streams.items()
+        }
+
+    def get_stream_metrics(self):
+        """Latest PerformanceMetrics summary reported by each stream (None before its first report)."""
+        return {name: stream.summary for name, stream in self.streams.items()}
+
+    def get_aggregate_metrics(self):
+        """Metrics of all streams combined, see aggregate_summaries()."""
+        return aggregate_summaries([stream.summary for stream in self.streams.values() if stream.summary])
+
+    def log_metrics(self):
+        """Log per-stream status and FPS, then the aggregate metrics."""
+        logger.info("Stream Metrics:")
+        for name, stream in self.streams.items():
+            fps = stream.summary['fps'] if stream.summary else 0.0
+            logger.info(f"  {name}: {stream.state}, {stream.total_frames} frames, "
+                        f"{fps:.1f} FPS, {stream.restarts} restarts")
+        aggregate = self.get_aggregate_metrics()
+        logger.info(f"Aggregate: {aggregate['fps']:.1f} FPS over {aggregate['streams']} streams")
+        for op, latency in aggregate['latencies'].items():
+            logger.info(f"  {op}: {latency:.1f}ms")
@@ -0,0 +1,214 @@
+"""
+Pipelined frame executor for PostureDistanceDetector.
+Capture/preprocessing and model inference run on their own threads, connected by
+bounded queues, so the frame period is set by the slowest stage instead of the
+sum of all stages. Rendering stays on the caller's thread (HighGUI requirement).
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import deque
+import numpy as np
+from eye_test_cv.models.frame_buffers import FrameSlots
+from eye_test_cv.config.settings import PIPELINE_QUEUE_SIZE, PIPELINE_BACKPRESSURE
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+class StageQueue:
+    """
+    Bounded queue feeding one pipeline stage.
+
+    Attributes:
+        name (str): Name of the stage consuming this queue
+        maxsize (int): Queue capacity
+        backpressure (str): DROP_OLDEST discards the oldest queued item when full,
+            BLOCK makes the producer wait for space
+        dropped (int): Number of items discarded by the drop-oldest policy
+        on_drop: Called with each item the drop-oldest policy discards
+    """
+
+    def __init__(self, name, maxsize, backpressure=DROP_OLDEST, window_size=30, on_drop=None):
+        if backpressure not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown backpressure policy: {backpressure}")
+        self.name = name
+        self.maxsize = maxsize
+        self.backpressure = backpressure
+        self.dropped = 0
+        self.on_drop = on_drop
+        self._queue = queue.Queue(maxsize)
+        self._depths = deque(maxlen=window_size)
+        self._wait_times = deque(maxlen=window_size)
+
+    def put(self, item, stop_event):
+        """
+        Enqueue an item according to the backpressure policy.
+
+        Returns:
+            bool: False if the pipeline was stopped while waiting for space
+        """
+        entry = (time.perf_counter(), item)
+        if self.backpressure == BLOCK:
+            while True:
+                try:
+                    self._queue.put(entry, timeout=0.1)
+                    break
+                except queue.Full:
+                    if stop_event.is_set():
+                        return False
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(entry)
+                    break
+                except queue.Full:
+                    try:
+                        _, dropped_item = self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        continue
+                    if self.on_drop:
+                        self.on_drop(dropped_item)
+        self._depths.append(self._queue.qsize())
+        return True
+
+    def get(self, timeout=0.1):
+        """Dequeue an item, recording how long it waited. Raises queue.Empty on timeout."""
+        enqueued_at, item = self._queue.get(timeout=timeout)
+        self._wait_times.append(time.perf_counter() - enqueued_at)
+        return item
+
+    def empty(self):
+        return self._queue.empty()
+
+    def get_stats(self):
+        """Current depth, average depth and average wait time (ms) of this queue."""
+        depth = self._queue.qsize()
+        return {
+            'depth': depth,
+            'avg_depth': float(np.mean(self._depths)) if self._depths else 0.0,
+            'capacity': self.maxsize,
+            'utilization': depth / self.maxsize if self.maxsize > 0 else 0.0,
+            'avg_wait_ms': float(np.mean(self._wait_times)) * 1000 if self._wait_times else 0.0,
+            'dropped': self.dropped
+        }
+
+class PipelinedExecutor:
+    """
+    Runs capture and inference of a PostureDistanceDetector as concurrent stages.
+
+    The caller consumes finished frames with get_result() and renders them on its
+    own thread. Each item is a (frame, FrameResult) tuple; the result's timestamp
+    is the capture time as a time.time() value compatible with PerformanceMetrics.
+
+    Every frame in flight leases its own capture and preprocessing buffers (see
+    FrameSlots): one per queued item, plus the frames being captured, analyzed
+    and rendered. A frame's buffers are only reused once the caller asks for the
+    next result or a queue drops the frame, so no frame is overwritten while a
+    stage still uses it; capture waits if none is free.
+    """
+
+    def __init__(self, detector, queue_size=PIPELINE_QUEUE_SIZE, backpressure=PIPELINE_BACKPRESSURE):
+        self.detector = detector
+        self.frame_slots = FrameSlots(2 * queue_size + 3)
+        # Items of both queues start with the slot of their frame
+        release = lambda item: self.frame_slots.release(item[0])
+        self.inference_queue = StageQueue('inference', queue_size, backpressure, on_drop=release)
+        self.render_queue = StageQueue('render', queue_size, backpressure, on_drop=release)
+        self.error = None
+        self._stop_event = threading.Event()
+        self._capture_done = threading.Event()
+        self._inference_done = threading.Event()
+        self._threads = []
+        # Slot of the frame returned by the last get_result(), which the caller may still be drawing
+        self._rendering_slot = None
+
+    def start(self):
+        """Size the detector's frame buffers for the frames in flight and start the capture and inference threads."""
+        self.detector._set_frame_buffers(self.frame_slots.count)
+        for target, name in ((self._capture_stage, 'PipelineCapture'),
+                             (self._inference_stage, 'PipelineInference')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Pipelined executor started ({self.inference_queue.backpressure}, "
+                    f"queue size {self.inference_queue.maxsize})")
+
+    def _capture_stage(self):
+        try:
+            while not self._stop_event.is_set():
+                slot = self.frame_slots.acquire(self._stop_event)
+                if slot is None:
+                    break
+                item = self.detector.capture_frame(slot)
+                if item is None or not self.inference_queue.put((slot, item), self._stop_event):
+                    self.frame_slots.release(slot)
+                    break
+        except Exception as e:
+            logger.exception("Error in capture stage")
+            self.error = e
+        finally:
+            self._capture_done.set()
+
+    def _inference_stage(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    slot, (captured_at, frame, frame_rgb, source_frame) = self.inference_queue.get()
+                except queue.Empty:
+                    # Capture may have queued its last frame just before finishing
+                    if self._capture_done.is_set() and self.inference_queue.empty():
+                        break
+                    continue
+                result = self.detector.analyze_frame(frame_rgb, source_frame)
+                result.timestamp = captured_at
+                if not self.render_queue.put((slot, frame, result), self._stop_event):
+                    self.frame_slots.release(slot)
+                    break
+        except Exception as e:
+            logger.exception("Error in inference stage")
+            self.error = e
+        finally:
+            self._inference_done.set()
+
+    def get_result(self, timeout=0.1):
+        """
+        Wait for the next analyzed frame.
+
+        The frame stays valid until the next call, which hands its buffers back to capture.
+
+        Returns:
+            tuple: The next (frame, FrameResult), or None once the pipeline has drained or stopped
+        """
+        self.frame_slots.release(self._rendering_slot)
+        self._rendering_slot = None
+        while not self._stop_event.is_set():
+            try:
+                self._rendering_slot, frame, result = self.render_queue.get(timeout=timeout)
+                return frame, result
+            except queue.Empty:
+                if self._inference_done.is_set() and self.render_queue.empty():
+                    return None
+        return None
+
+    def get_queue_stats(self):
+        """Per-stage queue depth and wait time, keyed by consuming stage."""
+        return {
+            self.inference_queue.name: self.inference_queue.get_stats(),
+            self.render_queue.name: self.render_queue.get_stats()
+        }
+
+    def request_stop(self):
+        """Signal all stages to stop without waiting; get_result() then returns None."""
+        self._stop_event.set()
+
+    def stop(self):
+        """Stop all stages and wait for their threads to exit."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
@@ -2,15 +2,63 @@ import os
 import sys
 import time
 import logging
+import tracemalloc
 from typing import Dict, Any
 from pathlib import Path
 import cv2
 import numpy as np
-from eye_test_cv.controller import PostureDistanceDetector
+from mediapipe.framework.formats import landmark_pb2
+from eye_test_cv.controller import PostureDistanceDetector, FRAME_WIDTH, FRAME_HEIGHT
+from eye_test_cv.models.camera import Camera
+from eye_test_cv.pipeline import PipelinedExecutor, BLOCK
+from eye_test_cv.batch import process_video
+from eye_test_cv.multistream import StreamSupervisor, PROCESS
+from eye_test_cv.models.landmarks import landmarks_to_array
+from eye_test_cv.models.eye_tracker import EyeTracker
+from eye_test_cv.models.posture import PostureAnalyzer
 from eye_test_cv.benchmarks import PerformanceBenchmark
 
 logger = logging.getLogger(__name__)
 
+def _legacy_face_measurements(landmark_list, eye_indices, frame_width):
+    """Per-landmark protobuf access as done before the array conversion, kept as the microbenchmark baseline."""
+    landmarks = landmark_list.landmark
+    ears = []
+    for indices in eye_indices:
+        points = np.array([[landmarks[i].x, landmarks[i].y] for i in indices])
+        height = np.mean([np.linalg.norm(points[i+1] - points[-i-2]) for i in range(4)])
+        width = np.linalg.norm(points[0] - points[8])
+        ears.append(height / width if width > 0 else 0)
+    left_eye = (landmarks[33].x * frame_width, landmarks[33].y * frame_width)
+    right_eye = (landmarks[263].x * frame_width, landmarks[263].y * frame_width)
+    return ears, np.linalg.norm(np.array(left_eye) - np.array(right_eye))
+
+def _legacy_posture_measurements(landmark_list):
+    """Per-landmark protobuf access as done before the array conversion, kept as the microbenchmark baseline."""
+    landmarks = landmark_list.landmark
+    nose, left_ear, right_ear = landmarks[0], landmarks[7], landmarks[8]
+    left_shoulder, right_shoulder = landmarks[11], landmarks[12]
+    return (abs((left_ear.x + right_ear.x)/2 - nose.x),
+            (left_ear.y + right_ear.y)/2 - nose.y,
+            abs(left_shoulder.y - right_shoulder.y))
+
+def _detection_counts(result):
+    """Face and pose detections of a FrameResult, assuming every benchmark frame shows one subject.
+
+    Returns:
+        tuple: (detected, missed) out of the two detectors
+    """
+    detected = int(result.face_detected) + int(result.pose_detected)
+    return detected, 2 - detected
+
+def _synthetic_landmarks(count, with_visibility, rng):
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in rng.random((count, 3)):
+        landmark = landmark_list.landmark.add(x=x, y=y, z=z)
+        if with_visibility:
+            landmark.visibility = 1.0
+    return landmark_list
+
 class BenchmarkRunner:
     def __init__(self, test_data_dir: str = "test_data"):
         self.test_data_dir = Path(test_data_dir)
@@ -19,16 +67,8 @@ class BenchmarkRunner:
         if not self.test_data_dir.exists():
             logger.warning(f"Test data directory {self.test_data_dir} does not exist")
         
-    def run_single_image_test(self, image_filename: str) -> Dict[str, Any]:
-        """Run benchmark on a single image."""
-        # Initialize detector
-        detector = PostureDistanceDetector()
-        # Enables logging
-        detector.enableLogging() 
-
-        # Enables metrics
-        detector.enableMetrics()
-
+    def _load_image(self, image_filename: str) -> np.ndarray:
+        """Locate and load an image from the test data directory or its usual alternatives."""
         image_path = self.test_data_dir / image_filename
         
         logger.info(f"Attempting to load image from: {image_path.absolute()}")
@@ -57,6 +97,19 @@ class BenchmarkRunner:
             raise ValueError(f"Could not load image from {image_path}. File exists but OpenCV failed to read it.")
             
         logger.info(f"Successfully loaded image: {image.shape}")
+        return image
+
+    def run_single_image_test(self, image_filename: str) -> Dict[str, Any]:
+        """Run benchmark on a single image."""
+        # Initialize detector
+        detector = PostureDistanceDetector()
+        # Enables logging
+        detector.enableLogging() 
+
+        # Enables metrics
+        detector.enableMetrics()
+
+        image = self._load_image(image_filename)
         
         # Warm-up run
         for _ in range(5):
@@ -64,40 +117,38 @@ class BenchmarkRunner:
             
         # Actual test runs
         num_runs = 50
+        frame_timestamps = []
+        # Resources are sampled on a background thread and matched to frames afterwards
+        self.benchmark.start_resource_sampling()
         start_time = time.time()
         
         for i in range(num_runs):
             frame_start = time.time()
             
             # Process frame and collect metrics
-            results = detector.run_single_frame(image)
+            result = detector.run_single_frame(image)
+            frame_timestamps.append(frame_start)
             
-            # Measure system resources
-            self.benchmark.measure_system_resources()
-            
-            # Measure model performance
-            # Note: These values would need to be calculated based on ground truth
+            # Measure model performance; false positives and calibration error would need
+            # ground truth, so they are reported as not measured
+            detected, missed = _detection_counts(result)
             self.benchmark.measure_model_performance(
                 inference_time=time.time() - frame_start,
-                true_positives=1, 
-                false_positives=0,
-                false_negatives=0,
-                calibration_error=0.1
+                true_positives=detected,
+                false_negatives=missed
             )
             
             # Measure real-time performance
             self.benchmark.measure_realtime_performance(
                 total_frames=i + 1,
                 dropped_frames=0,  
-                queue_length=0,
-                buffer_size=1,
-                buffer_used=1,
                 start_time=frame_start,
                 end_time=time.time()
             )
             
         end_time = time.time()
         total_time = end_time - start_time
+        self.benchmark.stop_resource_sampling(frame_timestamps)
         
         # Get performance summary
         summary = self.benchmark.get_performance_summary()
@@ -106,13 +157,76 @@ class BenchmarkRunner:
         
         return summary
 
-    def run_video_test(self, video_filename: str) -> Dict[str, Any]:
-        """Run benchmark on a video file."""
-        detector = PostureDistanceDetector()
+    def run_parallel_models_test(self, image_filename: str, num_runs: int = 50) -> Dict[str, Any]:
+        """Compare serial and parallel (Pose on a worker thread) model execution on the same image."""
+        image = self._load_image(image_filename)
+        results = {}
 
-        detector.enableLogging()
-        detector.enableMetrics()
-        
+        for mode, parallel in (('serial', False), ('parallel', True)):
+            detector = PostureDistanceDetector(parallel_models=parallel)
+            detector.distance_estimator.set_focal_length(detector.focal_length_px)
+
+            # Warm-up run
+            for _ in range(5):
+                detector.run_single_frame(image)
+
+            latencies = []
+            for _ in range(num_runs):
+                frame_start = time.perf_counter()
+                detector.run_single_frame(image)
+                latencies.append((time.perf_counter() - frame_start) * 1000)
+            detector.cleanup()
+
+            results[f'{mode}_latency_ms'] = float(np.mean(latencies))
+            results[f'{mode}_p95_latency_ms'] = float(np.percentile(latencies, 95))
+
+        results['speedup'] = results['serial_latency_ms'] / results['parallel_latency_ms']
+        logger.info(f"Serial: {results['serial_latency_ms']:.2f}ms, "
+                    f"parallel: {results['parallel_latency_ms']:.2f}ms "
+                    f"(speedup {results['speedup']:.2f}x)")
+        return results
+
+    def run_landmark_overhead_test(self, num_runs: int = 1000) -> Dict[str, Any]:
+        """Microbenchmark the per-frame Python cost of turning landmarks into measurements.
+
+        Compares per-landmark protobuf access (before) with a single array
+        conversion followed by array indexing (after) on synthetic Face Mesh
+        (478 points) and Pose (33 points) results.
+        """
+        rng = np.random.default_rng(0)
+        face = _synthetic_landmarks(478, False, rng)
+        pose = _synthetic_landmarks(33, True, rng)
+        eye_tracker = EyeTracker()
+        posture_analyzer = PostureAnalyzer()
+
+        def before():
+            _legacy_face_measurements(face, (eye_tracker.LEFT_EYE, eye_tracker.RIGHT_EYE), 640)
+            _legacy_posture_measurements(pose)
+
+        def after():
+            face_points = landmarks_to_array(face)
+            eye_tracker.calculate_ears(face_points)
+            np.hypot(*(face_points[33, :2] - face_points[263, :2])) * 640
+            posture_analyzer.analyze_landmarks(pose, 640, 480)
+
+        results = {}
+        for name, fn in (('before', before), ('after', after)):
+            for _ in range(10):
+                fn()
+            start = time.perf_counter()
+            for _ in range(num_runs):
+                fn()
+            results[f'{name}_us'] = (time.perf_counter() - start) / num_runs * 1e6
+        eye_tracker.close()
+        posture_analyzer.close()
+
+        results['speedup'] = results['before_us'] / results['after_us']
+        logger.info(f"Landmark overhead per frame: {results['before_us']:.1f}us before, "
+                    f"{results['after_us']:.1f}us after ({results['speedup']:.1f}x)")
+        return results
+
+    def _find_video(self, video_filename: str) -> Path:
+        """Locate a video file in the test data directory or its usual alternatives."""
         video_path = self.test_data_dir / video_filename
 
         
@@ -135,6 +249,16 @@ class BenchmarkRunner:
                 raise ValueError(f"Could not find video file. Tried paths:\n" + 
                                f"  - {video_path.absolute()}\n" + 
                                "\n".join([f"  - {p.absolute()}" for p in alternative_paths]))
+        return video_path
+
+    def run_video_test(self, video_filename: str) -> Dict[str, Any]:
+        """Run benchmark on a video file."""
+        detector = PostureDistanceDetector()
+
+        detector.enableLogging()
+        detector.enableMetrics()
+        
+        video_path = self._find_video(video_filename)
         
         cap = cv2.VideoCapture(str(video_path))
         if not cap.isOpened():
@@ -143,7 +267,9 @@ class BenchmarkRunner:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         dropped_frames = 0
         processed_frames = 0
+        frame_timestamps = []
         
+        self.benchmark.start_resource_sampling()
         start_time = time.time()
         
         while cap.isOpened():
@@ -155,36 +281,32 @@ class BenchmarkRunner:
                 
 
             try:
-                results = detector.run_single_frame(frame)
+                result = detector.run_single_frame(frame)
                 processed_frames += 1
             except Exception as e:
                 logger.error(f"Error processing frame: {e}")
                 dropped_frames += 1
                 continue
-                
 
-            self.benchmark.measure_system_resources()
+            frame_timestamps.append(frame_start)
             
+            detected, missed = _detection_counts(result)
             self.benchmark.measure_model_performance(
                 inference_time=time.time() - frame_start,
-                true_positives=1, 
-                false_positives=0,
-                false_negatives=0,
-                calibration_error=0.1
+                true_positives=detected,
+                false_negatives=missed
             )
             
             self.benchmark.measure_realtime_performance(
                 total_frames=processed_frames + dropped_frames,
                 dropped_frames=dropped_frames,
-                queue_length=0,
-                buffer_size=1,
-                buffer_used=1,
                 start_time=frame_start,
                 end_time=time.time()
             )
             
         cap.release()
         end_time = time.time()
+        self.benchmark.stop_resource_sampling(frame_timestamps)
         
         summary = self.benchmark.get_performance_summary()
         summary.update({
@@ -197,60 +319,236 @@ class BenchmarkRunner:
         
         return summary
 
+    def run_pipelined_test(self, video_filename: str, backpressure: str = BLOCK) -> Dict[str, Any]:
+        """Run benchmark on a video file through the pipelined executor."""
+        detector = PostureDistanceDetector(camera_source=str(self._find_video(video_filename)))
+        detector.enableLogging()
+        detector.enableMetrics()
+
+        if not detector.camera.initialize():
+            raise ValueError(f"Could not open video: {video_filename}")
+        detector.setup_distance_estimation()
+
+        executor = PipelinedExecutor(detector, backpressure=backpressure)
+        processed_frames = 0
+        dropped_frames = 0
+        frame_timestamps = []
+        self.benchmark.start_resource_sampling()
+        start_time = time.time()
+        executor.start()
+
+        try:
+            while True:
+                item = executor.get_result()
+                if item is None:
+                    break
+                _, result = item
+                captured_at = result.timestamp
+                processed_frames += 1
+
+                queue_stats = executor.get_queue_stats().values()
+                dropped_frames = sum(stats['dropped'] for stats in queue_stats)
+                queue_length = sum(stats['depth'] for stats in queue_stats)
+
+                frame_timestamps.append(captured_at)
+
+                detected, missed = _detection_counts(result)
+                self.benchmark.measure_model_performance(
+                    inference_time=time.time() - captured_at,
+                    true_positives=detected,
+                    false_negatives=missed
+                )
+
+                self.benchmark.measure_realtime_performance(
+                    total_frames=processed_frames + dropped_frames,
+                    dropped_frames=dropped_frames,
+                    queue_length=queue_length,
+                    buffer_size=sum(stats['capacity'] for stats in queue_stats),
+                    buffer_used=queue_length,
+                    start_time=captured_at,
+                    end_time=time.time()
+                )
+        finally:
+            executor.stop()
+            detector.camera.release()
+            self.benchmark.stop_resource_sampling(frame_timestamps)
+
+        end_time = time.time()
+
+        summary = self.benchmark.get_performance_summary()
+        summary.update({
+            'total_time': end_time - start_time,
+            'processed_frames': processed_frames,
+            'dropped_frames': dropped_frames,
+            'queue_stats': executor.get_queue_stats(),
+            'average_fps': processed_frames / (end_time - start_time)
+        })
+
+        return summary
+
+    def run_batch_scaling_test(self, video_filename: str, worker_counts=(1, 2, 4)) -> Dict[str, Any]:
+        """Measure offline batch processing throughput for different worker counts."""
+        video_path = str(self._find_video(video_filename))
+        results = {}
+
+        for workers in worker_counts:
+            start_time = time.time()
+            processed_frames = sum(1 for _ in process_video(video_path, workers=workers))
+            elapsed = time.time() - start_time
+            results[workers] = {
+                'processed_frames': processed_frames,
+                'total_time': elapsed,
+                'average_fps': processed_frames / elapsed if elapsed > 0 else 0
+            }
+            logger.info(f"{workers} worker(s): {results[workers]['average_fps']:.1f} FPS")
+
+        return results
+
+    def run_allocation_test(self, video_filename: str, num_frames: int = 100) -> Dict[str, Any]:
+        """Compare per-frame allocations of capture + resize + color conversion with and without reused buffers.
+
+        tracemalloc sees the NumPy arrays OpenCV allocates, so the per-frame peak
+        of traced memory shows how many frame-sized arrays each path creates.
+        """
+        video_path = str(self._find_video(video_filename))
+        frame_bytes = FRAME_WIDTH * FRAME_HEIGHT * 3
+
+        def legacy_frames():
+            cap = cv2.VideoCapture(video_path)
+            try:
+                for _ in range(num_frames):
+                    ret, frame = cap.read()
+                    if not ret:
+                        return
+                    frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+                    yield frame, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            finally:
+                cap.release()
+
+        def buffered_frames():
+            detector = PostureDistanceDetector(headless=True)
+            camera = Camera(video_path, capture_size=(FRAME_WIDTH, FRAME_HEIGHT), frame_buffers=1)
+            if not camera.initialize():
+                raise ValueError(f"Could not open video: {video_path}")
+            try:
+                for _ in range(num_frames):
+                    ret, frame = camera.read_frame()
+                    if not ret:
+                        return
+                    yield detector.preprocess_frame(frame)
+            finally:
+                camera.release()
+                detector.cleanup()
+
+        results = {}
+        for name, frames in (('legacy', legacy_frames), ('preallocated', buffered_frames)):
+            peaks = []
+            tracemalloc.start()
+            try:
+                iterator = frames()
+                # The first frame allocates the reusable buffers; only steady state is measured
+                next(iterator, None)
+                while True:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    if next(iterator, None) is None:
+                        break
+                    peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            finally:
+                tracemalloc.stop()
+            if not peaks:
+                raise ValueError(f"No frames read from {video_path}")
+            average_peak = float(np.mean(peaks))
+            results[name] = {
+                'frames': len(peaks),
+                'average_peak_bytes': average_peak,
+                'max_peak_bytes': int(max(peaks)),
+                'frame_allocations': average_peak / frame_bytes
+            }
+            logger.info(f"{name}: {average_peak / 1024:.1f} KiB peak allocation per frame "
+                        f"(~{results[name]['frame_allocations']:.1f} frame-sized arrays)")
+
+        return results
+
+    def run_multistream_scaling_test(self, video_filename: str, stream_counts=(1, 2, 4, 8),
+                                     mode: str = PROCESS) -> Dict[str, Any]:
+        """Measure aggregate throughput of the stream supervisor for different numbers of streams."""
+        video_path = str(self._find_video(video_filename))
+        results = {}
+
+        for count in stream_counts:
+            supervisor = StreamSupervisor([video_path] * count, mode=mode, max_restarts=0)
+            start_time = time.time()
+            supervisor.run()
+            elapsed = time.time() - start_time
+            frames = sum(status['frames'] for status in supervisor.get_status().values())
+            results[count] = {
+                'processed_frames': frames,
+                'total_time': elapsed,
+                'aggregate_fps': frames / elapsed if elapsed > 0 else 0,
+                'per_stream_fps': frames / elapsed / count if elapsed > 0 else 0
+            }
+            logger.info(f"{count} stream(s): {results[count]['aggregate_fps']:.1f} FPS aggregate, "
+                        f"{results[count]['per_stream_fps']:.1f} FPS per stream")
+
+        return results
+
     def run_stress_test(self, duration_seconds: int = 300) -> Dict[str, Any]:
         """Run a stress test using webcam feed."""
         detector = PostureDistanceDetector()
         detector.enableLogging()
         detector.enableMetrics()
-        cap = cv2.VideoCapture(0)
+        # Background capture so that frames the detector cannot keep up with are counted as dropped
+        camera = Camera(0, threaded=True)
         
-        if not cap.isOpened():
+        if not camera.initialize():
             raise ValueError("Could not open webcam")
             
         start_time = time.time()
         end_time = start_time + duration_seconds
         
         total_frames = 0
+        failed_frames = 0
         dropped_frames = 0
+        frame_timestamps = []
+        self.benchmark.start_resource_sampling()
         
         while time.time() < end_time:
             frame_start = time.time()
-            ret, frame = cap.read()
+            ret, frame = camera.read_frame()
             
             if not ret:
-                dropped_frames += 1
+                failed_frames += 1
                 continue
                 
             try:
-                results = detector.run_single_frame(frame)
+                result = detector.run_single_frame(frame)
                 total_frames += 1
             except Exception as e:
                 logger.error(f"Error processing frame: {e}")
-                dropped_frames += 1
+                failed_frames += 1
                 continue
-                
-     
-            self.benchmark.measure_system_resources()
+
+            dropped_frames = camera.dropped_frames + failed_frames
+            frame_timestamps.append(frame_start)
             
+            detected, missed = _detection_counts(result)
             self.benchmark.measure_model_performance(
                 inference_time=time.time() - frame_start,
-                true_positives=1,  
-                false_positives=0,
-                false_negatives=0,
-                calibration_error=0.1
+                true_positives=detected,
+                false_negatives=missed
             )
             
             self.benchmark.measure_realtime_performance(
-                total_frames=total_frames + dropped_frames,
+                total_frames=camera.frames_captured + failed_frames,
                 dropped_frames=dropped_frames,
-                queue_length=0,
-                buffer_size=1,
-                buffer_used=1,
                 start_time=frame_start,
                 end_time=time.time()
             )
             
-        cap.release()
+        camera.release()
+        self.benchmark.stop_resource_sampling(frame_timestamps)
+        dropped_frames = camera.dropped_frames + failed_frames
         
         # Get performance summary
         summary = self.benchmark.get_performance_summary()
@@ -280,6 +578,18 @@ def main():
     except Exception as e:
         logger.error(f"Image test failed: {e}")
     
+    try:
+        logger.info("\nRunning landmark overhead microbenchmark...")
+        runner.run_landmark_overhead_test()
+    except Exception as e:
+        logger.error(f"Landmark overhead test failed: {e}")
+    
+    try:
+        logger.info("\nRunning serial vs parallel model execution test...")
+        runner.run_parallel_models_test("image.jpg")
+    except Exception as e:
+        logger.error(f"Parallel model test failed: {e}")
+    
     try:
         logger.info("\nRunning video test...")
         video_results = runner.run_video_test("Test.mp4")
@@ -287,6 +597,31 @@ def main():
     except Exception as e:
         logger.error(f"Video test failed: {e}")
     
+    try:
+        logger.info("\nRunning pipelined video test...")
+        pipelined_results = runner.run_pipelined_test("Test.mp4")
+        runner.benchmark.log_performance_summary()
+    except Exception as e:
+        logger.error(f"Pipelined video test failed: {e}")
+    
+    try:
+        logger.info("\nRunning batch video scaling test...")
+        runner.run_batch_scaling_test("Test.mp4")
+    except Exception as e:
+        logger.error(f"Batch scaling test failed: {e}")
+    
+    try:
+        logger.info("\nRunning multi-stream scaling test...")
+        runner.run_multistream_scaling_test("Test.mp4")
+    except Exception as e:
+        logger.error(f"Multi-stream scaling test failed: {e}")
+    
+    try:
+        logger.info("\nRunning frame allocation test...")
+        runner.run_allocation_test("Test.mp4")
+    except Exception as e:
+        logger.error(f"Frame allocation test failed: {e}")
+    
     try:
         logger.info("\nRunning stress test (5 minutes)...")
         stress_results = runner.run_stress_test(300)
@@ -0,0 +1,101 @@
+"""
+Per-analyzer inference scheduling for PostureDistanceDetector.
+Each analyzer runs on its own frame cadence (e.g. eyes every frame, pose every
+third frame). Frames on which an analyzer is skipped reuse its last result, and
+a run can be forced early when the face moves or appears/disappears.
+"""
+
+import logging
+import numpy as np
+from eye_test_cv.config.settings import INFERENCE_INTERVALS, MOTION_TRIGGER_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+EYES = 'eyes'
+DISTANCE = 'distance'
+POSE = 'pose'
+
+class InferenceScheduler:
+    """
+    Decides which analyzers run on each frame.
+
+    Call next_frame() once per frame, then should_run() just before each
+    analyzer would run and mark_run() once it has. Decisions are taken lazily,
+    so a trigger raised by an earlier analyzer in the same frame (via force()
+    or check_triggers()) can still bring a later analyzer forward.
+
+    Attributes:
+        intervals (dict): Run every N-th frame, keyed by analyzer name
+        motion_threshold (float): Mean face landmark displacement (normalized
+            units) that forces the triggered analyzers to run; None disables it
+        frame_index (int): Index of the current frame
+    """
+
+    def __init__(self, intervals=None, motion_threshold=MOTION_TRIGGER_THRESHOLD,
+                 triggered=(DISTANCE, POSE)):
+        self.intervals = dict(INFERENCE_INTERVALS)
+        if intervals:
+            self.intervals.update(intervals)
+        for name, interval in self.intervals.items():
+            if interval < 1:
+                raise ValueError(f"Inference interval for {name} must be at least 1, got {interval}")
+        self.motion_threshold = motion_threshold
+        self.triggered = tuple(triggered)
+        self.frame_index = -1
+        self._last_run = {name: None for name in self.intervals}
+        self._forced = set()
+        self._last_face_points = None
+
+    def next_frame(self):
+        """Advance to the next frame."""
+        self.frame_index += 1
+
+    def should_run(self, name):
+        """Whether the analyzer is due on the current frame (first frame, interval elapsed, or forced)."""
+        last = self._last_run.get(name)
+        if last is None or name in self._forced:
+            return True
+        return self.frame_index - last >= self.intervals.get(name, 1)
+
+    def mark_run(self, name):
+        """Record that the analyzer produced a fresh result on the current frame."""
+        self._last_run[name] = self.frame_index
+        self._forced.discard(name)
+
+    def age(self, name):
+        """Frames since the analyzer last ran (0 if it ran on this frame), or -1 if it never ran."""
+        last = self._last_run.get(name)
+        return -1 if last is None else self.frame_index - last
+
+    def force(self, *names):
+        """Make the given analyzers (all of them if none are given) run at their next opportunity."""
+        self._forced.update(names or self.intervals)
+
+    def check_triggers(self, face_points):
+        """
+        Force the triggered analyzers if the face appeared, disappeared or moved.
+
+        Args:
+            face_points (numpy.ndarray): This frame's (N, 3) face landmarks, or None
+
+        Returns:
+            bool: Whether a run was forced
+        """
+        previous = self._last_face_points
+        self._last_face_points = face_points
+        if previous is None and face_points is None:
+            return False
+        if previous is None or face_points is None:
+            reason = "face lost" if face_points is None else "face found"
+        elif self.motion_threshold is not None and previous.shape == face_points.shape:
+            motion = float(np.mean(np.abs(face_points[:, :2] - previous[:, :2])))
+            if motion < self.motion_threshold:
+                return False
+            reason = f"motion {motion:.4f}"
+        else:
+            return False
+        pending = [name for name in self.triggered if name not in self._forced and self.age(name) != 0]
+        if pending:
+            logger.debug(f"Frame {self.frame_index}: forcing {', '.join(pending)} ({reason})")
+            self.force(*pending)
+        return True
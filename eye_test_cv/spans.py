@@ -0,0 +1,123 @@
+"""
+Per-frame span tracing.
+Records timed spans (capture, resize, cvtColor, face_mesh, ear, pose, distance,
+draw, imshow, ...) with the thread they ran on into a preallocated ring buffer,
+and writes them out as Chrome Trace Event JSON for chrome://tracing or Perfetto.
+Spans on the same thread nest by time, so each frame shows up as a span tree.
+"""
+
+import os
+import json
+import logging
+import itertools
+import threading
+import time
+from array import array
+from eye_test_cv.config.settings import SPAN_TRACE_CAPACITY
+
+logger = logging.getLogger(__name__)
+
+class SpanTracer:
+    """
+    Fixed-capacity ring of completed spans, safe to record into from any thread.
+
+    Callers time a span with begin() and end() rather than a context manager, so
+    tracing points cost a single None check while tracing is off. Recording takes
+    no lock: each span claims the next ring slot from an atomic counter and
+    writes its columns, its sequence number last, so a span that is being
+    overwritten or is only half written is skipped by dump().
+
+    Attributes:
+        capacity (int): Spans kept; older ones are overwritten
+    """
+
+    def __init__(self, capacity=SPAN_TRACE_CAPACITY):
+        self.capacity = capacity
+        self._names = []
+        self._name_ids = {}
+        self._thread_names = {}
+        self._counter = itertools.count()
+        self._origin = time.perf_counter_ns()
+        self._sequence = array('q', [-1]) * capacity
+        self._name = array('q', bytes(8 * capacity))
+        self._tid = array('q', bytes(8 * capacity))
+        self._start = array('q', bytes(8 * capacity))
+        self._duration = array('q', bytes(8 * capacity))
+
+    @staticmethod
+    def begin():
+        """Start a span; returns the perf_counter_ns() token to pass to end()."""
+        return time.perf_counter_ns()
+
+    def end(self, start, name):
+        """Record a span named name that started at begin() token start, on the calling thread."""
+        end = time.perf_counter_ns()
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._intern(name)
+        tid = threading.get_native_id()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+
+        sequence = next(self._counter)
+        slot = sequence % self.capacity
+        self._sequence[slot] = -1
+        self._name[slot] = name_id
+        self._tid[slot] = tid
+        self._start[slot] = start
+        self._duration[slot] = end - start
+        self._sequence[slot] = sequence
+
+    def _intern(self, name):
+        # setdefault keeps the first id if two threads intern the same name at once
+        name_id = self._name_ids.setdefault(name, len(self._names))
+        if name_id == len(self._names):
+            self._names.append(name)
+        return name_id
+
+    def events(self):
+        """
+        The buffered spans as Chrome Trace Event dicts, oldest first.
+
+        Returns:
+            list: Complete ('X') events with microsecond ts/dur, preceded by thread name metadata
+        """
+        # Claiming a sequence number bounds the spans to read; that slot itself is never written
+        newest = next(self._counter)
+        oldest = max(newest - self.capacity, 0)
+        pid = os.getpid()
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in list(self._thread_names.items())
+        ]
+        spans = []
+        for sequence in range(oldest, newest):
+            slot = sequence % self.capacity
+            if self._sequence[slot] != sequence:
+                continue
+            span = (self._start[slot], self._duration[slot], self._name[slot], self._tid[slot])
+            # Re-check: the slot may have been reused while it was read
+            if self._sequence[slot] == sequence:
+                spans.append(span)
+        # Parents before the children that start at the same instant
+        spans.sort(key=lambda span: (span[0], -span[1]))
+        events.extend(
+            {'name': self._names[name_id], 'cat': 'frame', 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': (start - self._origin) / 1000, 'dur': duration / 1000}
+            for start, duration, name_id, tid in spans
+        )
+        return events
+
+    def dump(self, path):
+        """
+        Write the buffered spans to path as Chrome Trace Event JSON.
+
+        Returns:
+            int: Number of spans written
+        """
+        events = self.events()
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        count = sum(1 for event in events if event['ph'] == 'X')
+        logger.info(f"Wrote {count} spans to {path}")
+        return count
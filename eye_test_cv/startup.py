@@ -0,0 +1,109 @@
+"""
+Startup timing and model warm-up.
+Most of the time to the first result goes to importing mediapipe, building the
+Face Mesh and Pose graphs and their first inference. StartupTimer records how
+long each startup phase took and on which thread, and warm_up_models() does the
+model work up front, building the graphs in parallel while the camera opens.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """
+    Wall-clock timings of named startup phases, relative to the timer's creation.
+
+    Phases may overlap and run on any thread; each is recorded when it ends.
+
+    Attributes:
+        phases (list): (name, thread name, start, end) tuples, seconds since creation
+        marks (dict): Name -> seconds since creation of one-off events such as the first result
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = []
+        self.marks = {}
+
+    def elapsed(self):
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self._origin
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as the phase name, on the calling thread."""
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            end = self.elapsed()
+            with self._lock:
+                self.phases.append((name, threading.current_thread().name, start, end))
+
+    def mark(self, name):
+        """Record that the event name happened now; later marks of the same name are ignored."""
+        with self._lock:
+            self.marks.setdefault(name, self.elapsed())
+
+    def report(self):
+        """
+        The recorded timings.
+
+        Returns:
+            dict: 'phases' (list of dicts with name, thread, start, duration in seconds,
+                in start order) and 'marks' (name -> seconds since creation)
+        """
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[2])
+            marks = dict(self.marks)
+        return {
+            'phases': [{'name': name, 'thread': thread, 'start': start, 'duration': end - start}
+                       for name, thread, start, end in phases],
+            'marks': marks
+        }
+
+    def log_report(self):
+        """Log each phase's start offset, duration and thread, then the marks."""
+        report = self.report()
+        logger.info("Startup timing:")
+        for phase in report['phases']:
+            logger.info(f"  {phase['name']}: +{phase['start'] * 1000:.0f}ms, "
+                        f"{phase['duration'] * 1000:.1f}ms ({phase['thread']})")
+        for name, at in report['marks'].items():
+            logger.info(f"  {name} at {at * 1000:.0f}ms")
+
+def warm_up_models(models, frame_size, timer, lazy_modules=()):
+    """
+    Import lazy_modules, then build and warm up every model concurrently.
+
+    The import comes first and on the calling thread since every graph needs it
+    (and Python serializes it anyway); the graphs are then built and each run on
+    one blank frame on their own threads, as graph setup and inference mostly
+    run in native code without the GIL.
+
+    Args:
+        models (dict): Phase name -> model with a warm_up(frame_size) method
+        frame_size (tuple): (width, height) of the frames the models will see
+        timer (StartupTimer): Timer the phases are recorded in
+        lazy_modules: LazyModules to load first, in the 'import' phase
+    """
+    with timer.phase('import'):
+        for module in lazy_modules:
+            module.load()
+    if not models:
+        return
+
+    def warm_up(name, model):
+        with timer.phase(name):
+            model.warm_up(frame_size)
+
+    with ThreadPoolExecutor(max_workers=len(models), thread_name_prefix='WarmUp') as pool:
+        futures = [pool.submit(warm_up, name, model) for name, model in models.items()]
+        for future in futures:
+            future.result()
@@ -0,0 +1,74 @@
+"""
+Asyncio streaming for PostureDistanceDetector.
+Capture and inference run on their own single-thread executors, so the event
+loop only awaits futures. The next frame is captured while the current one is
+analyzed, so the stream keeps up with the camera whenever inference does.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Frames alive at once: the one being analyzed and the one being captured
+_STREAM_FRAME_BUFFERS = 2
+
+def _analyze(detector, captured_at, frame_rgb, source_frame):
+    detector._update_fps()
+    result = detector.analyze_frame(frame_rgb, source_frame)
+    result.timestamp = captured_at
+    detector.complete_frame(result, detector.metrics.start_operation_at(captured_at) if detector.metrics else None)
+    return result
+
+def _release(detector, capture_pool):
+    # Runs on the inference thread after any in-flight analysis; waits out a pending capture
+    capture_pool.shutdown(wait=True)
+    detector.cleanup()
+
+async def stream_results(detector):
+    """
+    Async generator behind PostureDistanceDetector.stream().
+
+    MediaPipe graphs are only ever called from the inference thread, and camera
+    reads only from the capture thread. On exit, whether the stream ended, the
+    consumer stopped iterating or the task was cancelled, cleanup() is queued
+    behind any running work on the inference thread, so models are never closed
+    mid-inference; it still completes if the shutdown itself is cancelled.
+
+    Args:
+        detector (PostureDistanceDetector): Detector whose camera and models to use
+
+    Yields:
+        FrameResult: One result per analyzed frame, timestamp set to its capture time
+    """
+    loop = asyncio.get_running_loop()
+    capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='StreamCapture')
+    inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='StreamInference')
+    try:
+        # Models are built and warmed up on the inference thread while the camera opens
+        models_ready = loop.run_in_executor(inference_pool, detector.warm_up)
+        camera_ready = loop.run_in_executor(capture_pool, detector.initialize_camera)
+        camera_ready, _ = await asyncio.gather(camera_ready, models_ready)
+        if not camera_ready:
+            return
+        detector._stop_event.clear()
+        detector._set_frame_buffers(_STREAM_FRAME_BUFFERS)
+        await loop.run_in_executor(capture_pool, detector.setup_distance_estimation)
+        logger.info("Async stream started")
+
+        capture = loop.run_in_executor(capture_pool, detector.capture_frame)
+        while not detector._stop_event.is_set():
+            item = await capture
+            if item is None:
+                break
+            captured_at, _, frame_rgb, source_frame = item
+            capture = loop.run_in_executor(capture_pool, detector.capture_frame)
+            yield await loop.run_in_executor(inference_pool, _analyze, detector,
+                                             captured_at, frame_rgb, source_frame)
+    finally:
+        detector._stop_event.set()
+        shutdown = loop.run_in_executor(inference_pool, _release, detector, capture_pool)
+        inference_pool.shutdown(wait=False)
+        await shutdown
+        logger.info("Async stream stopped")
@@ -0,0 +1,204 @@
+"""
+Landmark trace recording and replay.
+A trace stores the face and pose landmarks of every frame in fixed-size binary
+records behind a small header, so it can be memory-mapped and re-analyzed with
+different thresholds without running MediaPipe again.
+"""
+
+import os
+import struct
+import logging
+import numpy as np
+from eye_test_cv.models.posture import PostureAnalyzer
+from eye_test_cv.models.distance import DistanceEstimator
+from eye_test_cv.models.eye_tracker import EyeTracker
+from eye_test_cv.models.frame_result import FrameResult
+from eye_test_cv.config.settings import FOCAL_LENGTH_PX, TRACE_FACE_LANDMARKS, TRACE_POSE_LANDMARKS
+
+logger = logging.getLogger(__name__)
+
+TRACE_MAGIC = b'EYETRACE'
+TRACE_VERSION = 1
+# magic, version, bytes per coordinate, face/pose landmark counts, frame width/height, record size
+_HEADER = struct.Struct('<8sHHHHHHI')
+HEADER_SIZE = 64
+
+FACE_PRESENT = 1
+POSE_PRESENT = 2
+
+def record_dtype(face_count=TRACE_FACE_LANDMARKS, pose_count=TRACE_POSE_LANDMARKS, half_precision=False):
+    """
+    NumPy dtype of one trace record.
+
+    Args:
+        face_count (int): Face landmarks per frame
+        pose_count (int): Pose landmarks per frame
+        half_precision (bool): Store coordinates as float16 instead of float32
+
+    Returns:
+        numpy.dtype: Packed record with frame_index, timestamp, flags, face, pose and pose_visibility fields
+    """
+    coord = '<f2' if half_precision else '<f4'
+    return np.dtype([
+        ('frame_index', '<i8'),
+        ('timestamp', '<f8'),
+        ('flags', '<u4'),
+        ('face', coord, (face_count, 3)),
+        ('pose', coord, (pose_count, 3)),
+        ('pose_visibility', coord, (pose_count,))
+    ])
+
+class TraceRecorder:
+    """
+    Appends FrameResult landmarks to a trace file.
+
+    Frames without a face or pose are stored with that part zeroed and its flag
+    cleared. A record count is not kept in the header, so a trace cut short by a
+    crash stays readable up to its last complete record.
+
+    Attributes:
+        path (str): Trace file path
+        frames_written (int): Number of records written
+    """
+
+    def __init__(self, path, frame_width, frame_height, half_precision=False,
+                 face_count=TRACE_FACE_LANDMARKS, pose_count=TRACE_POSE_LANDMARKS):
+        self.path = path
+        self.frames_written = 0
+        self._record = np.zeros(1, dtype=record_dtype(face_count, pose_count, half_precision))
+        self._file = open(path, 'wb')
+        header = _HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 2 if half_precision else 4,
+                              face_count, pose_count, frame_width, frame_height, self._record.itemsize)
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+
+    def write(self, result):
+        """
+        Append one frame.
+
+        Args:
+            result (FrameResult): Analysis result holding the frame's landmarks; a negative
+                frame_index is replaced by the record's position in the trace
+        """
+        record = self._record[0]
+        record['frame_index'] = result.frame_index if result.frame_index >= 0 else self.frames_written
+        record['timestamp'] = result.timestamp
+        flags = 0
+        if result.face_detected:
+            # Without iris refinement there are fewer face landmarks; the rest stays zero
+            count = len(result.face_points)
+            record['face'][:count] = result.face_points
+            record['face'][count:] = 0
+            flags |= FACE_PRESENT
+        else:
+            record['face'] = 0
+        if result.pose_detected:
+            record['pose'] = result.pose_points
+            record['pose_visibility'] = result.pose_visibility
+            flags |= POSE_PRESENT
+        else:
+            record['pose'] = 0
+            record['pose_visibility'] = 0
+        record['flags'] = flags
+        self._file.write(self._record.tobytes())
+        self.frames_written += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Wrote {self.frames_written} frames to trace {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TraceReader:
+    """
+    Memory-mapped, read-only view of a trace file.
+
+    Attributes:
+        records (numpy.memmap): Structured array of all complete records (see record_dtype);
+            a trailing partial record is ignored
+        frame_width (int): Width of the frames the landmarks were computed on
+        frame_height (int): Height of the frames the landmarks were computed on
+        half_precision (bool): Whether coordinates are stored as float16
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"Not a landmark trace: {path}")
+        magic, version, coord_size, face_count, pose_count, self.frame_width, self.frame_height, \
+            record_size = _HEADER.unpack_from(header)
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"Not a landmark trace: {path}")
+        if version != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {version}: {path}")
+        self.half_precision = coord_size == 2
+        dtype = record_dtype(face_count, pose_count, self.half_precision)
+        if dtype.itemsize != record_size:
+            raise ValueError(f"Corrupt trace header (record size {record_size}, expected {dtype.itemsize}): {path}")
+        # A crash can leave a partial last record; only complete records are mapped
+        count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            # An empty file cannot be memory-mapped
+            self.records = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def chunks(self, chunk_size=4096):
+        """
+        Iterate over the records in contiguous blocks with coordinates as float32.
+
+        Yields:
+            tuple: (frame_index, timestamp, flags, face, pose, pose_visibility) arrays for one block
+        """
+        for start in range(0, len(self.records), chunk_size):
+            block = self.records[start:start + chunk_size]
+            yield (block['frame_index'], block['timestamp'], block['flags'],
+                   block['face'].astype(np.float32), block['pose'].astype(np.float32),
+                   block['pose_visibility'].astype(np.float32))
+
+def replay_trace(path, eye_tracker=None, posture_analyzer=None, distance_estimator=None):
+    """
+    Re-run the eye, posture and distance decision logic on a recorded trace, without inference.
+
+    Pass pre-configured analyzers to try other settings, e.g.
+    PostureAnalyzer(head_tilt_threshold=0.008) or an EyeTracker with a different
+    calibration_ratio. Analyzers built here never load a MediaPipe graph.
+
+    Args:
+        path (str): Trace file path
+        eye_tracker (EyeTracker): Eye tracker to feed, or None for a default one
+        posture_analyzer (PostureAnalyzer): Posture analyzer to feed, or None for a default one
+        distance_estimator (DistanceEstimator): Distance estimator to feed, or None for one
+            using FOCAL_LENGTH_PX
+
+    Yields:
+        FrameResult: One result per recorded frame, in trace order
+    """
+    trace = TraceReader(path)
+    eye_tracker = eye_tracker or EyeTracker()
+    posture_analyzer = posture_analyzer or PostureAnalyzer()
+    if distance_estimator is None:
+        distance_estimator = DistanceEstimator()
+        distance_estimator.set_focal_length(FOCAL_LENGTH_PX)
+    width, height = trace.frame_width, trace.frame_height
+
+    for frame_indices, timestamps, flags, faces, poses, visibilities in trace.chunks():
+        for i in range(len(frame_indices)):
+            face_points = faces[i] if flags[i] & FACE_PRESENT else None
+            pose_points = poses[i] if flags[i] & POSE_PRESENT else None
+            pose_visibility = visibilities[i] if pose_points is not None else None
+            # The analyzers only test the landmark list for None, so the array stands in for it
+            eye_result = eye_tracker.analyze_landmarks(face_points, face_points)
+            distance_data = distance_estimator.estimate_from_landmarks(face_points, width, face_points)
+            posture_result = posture_analyzer.analyze_landmarks(pose_points, width, height, pose_points)
+            yield FrameResult.from_analysis(eye_result, posture_result, distance_data,
+                                            face_points, pose_points, pose_visibility,
+                                            frame_index=int(frame_indices[i]), timestamp=float(timestamps[i]))
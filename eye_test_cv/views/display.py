@@ -1,114 +1,343 @@
+import time
+import queue
+import logging
 import cv2
-import mediapipe as mp
+import numpy as np
+import functools
+from eye_test_cv.lazy import lazy_import
+from eye_test_cv.config.settings import DISPLAY_DETAIL, DISPLAY_MAX_FPS, METRICS_PANEL_INTERVAL
 
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-mp_face_mesh = mp.solutions.face_mesh
+logger = logging.getLogger(__name__)
+
+mp_pose = lazy_import('mediapipe.python.solutions.pose')
+mp_face_mesh = lazy_import('mediapipe.python.solutions.face_mesh')
+
+TESSELATION_COLOR = (192, 192, 192)
+VISIBILITY_THRESHOLD = 0.5
+
+# Key points: eye corners, iris centers and nose tip; nose, ears and shoulders for pose
+FACE_KEY_POINTS = np.array([33, 133, 362, 263, 468, 473, 1], dtype=np.int32)
+POSE_KEY_POINTS = np.array([0, 7, 8, 11, 12], dtype=np.int32)
+
+@functools.lru_cache(maxsize=None)
+def landmark_connections():
+    """
+    Landmark connections as index arrays for drawing straight from landmark arrays.
+
+    Built on first draw rather than at import, since reading them imports mediapipe.
+
+    Returns:
+        tuple: (pose, face tesselation, face contours and irises) int32 arrays of index pairs
+    """
+    return (
+        np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.int32),
+        np.array(sorted(mp_face_mesh.FACEMESH_TESSELATION), dtype=np.int32),
+        np.array(sorted(mp_face_mesh.FACEMESH_CONTOURS | mp_face_mesh.FACEMESH_IRISES), dtype=np.int32)
+    )
+
+# Landmark detail levels, from most to least expensive to draw
+DETAIL_MESH = 'mesh'
+DETAIL_CONTOURS = 'contours'
+DETAIL_KEYPOINTS = 'keypoints'
+DETAIL_NONE = 'none'
+DETAIL_LEVELS = (DETAIL_MESH, DETAIL_CONTOURS, DETAIL_KEYPOINTS, DETAIL_NONE)
+
+class TextLayerCache:
+    """
+    Pre-rendered text overlays that are only re-rendered when their content changes.
+
+    Each overlay is keyed by its slot on screen. Its text is rasterized once
+    into a small patch with a mask, and blitted onto later frames until the
+    text, color or style of that slot changes.
+    """
+
+    def __init__(self):
+        self._layers = {}
+
+    def draw(self, image, key, text, org, scale, color, thickness):
+        """
+        Draw text as cv2.putText would, reusing the cached patch when the content is unchanged.
+
+        Args:
+            image (numpy.ndarray): BGR image to draw on
+            key (str): Slot identifier
+            text (str): Text to draw
+            org (tuple): Bottom-left corner of the text, as for cv2.putText
+            scale (float): Font scale
+            color (tuple): BGR color
+            thickness (int): Stroke thickness
+        """
+        content = (text, org, scale, color, thickness)
+        layer = self._layers.get(key)
+        if layer is None or layer[0] != content:
+            layer = self._layers[key] = (content, *self._render(text, scale, color, thickness))
+        _, patch, mask, (dx, dy) = layer
+        self._blit(image, patch, mask, org[0] + dx, org[1] + dy)
+
+    @staticmethod
+    def _render(text, scale, color, thickness):
+        (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        pad = thickness + 1
+        patch = np.zeros((height + baseline + 2 * pad, width + 2 * pad, 3), dtype=np.uint8)
+        mask = np.zeros(patch.shape[:2], dtype=np.uint8)
+        origin = (pad, height + pad)
+        cv2.putText(patch, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        cv2.putText(mask, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+        # Offset of the patch's top-left corner from the text origin
+        return patch, mask, (-origin[0], -origin[1])
+
+    @staticmethod
+    def _blit(image, patch, mask, x, y):
+        img_h, img_w = image.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + patch.shape[1], img_w), min(y + patch.shape[0], img_h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        px, py = x0 - x, y0 - y
+        cv2.copyTo(patch[py:py + y1 - y0, px:px + x1 - x0], mask[py:py + y1 - y0, px:px + x1 - x0],
+                   image[y0:y1, x0:x1])
 
 class Display:
-    def __init__(self, window_name='Posture & Distance Analysis'):
+    """
+    On-screen overlay of the analysis results.
+
+    Attributes:
+        window_name (str): HighGUI window name
+        detail (str): Landmark detail level, one of DETAIL_LEVELS
+        max_fps (float): Render rate cap, independent of the inference rate; None renders every frame
+    """
+
+    def __init__(self, window_name='Posture & Distance Analysis', detail=DISPLAY_DETAIL, max_fps=DISPLAY_MAX_FPS):
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"Unknown detail level: {detail}")
         self.window_name = window_name
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        self.detail = detail
+        self.max_fps = max_fps
+        self.text = TextLayerCache()
+        self._last_render = 0.0
+        self._rendered = False
+        self._metrics_panel = None
+        self._metrics_panel_time = 0.0
+        # Opened on the first shown frame, so draw() alone (e.g. in benchmarks) needs no window
+        self._window_open = False
+        # SpanTracer for 'draw' and 'imshow' spans, set while the detector traces spans
+        self.span_tracer = None
+
+    def update(self, frame, result, camera_specs, metrics_summary=None):
+        """Update display with frame and all analysis results from a FrameResult.
+
+        The overlay is drawn onto frame in place. Frames arriving faster than
+        max_fps are not drawn or shown.
+        """
+        now = time.perf_counter()
+        self._rendered = not self.max_fps or now - self._last_render >= 1.0 / self.max_fps
+        if not self._rendered:
+            return
+        self._last_render = now
 
-    def update(self, frame, posture_data, distance_data, eye_status, camera_specs, 
-              pose_landmarks=None, face_landmarks=None, metrics_summary=None):
-        """Update display with frame and all analysis results."""
-        annotated_image = frame.copy()
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        self.draw(frame, result, camera_specs, metrics_summary)
+        if tracer:
+            tracer.end(span, 'draw')
+            span = tracer.begin()
+        if not self._window_open:
+            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            self._window_open = True
+        cv2.imshow(self.window_name, frame)
+        if tracer:
+            tracer.end(span, 'imshow')
+
+    def draw(self, frame, result, camera_specs, metrics_summary=None):
+        """Draw the overlay for a FrameResult onto frame in place, without showing it."""
+        annotated_image = frame
         frame_width = frame.shape[1]
         frame_height = frame.shape[0]
 
         # Draw landmarks if available
-        if pose_landmarks:
-            self.draw_pose_landmarks(annotated_image, pose_landmarks, (0, 255, 0))
-        if face_landmarks:
-            self.draw_face_landmarks(annotated_image, face_landmarks)
+        if result.pose_detected:
+            self.draw_pose_landmarks(annotated_image, result.pose_points, (0, 255, 0), result.pose_visibility)
+        if result.face_detected:
+            self.draw_face_landmarks(annotated_image, result.face_points)
 
         # Posture info
-        if posture_data:
-            posture_status, posture_color, vert_diff, horiz_diff = posture_data
-            cv2.putText(annotated_image, f"Posture: {posture_status}",
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, posture_color, 2)
-            cv2.putText(annotated_image, f"Head Tilt: {vert_diff:.3f}",
-                       (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            cv2.putText(annotated_image, f"Forward Lean: {horiz_diff:.3f}",
-                       (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        if result.posture_status:
+            self.text.draw(annotated_image, 'posture', f"Posture: {result.posture_status}",
+                           (10, 30), 0.8, result.posture_color, 2)
+            self.text.draw(annotated_image, 'head_tilt', f"Head Tilt: {result.vertical_difference:.3f}",
+                           (10, 70), 0.6, (255, 255, 255), 1)
+            self.text.draw(annotated_image, 'forward_lean', f"Forward Lean: {result.horizontal_difference:.3f}",
+                           (10, 100), 0.6, (255, 255, 255), 1)
 
         # Distance info
-        if distance_data:
-            distance, distance_status, distance_color = distance_data
-            cv2.putText(annotated_image, f"Distance: {distance:.1f} cm",
-                       (frame_width - 250, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, distance_color, 2)
-            cv2.putText(annotated_image, distance_status,
-                       (frame_width - 250, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, distance_color, 2)
+        if result.distance_status:
+            self.text.draw(annotated_image, 'distance', f"Distance: {result.distance:.1f} cm",
+                           (frame_width - 250, 30), 0.8, result.distance_color, 2)
+            self.text.draw(annotated_image, 'distance_status', result.distance_status,
+                           (frame_width - 250, 70), 0.8, result.distance_color, 2)
 
         # Eye status
-        if eye_status:
+        if result.eye_status:
             status_color = (0, 255, 0)  # Green for active tracking
-            cv2.putText(annotated_image, f"Eye Status: {eye_status}",
-                       (10, frame_height - 140), cv2.FONT_HERSHEY_SIMPLEX,
-                       0.7, status_color, 2)
+            self.text.draw(annotated_image, 'eye_status', f"Eye Status: {result.eye_status}",
+                           (10, frame_height - 140), 0.7, status_color, 2)
 
         # Performance metrics
         if metrics_summary:
             self.draw_metrics(annotated_image, metrics_summary, frame_width, frame_height)
 
         # Camera specs
-        cv2.putText(annotated_image, 
-                   f"Focal: {camera_specs['focal_length']}mm (35mm eq.) | Sensor: {camera_specs['sensor_width']}mm",
-                   (10, frame_height - 10), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-
-        cv2.imshow(self.window_name, annotated_image)
+        self.text.draw(annotated_image, 'camera_specs',
+                       f"Focal: {camera_specs['focal_length']}mm (35mm eq.) | Sensor: {camera_specs['sensor_width']}mm",
+                       (10, frame_height - 10), 0.5, (200, 200, 200), 1)
 
     def draw_metrics(self, image, metrics, frame_width, frame_height):
-        """Draw performance metrics on the image."""
+        """Draw performance metrics on the image.
+
+        The panel's lines are refreshed at most every METRICS_PANEL_INTERVAL
+        seconds; in between, the cached lines are drawn again.
+        """
+        now = time.perf_counter()
+        if self._metrics_panel is None or now - self._metrics_panel_time >= METRICS_PANEL_INTERVAL:
+            self._metrics_panel = self._layout_metrics(metrics, frame_width, frame_height)
+            self._metrics_panel_time = now
+        for key, text, org, scale, color, thickness in self._metrics_panel:
+            self.text.draw(image, key, text, org, scale, color, thickness)
+
+    @staticmethod
+    def _layout_metrics(metrics, frame_width, frame_height):
+        lines = []
         # FPS
         fps_color = (0, 255, 0) if metrics['fps'] >= 25 else (0, 165, 255) if metrics['fps'] >= 15 else (0, 0, 255)
-        cv2.putText(image, f"FPS: {metrics['fps']:.1f}",
-                   (frame_width - 150, frame_height - 110),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, fps_color, 2)
+        lines.append(('fps', f"FPS: {metrics['fps']:.1f}", (frame_width - 150, frame_height - 110), 0.7, fps_color, 2))
 
-        # Processing times
+        # Processing times: median and p99 over the recent window, total colored by its tail
         y_offset = frame_height - 90
-        for op, latency in metrics['latencies'].items():
+        for op, stats in metrics['percentiles'].items():
             color = (200, 200, 200)
             if op == 'total':
-                color = (0, 255, 0) if latency < 33 else (0, 165, 255) if latency < 66 else (0, 0, 255)
-            
-            cv2.putText(image, f"{op}: {latency:.1f}ms",
-                       (frame_width - 200, y_offset),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                p99 = stats['p99']
+                color = (0, 255, 0) if p99 < 33 else (0, 165, 255) if p99 < 66 else (0, 0, 255)
+            lines.append((f"latency_{op}", f"{op}: {stats['p50']:.1f}/{stats['p99']:.1f}ms",
+                          (frame_width - 220, y_offset), 0.5, color, 1))
             y_offset += 20
 
         # Detection rates
         y_offset = frame_height - 90
         for det_type, rate in metrics['detection_rates'].items():
             color = (0, 255, 0) if rate > 90 else (0, 165, 255) if rate > 75 else (0, 0, 255)
-            cv2.putText(image, f"{det_type}: {rate:.1f}%",
-                       (10, y_offset),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+            lines.append((f"rate_{det_type}", f"{det_type}: {rate:.1f}%", (10, y_offset), 0.5, color, 1))
             y_offset += 20
+        return lines
+
+    @staticmethod
+    def _to_pixels(points, image):
+        """Map normalized landmark coordinates to pixel coordinates and an in-frame mask."""
+        height, width = image.shape[:2]
+        xy = points[:, :2]
+        in_frame = np.all((xy >= 0) & (xy <= 1), axis=1)
+        pixels = np.empty((len(points), 2), dtype=np.int32)
+        np.multiply(xy, (width, height), out=pixels, casting='unsafe')
+        return pixels, in_frame
+
+    @staticmethod
+    def _draw_points(image, pixels, color, radius, thickness):
+        for x, y in pixels:
+            cv2.circle(image, (int(x), int(y)), radius, color, thickness)
+
+    def draw_pose_landmarks(self, image, points, color, visibility=None):
+        """Draw pose landmarks and connections from an (N, 3) landmark array, at the display's detail level."""
+        if self.detail == DETAIL_NONE:
+            return
+        pixels, drawable = self._to_pixels(points, image)
+        if visibility is not None:
+            drawable &= visibility >= VISIBILITY_THRESHOLD
+        if self.detail == DETAIL_KEYPOINTS:
+            self._draw_points(image, pixels[POSE_KEY_POINTS[drawable[POSE_KEY_POINTS]]], color, 2, 2)
+            return
+        pose_connections = landmark_connections()[0]
+        connections = pose_connections[drawable[pose_connections].all(axis=1)]
+        if len(connections):
+            cv2.polylines(image, pixels[connections], False, color, 2)
+        self._draw_points(image, pixels[drawable], color, 2, 2)
+
+    def draw_face_landmarks(self, image, points):
+        """Draw the face from an (N, 3) landmark array: full tesselation, contours and irises, or key points."""
+        if self.detail == DETAIL_NONE:
+            return
+        pixels, in_frame = self._to_pixels(points, image)
+        if self.detail == DETAIL_KEYPOINTS:
+            # Iris centers only exist in the refined landmark set
+            key_points = FACE_KEY_POINTS[FACE_KEY_POINTS < len(points)]
+            self._draw_points(image, pixels[key_points[in_frame[key_points]]], TESSELATION_COLOR, 2, -1)
+            return
+        _, tesselation, contours = landmark_connections()
+        connections = tesselation if self.detail == DETAIL_MESH else contours
+        if len(points) <= connections.max():
+            connections = connections[connections.max(axis=1) < len(points)]
+        connections = connections[in_frame[connections].all(axis=1)]
+        if len(connections):
+            cv2.polylines(image, pixels[connections], False, TESSELATION_COLOR, 1)
+
+    def poll_quit(self):
+        """Pump the window's events and report whether 'q' was pressed.
 
-    def draw_pose_landmarks(self, image, landmarks, color):
-        """Draw pose landmarks on the image."""
-        mp_drawing.draw_landmarks(
-            image,
-            landmarks,
-            mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=mp_drawing.DrawingSpec(color=color, thickness=2, circle_radius=2),
-            connection_drawing_spec=mp_drawing.DrawingSpec(color=color, thickness=2)
-        )
-
-    def draw_face_landmarks(self, image, face_landmarks):
-        """Draw face mesh landmarks on the image."""
-        mp_drawing.draw_landmarks(
-            image=image,
-            landmark_list=face_landmarks,
-            connections=mp_face_mesh.FACEMESH_TESSELATION,
-            landmark_drawing_spec=None,
-            connection_drawing_spec=mp.solutions.drawing_styles.get_default_face_mesh_tesselation_style()
-        )
+        Only polls after a frame was shown, so a render rate cap also caps waitKey.
+        """
+        if not self._rendered:
+            return False
+        tracer = self.span_tracer
+        span = tracer.begin() if tracer else None
+        key = cv2.waitKey(1)
+        if tracer:
+            tracer.end(span, 'waitKey')
+        return key & 0xFF == ord('q')
 
     def close(self):
         """Close all windows."""
-        cv2.destroyAllWindows()
\ No newline at end of file
+        if self._window_open:
+            cv2.destroyAllWindows()
+            self._window_open = False
+
+class HeadlessDisplay:
+    """
+    Drop-in replacement for Display that opens no window and draws nothing.
+
+    Each frame's FrameResult is handed to a callback and/or a queue instead.
+    A full queue drops its oldest result, so a slow consumer never stalls the
+    analysis loop.
+
+    Attributes:
+        callback (callable): Called with each FrameResult, or None
+        result_queue (queue.Queue): Receives each FrameResult, or None
+        dropped (int): Results dropped because result_queue was full
+    """
+
+    def __init__(self, callback=None, result_queue=None):
+        self.callback = callback
+        self.result_queue = result_queue
+        self.dropped = 0
+
+    def update(self, frame, result, camera_specs, metrics_summary=None):
+        """Deliver the frame's FrameResult; the frame itself is not used."""
+        if self.callback:
+            self.callback(result)
+        if self.result_queue is not None:
+            while True:
+                try:
+                    self.result_queue.put_nowait(result)
+                    break
+                except queue.Full:
+                    try:
+                        self.result_queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def poll_quit(self):
+        """There is no keyboard to poll; stop a headless run with stop() or a signal."""
+        return False
+
+    def close(self):
+        if self.dropped:
+            logger.info(f"Headless result queue dropped {self.dropped} results")
\ No newline at end of file
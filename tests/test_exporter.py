@@ -0,0 +1,68 @@
+import time
+import urllib.request
+import urllib.error
+import pytest
+from eye_test_cv.exporter import MetricsExporter, CONTENT_TYPE
+from eye_test_cv.models.metrics import PerformanceMetrics
+
+STAGE = 'face_mesh'
+LATENCIES_MS = (1, 3, 3, 40)
+
+def _parse_labels(text):
+    return dict(pair.split('=', 1) for pair in text.replace('"', '').split(','))
+
+def _samples(body, name):
+    """(labels, value) of every sample of metric name, in order."""
+    samples = []
+    for line in body.splitlines():
+        if line.startswith('#') or not line.startswith(name):
+            continue
+        key, value = line.rsplit(' ', 1)
+        if key == name:
+            samples.append(({}, float(value)))
+        elif key.startswith(name + '{'):
+            samples.append((_parse_labels(key[len(name) + 1:-1]), float(value)))
+    return samples
+
+def _stage_samples(body, suffix):
+    return [(labels, value) for labels, value in _samples(body, 'eye_test_cv_stage_latency_seconds' + suffix)
+            if labels['stage'] == STAGE]
+
+@pytest.fixture
+def exporter():
+    metrics = PerformanceMetrics(detailed=True)
+    for latency_ms in LATENCIES_MS:
+        metrics.end_operation(time.perf_counter_ns() - latency_ms * 1_000_000, STAGE)
+    with MetricsExporter(metrics, port=0) as exporter:
+        yield exporter
+
+def _get(exporter, path):
+    return urllib.request.urlopen(f"http://{exporter.host}:{exporter.port}{path}", timeout=5)
+
+def test_scrape_serves_openmetrics(exporter):
+    with _get(exporter, '/metrics') as response:
+        assert response.status == 200
+        assert response.headers['Content-Type'] == CONTENT_TYPE
+        body = response.read().decode('utf-8')
+
+    assert body.endswith('# EOF\n')
+    assert '# TYPE eye_test_cv_stage_latency_seconds histogram' in body
+    assert '# TYPE eye_test_cv_fps gauge' in body
+
+    buckets = _stage_samples(body, '_bucket')
+    assert buckets
+    counts = [count for _, count in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1][0]['le'] == '+Inf' and counts[-1] == len(LATENCIES_MS)
+    bounds = [float(labels['le']) for labels, _ in buckets[:-1]]
+    assert bounds == sorted(bounds)
+
+    (_, count), = _stage_samples(body, '_count')
+    (_, total), = _stage_samples(body, '_sum')
+    assert count == len(LATENCIES_MS)
+    assert total >= sum(LATENCIES_MS) / 1000
+
+def test_unknown_path_is_not_found(exporter):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(exporter, '/')
+    assert error.value.code == 404
@@ -0,0 +1,46 @@
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from eye_test_cv.models.landmarks import landmarks_to_array
+
+def _landmark_list(count, fields, seed=0):
+    rng = np.random.default_rng(seed)
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for values in rng.random((count, len(fields))):
+        landmark = landmark_list.landmark.add()
+        for name, value in zip(fields, values):
+            setattr(landmark, name, value)
+    return landmark_list
+
+def _by_attribute(landmark_list):
+    points = np.array([(p.x, p.y, p.z) for p in landmark_list.landmark], dtype=np.float32)
+    visibility = np.array([p.visibility if p.HasField('visibility') else 1.0
+                           for p in landmark_list.landmark], dtype=np.float32)
+    return points, visibility
+
+def _assert_matches_attributes(landmark_list):
+    points, visibility = landmarks_to_array(landmark_list, with_visibility=True)
+    expected_points, expected_visibility = _by_attribute(landmark_list)
+    assert points.dtype == np.float32 and points.shape == expected_points.shape
+    np.testing.assert_array_equal(points, expected_points)
+    np.testing.assert_array_equal(visibility, expected_visibility)
+    np.testing.assert_array_equal(landmarks_to_array(landmark_list), expected_points)
+
+def test_face_mesh_layout():
+    _assert_matches_attributes(_landmark_list(478, ('x', 'y', 'z')))
+
+def test_pose_layouts():
+    _assert_matches_attributes(_landmark_list(33, ('x', 'y', 'z', 'visibility')))
+    _assert_matches_attributes(_landmark_list(33, ('x', 'y', 'z', 'visibility', 'presence')))
+    # Presence without visibility: the field after z is not the visibility
+    _assert_matches_attributes(_landmark_list(33, ('x', 'y', 'z', 'presence')))
+
+def test_records_with_different_layouts():
+    landmark_list = _landmark_list(33, ('x', 'y', 'z', 'visibility'))
+    landmark_list.landmark[5].ClearField('visibility')
+    landmark_list.landmark[7].presence = 0.5
+    _assert_matches_attributes(landmark_list)
+
+def test_empty_and_missing():
+    points, visibility = landmarks_to_array(landmark_pb2.NormalizedLandmarkList(), with_visibility=True)
+    assert points.shape == (0, 3) and visibility.shape == (0,)
+    assert landmarks_to_array(None) is None
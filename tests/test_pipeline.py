@@ -0,0 +1,64 @@
+import time
+import numpy as np
+from eye_test_cv.models.frame_buffers import FrameRing
+from eye_test_cv.models.frame_result import FrameResult
+from eye_test_cv.pipeline import PipelinedExecutor, DROP_OLDEST, BLOCK
+
+class _StubDetector:
+    """Writes each frame's sequence number into reused buffers, like capture and preprocessing do."""
+
+    def __init__(self, frames, capture_time, analysis_time):
+        self.frames = frames
+        self.capture_time = capture_time
+        self.analysis_time = analysis_time
+        self.captured = 0
+        self.overwritten = 0
+        self._buffers = FrameRing()
+
+    def _set_frame_buffers(self, count):
+        self._buffers.resize(count)
+
+    def capture_frame(self, slot=None):
+        if self.captured == self.frames:
+            return None
+        time.sleep(self.capture_time)
+        self.captured += 1
+        frame = self._buffers.next((4, 4, 3), slot=slot)
+        frame[:] = self.captured % 256
+        return time.time(), frame, frame, frame
+
+    def analyze_frame(self, frame_rgb, source_frame=None):
+        expected = int(frame_rgb[0, 0, 0])
+        time.sleep(self.analysis_time)
+        if not (frame_rgb == expected).all():
+            self.overwritten += 1
+        return FrameResult(frame_index=expected)
+
+def _run(detector, backpressure):
+    executor = PipelinedExecutor(detector, queue_size=2, backpressure=backpressure)
+    executor.start()
+    rendered = []
+    try:
+        while True:
+            item = executor.get_result()
+            if item is None:
+                break
+            frame, result = item
+            # Drawing takes a while too; the frame must still be the one that was analyzed
+            time.sleep(0.005)
+            rendered.append((frame == result.frame_index).all())
+    finally:
+        executor.stop()
+    return rendered
+
+def test_frames_in_flight_are_not_overwritten_when_dropping():
+    detector = _StubDetector(frames=200, capture_time=0.002, analysis_time=0.05)
+    rendered = _run(detector, DROP_OLDEST)
+    assert rendered and all(rendered)
+    assert detector.overwritten == 0
+
+def test_every_frame_is_analyzed_when_blocking():
+    detector = _StubDetector(frames=30, capture_time=0.0, analysis_time=0.005)
+    rendered = _run(detector, BLOCK)
+    assert len(rendered) == 30 and all(rendered)
+    assert detector.overwritten == 0
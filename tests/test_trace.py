@@ -0,0 +1,34 @@
+import numpy as np
+from eye_test_cv.models.frame_result import FrameResult
+from eye_test_cv.trace import TraceRecorder, TraceReader, HEADER_SIZE
+
+def _write_trace(path, frames):
+    with TraceRecorder(str(path), 640, 480) as recorder:
+        for i in range(frames):
+            recorder.write(FrameResult(frame_index=i, timestamp=float(i),
+                                       face_points=np.full((478, 3), i, dtype=np.float32)))
+    return recorder._record.itemsize
+
+def test_truncated_trace_reads_complete_records(tmp_path):
+    path = tmp_path / 'session.trace'
+    record_size = _write_trace(path, 3)
+    # Cut the last record short, as a crash mid-write would
+    with open(path, 'r+b') as f:
+        f.truncate(HEADER_SIZE + 2 * record_size + record_size // 2)
+
+    reader = TraceReader(str(path))
+    assert len(reader) == 2
+    assert list(reader.records['frame_index']) == [0, 1]
+    assert reader.records['face'][1].max() == 1
+
+def test_trace_without_complete_records_is_empty(tmp_path):
+    path = tmp_path / 'session.trace'
+    record_size = _write_trace(path, 1)
+    with open(path, 'r+b') as f:
+        f.truncate(HEADER_SIZE + record_size // 2)
+    assert len(TraceReader(str(path))) == 0
+
+    _write_trace(path, 0)
+    reader = TraceReader(str(path))
+    assert len(reader) == 0
+    assert list(reader.chunks()) == []